@@ -17,25 +17,44 @@ dash app in python3
 # =============================================================================
 
 # core
+import functools
 import os
-import pandas as pd
+import tempfile
+import threading
+import time
+import numpy as np
 import ast
+import flask
 
 # dash
 import dash
 from dash import dcc
 from dash import html
 import dash_bootstrap_components as dbc
-from dash.dependencies import Input, Output
-
-# plotly
-import plotly.express as px
+from dash.dependencies import Input, Output, State, ClientsideFunction
 
 # =============================================================================
 # helper functions
 # =============================================================================
 
 from pdAutoRead import pdAutoRead
+from radarSchema import RadarSchema
+from radarRules import compile_rules, derive_columns, derived_rows
+from compactFrame import compact_frame, held_bytes
+from filterIndex import build_filter_index, filter_mask
+from figureCache import FigureCache, canonical_inputs, dataset_version
+from radarTree import (
+    build_radar_tree, find_node, parent_node, sunburst_figure)
+from clientBundle import build_client_bundle
+from facetEngine import build_facet_engine, facet_options
+from searchIndex import build_search_index, search
+from radarReloader import SnapshotLRU, file_digest, file_signature
+from sharedSnapshot import SharedSnapshots
+from callbackMetrics import CallbackMetrics, instrument, note
+import callbackProfiler
+from slimPayload import compress_responses, slim_figure
+from prerenderRadar import PrerenderedFigures
+from radarApi import register_api
 
 # =============================================================================
 # collect and/or set configs / variables
@@ -52,16 +71,8 @@ selected_domain = "Concepts"
 radar_data_config_path = os.path.join(
     os.getcwd(), "data", "radar_data_index.csv")
 
-# read in the configs
-radar_data_config = pdAutoRead(radar_data_config_path)
-del radar_data_config_path
-
-# grab the radar data filename from configs based on selected domain
-data_filename = radar_data_config[radar_data_config["domain"] == 
-    selected_domain]["value"].values[0]
-
-# add the radar data filepath, for any os
-radar_data_path = os.path.join(os.getcwd(), "data", data_filename)
+# every domain in the configs can be picked, each is loaded on first use
+radar_domain_names = pdAutoRead(radar_data_config_path)["domain"].tolist()
 
 # get the data radar colour scheme location, if using a separate file for color
 radar_colours_path = os.path.join(
@@ -70,38 +81,313 @@ radar_colours_path = os.path.join(
 # get the purpose location, if using a separate file to manage this
 purpose_path = os.path.join(os.getcwd(), "data", "purpose.txt")
 
+# get the rules deriving columns such as Storage Type from the radar data
+radar_rules_path = os.path.join(os.getcwd(), "data", "radar_data_rules.csv")
+
+# the derived column the Storage Type picker filters on
+storage_type_column = "Storage Type"
+
+# optionally ship the data to the browser once, and filter it there
+clientside_mode = os.environ.get("RADAR_CLIENTSIDE") == "1"
+
+# most entities the search picker offers at once
+search_limit = int(os.environ.get("RADAR_SEARCH_LIMIT", 50))
+
+# serve the entities and radar nodes as json under /api/v1
+api_enabled = os.environ.get("RADAR_API") == "1"
+
+# serve per-callback latency and payload histograms on /metrics
+metrics_enabled = os.environ.get("RADAR_METRICS") == "1"
+
+# send the radar in a packed form the browser expands, and gzip responses
+slim_figures = os.environ.get("RADAR_SLIM_FIGURES") == "1"
+compress_enabled = os.environ.get("RADAR_COMPRESS", "1") == "1"
+
+# figures rendered at build time by prerenderRadar.py, served while the data
+# they were rendered from is unchanged
+prerender_dir = os.environ.get("RADAR_PRERENDER_DIR")
+
+# profile callback requests into this directory, on request or sampled
+profile_dir = os.environ.get("RADAR_PROFILE_DIR")
+
+# rings drawn until the user clicks into a node, whose branch is then fetched
+# down to the Focus depth. 0 draws every ring up to Focus at once
+progressive_levels = int(os.environ.get("RADAR_PROGRESSIVE_LEVELS", 0))
+
+# rows of the radar data parsed at a time, 0 parses the file in one go
+ingest_chunk_rows = int(os.environ.get("RADAR_INGEST_CHUNK_ROWS", 50000))
+
+# run the radar and picker callbacks as background jobs, each in a process a
+# newer request for the same callback terminates. Needs dash[diskcache]
+background_mode = os.environ.get("RADAR_BACKGROUND") == "1"
+
+# a background job waits this long before starting, so of a burst of input
+# changes only the last is rendered
+debounce_seconds = int(os.environ.get("RADAR_DEBOUNCE_MS", 150)) / 1000
+
+# seconds between checks of the data files for changes, 0 never reloads
+reload_interval = float(os.environ.get("RADAR_RELOAD_INTERVAL", 5))
+
+# memory for loaded domains, least recently used ones are dropped past this
+domain_memory = int(os.environ.get("RADAR_DOMAIN_MEMORY_MB", 1024)) * 2**20
+
+# publish loaded domains to memory-mapped files here, e.g. under /dev/shm,
+# for every worker to map instead of building its own copy
+shared_dir = os.environ.get("RADAR_SHARED_DIR")
+
+# bump when load_radar_data changes what a snapshot holds, so no worker
+# attaches a shared snapshot an older version of the app published
+snapshot_layout = 1
+
+# logo - we don't need os.path here, dash knows to parse from assets folder
+logo = "govuk-logotype-crown.png"
+
+# sunburst path, root first
+levels = [
+    "domain",
+    "level 1",
+    "level 2",
+    "level 3",
+    "level 4",
+    "level 5",
+    "level 6",
+    "level 7",
+]
+
+# columns shown on hover, in the order the hover template refers to them
+custom_data_columns = [
+    "Authentication retention",
+    "Identity retention",
+    "User experience retention",
+    "Analytics retention",
+    "Audit retention",
+    "Authentication Storage Technology",
+    "Identity Storage Technology",
+    "Analytics Storage Technology",
+    "Audit Storage Technology",
+]
+
+# the columns of each purpose, in picker order: its "y" flag, then its
+# retention and storage technology columns where it has them
+radar_schema = RadarSchema(
+    levels,
+    {
+        "Authentication": (
+            "Authentication",
+            "Authentication retention",
+            "Authentication Storage Technology",
+        ),
+        "Identity": (
+            "Identity",
+            "Identity retention",
+            "Identity Storage Technology",
+        ),
+        "User experience": (
+            "User experience",
+            "User experience retention",
+            None,
+        ),
+        "Analytics": (
+            "Analytics",
+            "Analytics retention",
+            "Analytics Storage Technology",
+        ),
+        "Audit": (
+            "Audit",
+            "Audit retention",
+            "Audit Storage Technology",
+        ),
+    },
+    custom_data_columns,
+    # User experience retention is filtered on, but its periods are not
+    # offered by the Retention picker
+    retention_picker=["Authentication", "Identity", "Analytics", "Audit"],
+)
+
 # =============================================================================
 # ingest assets and data
 # =============================================================================
 
-# read in the data radar file
-radar_df = pdAutoRead(radar_data_path)
-del radar_data_path
+def load_radar_data(domain=selected_domain):
+    """
+    Reads the data files of a domain and prepares everything the callbacks
+    derive from them, as one snapshot
+    Returns dict, with the files read listed under "sources"
+    """
+    # read in the configs
+    radar_data_config = pdAutoRead(radar_data_config_path)
+
+    # grab the radar data filename from configs based on selected domain
+    data_filename = radar_data_config[radar_data_config["domain"] == 
+        domain]["value"].values[0]
+
+    # add the radar data filepath, for any os
+    radar_data_path = os.path.join(os.getcwd(), "data", data_filename)
+
+    sources = [
+        radar_data_config_path,
+        radar_data_path,
+        radar_colours_path,
+        purpose_path,
+        radar_rules_path,
+    ]
 
-# read in the data radar colour scheme
-radar_colours = pdAutoRead(radar_colours_path)
-del radar_colours_path
-# dash sunburst will want a list of colours
-radar_colours = radar_colours["hex"].to_list()
+    # the worker that first loaded these files may have shared the result,
+    # which is then mapped rather than read and built again. Files are told
+    # apart by size and mtime, the rules also by content
+    signature = [file_signature(sources), file_digest(radar_rules_path)]
+    if shared_snapshots is not None:
+        snapshot = shared_snapshots.attach(domain, signature)
+        if snapshot is not None:
+            return snapshot
+
+    # read in the data radar file
+    # a parsed snapshot beside the source spares each worker re-parsing it.
+    # Only the columns the schema names are parsed, a chunk at a time, so a
+    # large export is never held in memory whole, and each chunk is checked
+    # against the schema as it arrives
+    radar_df = pdAutoRead(
+        radar_data_path,
+        cache=True,
+        usecols=radar_schema.source_columns,
+        dtype={col: "category" for col in radar_schema.category_columns},
+        chunksize=ingest_chunk_rows or None,
+        validate=radar_schema.validate,
+    )
 
-# logo - we don't need os.path here, dash knows to parse from assets folder
-logo = "govuk-logotype-crown.png"
+    # read in the data radar colour scheme
+    radar_colours = pdAutoRead(radar_colours_path)
+    # dash sunburst will want a list of colours
+    radar_colours = radar_colours["hex"].to_list()
+
+    # purpose of data collection, processing, and storage, in markdown format
+    # can be read as text, dash will convert to markdown for us 
+    with open(purpose_path,'r',newline='') as rf:
+        purpose = rf.read()
+
+    # -------------------------------------------------------------------------
+    # prepare data
+    # -------------------------------------------------------------------------
+
+    # to make the sunburst have a hollow centre label, add a column with domain
+    radar_df["domain"] = radar_data_config[radar_data_config["domain"] == 
+        domain]["domain"].values[0]
+
+    # convert plain text to dict so elements can be selected by index 
+    purpose = ast.literal_eval(purpose)
+
+    # hold the repeated names as categoricals, retention and storage technology
+    # columns sharing a dictionary each, and the purpose "y" flags as booleans,
+    # so each worker keeps a compact copy
+    radar_df = compact_frame(
+        radar_df,
+        radar_schema.flags.values(),
+        [radar_schema.retention_columns, radar_schema.storage_columns],
+    )
+
+    # index every column once, so callbacks filter with masks not row-wise
+    # apply, and pickers address their columns by position
+    radar_index = build_filter_index(radar_df, radar_schema)
+
+    # derive 'Storage Type' and any other ruled columns once, e.g. Ephemeral
+    # where a Storage Technology is "AWS Lambda", for every request to reuse
+    radar_rules = pdAutoRead(radar_rules_path)
+    radar_derived = derive_columns(
+        radar_df, compile_rules(radar_rules, radar_schema, radar_df.columns))
+    if storage_type_column not in radar_derived:
+        raise ValueError(
+            "Radar rules do not derive {}".format(storage_type_column))
+
+    # compile the hierarchy once, requests only count filtered rows per node,
+    # and roll up the purposes, longest retention and storage technologies
+    # under each node for the hover
+    radar_tree = build_radar_tree(
+        radar_df, levels, custom_data_columns, radar_schema)
+
+    # index the entity names once for the type-ahead search picker
+    radar_search = build_search_index(radar_df, radar_schema.search_columns)
+
+    # what the option pickers need, prepared once for every interaction to
+    # reuse
+    radar_facets = build_facet_engine(
+        radar_df, radar_index, radar_schema,
+        radar_derived[storage_type_column])
+
+    snapshot = {
+        "df": radar_df,
+        "colours": radar_colours,
+        "purpose": purpose,
+        "index": radar_index,
+        "derived": radar_derived,
+        "tree": radar_tree,
+        "search": radar_search,
+        "facets": radar_facets,
+        # version the data, so cached output is only reused for the same data
+        "version": dataset_version(
+            radar_df, radar_colours, radar_rules.to_dict("records")),
+        "sources": sources,
+    }
+    # what the snapshot holds in memory, its data, indexes, radar tree and
+    # picker tables, which RADAR_DOMAIN_MEMORY_MB budgets
+    snapshot["bytes"] = held_bytes(snapshot)
 
-# purpose of data collection, processing, and storage, in markdown format
-# can be read as text, dash will convert to markdown for us 
-with open(purpose_path,'r',newline='') as rf:
-    purpose = rf.read()
+    # published for the other workers, and used from the shared file here too
+    if shared_snapshots is not None:
+        snapshot = shared_snapshots.publish(domain, signature, snapshot)
+    return snapshot
 
 # =============================================================================
 # prepare data
 # =============================================================================
 
-# to make the sunburst have a hollow centre label, add a column with domain
-radar_df["domain"] = radar_data_config[radar_data_config["domain"] == 
-    selected_domain]["domain"].values[0]
+# snapshots shared between workers through memory-mapped files, if turned on,
+# kept apart by the schema and snapshot layout that built them
+shared_snapshots = SharedSnapshots(shared_dir, layout=[
+    snapshot_layout,
+    radar_schema.levels,
+    radar_schema.flags,
+    radar_schema.retention,
+    radar_schema.picker_retention,
+    radar_schema.storage,
+    radar_schema.hover_columns,
+    storage_type_column,
+]) if shared_dir else None
+
+# a snapshot of the data per domain, loaded on first use and kept while
+# memory allows. Each is rebuilt in the background and swapped in whole when
+# any of its files change, callbacks take it once per request. The watcher
+# is started by the process that serves requests: gunicorn.conf.py starts
+# it in each worker, as a preloading master's threads do not survive a fork
+radar_domains = SnapshotLRU(
+    load_radar_data, max_bytes=domain_memory, interval=reload_interval)
+
+# the default domain is ready before the first request
+radar_domains.get(selected_domain)
+
+# rendered figures are cached per worker, and optionally in a directory
+# shared by every gunicorn worker
+figure_cache = FigureCache(
+    max_bytes=int(os.environ.get("RADAR_FIGURE_CACHE_MB", 64)) * 2**20,
+    directory=os.environ.get("RADAR_FIGURE_CACHE_DIR"),
+    max_dir_bytes=int(os.environ.get("RADAR_FIGURE_CACHE_DIR_MB", 512))
+    * 2**20,
+)
 
-# convert plain text to dict so elements can be selected by index 
-purpose = ast.literal_eval(purpose)
+# views without a search may have been rendered at build time
+prerendered = (PrerenderedFigures(prerender_dir, progressive_levels)
+               if prerender_dir else None)
+
+# background jobs leave their results in a folder every worker reads, as the
+# browser's polls may reach any of them
+background_jobs = background_mode and not clientside_mode
+background_dir = os.environ.get(
+    "RADAR_BACKGROUND_DIR",
+    os.path.join(tempfile.gettempdir(), "radar-background"))
+if background_jobs:
+    # dash[diskcache], checked on start up rather than on the first job
+    import diskcache
+    import multiprocess
+    import psutil
 
 # =============================================================================
 # initialise app
@@ -115,6 +401,23 @@ app = dash.Dash(
     title='GOV.UK One Login Data Radar'
 )
 
+
+def start_background_jobs():
+    """
+    Opens the store of background job results in this process. Its sqlite
+    connection must not be shared across a fork, so gunicorn.conf.py calls
+    this in each worker after it is forked
+    """
+    if background_jobs and app._background_manager is None:
+        # dash looks the manager up on every request, and registers the
+        # background callbacks declared before it with it
+        app._background_manager = dash.DiskcacheManager(
+            diskcache.Cache(background_dir),
+            # results nobody polled for, as their page was closed
+            expire=600,
+        )
+
+
 # =============================================================================
 # bootstrap components
 # =============================================================================
@@ -167,6 +470,23 @@ title = dbc.Container(
 
 controls = dbc.Card(
     [
+        html.Div(
+            [
+                # DOMAIN
+                dbc.Label("Domain"),
+                dcc.Dropdown(
+                    id="domain-picker",
+                    options=[
+                        {"label": domain, "value": domain}
+                        for domain in radar_domain_names
+                    ],
+                    value=selected_domain,
+                    clearable=False,
+                ),
+            ],
+            # only worth showing when there is a choice
+            hidden=len(radar_domain_names) < 2,
+        ),
         html.Div(
             [
                 #SEARCH
@@ -200,14 +520,10 @@ controls = dbc.Card(
                 dbc.Label("Purpose"),
                 dcc.Dropdown(
                     id="purpose-picker",
-                    # TODO set these role options in user configs
-                    options=[
-                        {"label": "Show all", "value": "all"},
-                        {"label": "Authentication", "value": "Authentication"},
-                        {"label": "Identity", "value": "Identity"},
-                        {"label": "User experience", "value": "User experience"},
-                        {"label": "Analytics", "value": "Analytics"},
-                        {"label": "Audit", "value": "Audit"},
+                    # the purposes of the schema, in its order
+                    options=[{"label": "Show all", "value": "all"}] + [
+                        {"label": purpose, "value": purpose}
+                        for purpose in radar_schema.purposes
                     ],
                     value="all",
                     clearable=False,
@@ -231,10 +547,13 @@ controls = dbc.Card(
                 dbc.Label("Storage Type"),
                 dcc.Dropdown(
                     id="storage-type-filter",
-                    options=[
-                        {"label": "Show all", "value": "all"},
-                        {"label": "Ephemeral data", "value": "ephemeral"},
-                        {"label": "Persisted data", "value": "persisted"},
+                    # the values the rules derive, until the options
+                    # follow the other pickers
+                    options=[{"label": "Show all", "value": "all"}] + [
+                        {"label": "{} data".format(value),
+                         "value": value.lower()}
+                        for value in radar_domains.get(selected_domain)[
+                            "derived"][storage_type_column]["values"]
                     ],
                     value="all",  # Default selection
                     clearable=False,
@@ -319,6 +638,15 @@ app.layout = dbc.Container(
             align="center",
         ),
         dbc.Row(purpose_row),
+        # client-side mode: where to fetch the data bundle, and which is loaded
+        dcc.Store(id="radar-bundle-url"),
+        dcc.Store(id="radar-bundle"),
+        # slim mode: the packed radar figure, expanded in the browser
+        dcc.Store(id="radar-figure-slim"),
+        # progressive mode: the node whose branch is drawn past the top rings
+        dcc.Store(id="radar-expanded"),
+        # which inputs the radar in the browser was last fully drawn for
+        dcc.Store(id="radar-drawn"),
     ],
     fluid=True,
 )
@@ -326,417 +654,399 @@ app.layout = dbc.Container(
 # =============================================================================
 # callbacks
 # =============================================================================
-# Update data radar
-@app.callback(
-    Output("data-radar", "figure"),
-    Input("search-picker", "value"),
-    Input("colour-picker", "value"),
-    Input("purpose-picker", "value"),
-    Input("retention-picker", "value"),
-    Input("storage-technology-picker", "value"),
-    Input("storage-type-filter", "value"),
-    Input("num-levels", "value"),
-)
-def pop_data_radar(
-    searchValue,
-    selectedView,
-    selectedPurpose,
-    selectedRetention,
-    selectedStorageTechnology,
-    selectedStorageType,
-    selectedNumLevels,
-):
-
 
-#The below functions apply conditional transformations to the values in the df 
-    #based on the dimensions enabling independent filtering by each criterion:
-    df = radar_df.copy()
-
-    # Check for Storage Technology column -> create 'Storage Type' column
-    storage_column_name = None
-    for col in df.columns:
-        if "storage technology" in col.lower():
-            storage_column_name = col
-            break
-
-    # Apply search filter to columns 1 to 7 only
-    if searchValue:
-        search_columns = df.columns[0:8]
-        df = df[df[search_columns].apply(lambda row: searchValue in row.values, axis=1)]
-
-    # Create 'Storage Type' based on "AWS Lambda" (Ephemeral) or not (Persisted)
-    if storage_column_name:
-        df["Storage Type"] = df[storage_column_name].apply(
-            lambda x: "Ephemeral" if "AWS Lambda" in str(x) else "Persisted"
-        )
-    else:
-        df["Storage Type"] = "Persisted"  # Default to Persisted if no 'Storage Technology' column found
+def server_callback(*args, **kwargs):
+    """
+    app.callback for outputs that client-side mode computes in the browser
+    In that mode the function is left unregistered
+    """
+    if clientside_mode:
+        return lambda func: func
+    return app.callback(*args, **kwargs)
 
-    # Filter by Purpose (if selected)
-    if selectedPurpose and selectedPurpose != "all":
-        df = df[df[selectedPurpose] == "y"]
 
-    # Filter by Retention (if selected)
-    if selectedRetention and selectedRetention != "all":
-        retention_cols = [col for col in df.columns if "retention" in col.lower()]
-        df = df[df[retention_cols].apply(lambda row: selectedRetention in row.values, axis=1)]
+def background_callback(*args, **kwargs):
+    """
+    server_callback for the renders a burst of input changes queues
+    In background mode each request starts a job that waits out
+    debounce_seconds first, and the browser has the job of the previous
+    request for the same outputs terminated, so only the latest is computed
+    The function itself is returned as is, to be called directly
+    """
+    if not background_jobs:
+        return server_callback(*args, **kwargs)
 
-    # Filter by Storage Technology (if selected)
-    if selectedStorageTechnology and selectedStorageTechnology != "all":
-        storage_cols = [col for col in df.columns if "storage technology" in col.lower()]
-        df = df[df[storage_cols].apply(lambda row: selectedStorageTechnology in row.values, axis=1)]
+    def register(func):
+        @functools.wraps(func)
+        def debounced(*func_args):
+            time.sleep(debounce_seconds)
+            return func(*func_args)
 
-    # Filter by Storage Type (if selected), with case-insensitive comparison
-    if selectedStorageType and selectedStorageType != "all":
-        df = df[df["Storage Type"].str.lower() == selectedStorageType.lower()]
+        # polled often, a render takes well under a second
+        app.callback(*args, background=True, interval=100, **kwargs)(
+            debounced)
+        return func
 
-    # If no data is available after filtering = return a placeholder page
-    if df.empty:
-        return px.scatter(title="No data available for selected filters")
-
-    levels = [
-        "domain",
-        "level 1",
-        "level 2",
-        "level 3",
-        "level 4",
-        "level 5",
-        "level 6",
-        "level 7",
-    ]
+    return register
 
-    # Define custom data columns correctly
-    custom_data_columns = [
-        "Authentication retention",
-        "Identity retention",
-        "User experience retention",
-        "Analytics retention",
-        "Audit retention",
-        "Authentication Storage Technology",
-        "Identity Storage Technology",
-        "Analytics Storage Technology",
-        "Audit Storage Technology",
-    ]
 
-    # Ensure data has all necessary columns
-    df[custom_data_columns] = df[custom_data_columns].fillna("N/A")
+def domain_data(selectedDomain):
+    """
+    The current snapshot of the picked domain, the default one if the
+    domain is not in the configs
+    """
+    if selectedDomain not in radar_domain_names:
+        selectedDomain = selected_domain
+    return radar_domains.get(selectedDomain)
 
-    if selectedView == "Default":
-        fig = px.sunburst(
-            df,
-            path=levels[:selectedNumLevels],
-            color_discrete_sequence=radar_colours,
-            custom_data=custom_data_columns,  # Use the correct column list
-        )
 
+def style_radar(fig):
+    """
+    Applies the radar hover template, font and layout to a sunburst figure
+    dict, in place
+    Returns the figure
+    """
     # Add hover information
-    fig.update_traces(
-        hovertemplate="<br>".join(
-            [
-                "<b><span style='font-size:18px;'>%{label}</span></b>",
-                "<i style='font-size:14px; text-decoration: underline;'>Retention Period & Data Storage Technology:</i><br>",
-                "<b>Authentication:</b> %{customdata[0]} | <b>Storage:</b> %{customdata[5]}<br>",
-                "<b>Identity:</b> %{customdata[1]} | <b>Storage:</b> %{customdata[6]}<br>",
-                "<b>User Experience:</b> %{customdata[2]}<br>",
-                "<b>Analytics:</b> %{customdata[3]} | <b>Storage:</b> %{customdata[7]}<br>",
-                "<b>Audit:</b> %{customdata[4]} | <b>Storage:</b> %{customdata[8]}<br>",
-            ]
-        ),
-        insidetextorientation="auto",
-    )
+    for trace in fig["data"]:
+        trace.update(
+            hovertemplate="<br>".join(
+                [
+                    "<b><span style='font-size:18px;'>%{label}</span></b>",
+                    "<i style='font-size:14px; text-decoration: underline;'>Retention Period & Data Storage Technology:</i><br>",
+                    "<b>Authentication:</b> %{customdata[0]} | <b>Storage:</b> %{customdata[5]}<br>",
+                    "<b>Identity:</b> %{customdata[1]} | <b>Storage:</b> %{customdata[6]}<br>",
+                    "<b>User Experience:</b> %{customdata[2]}<br>",
+                    "<b>Analytics:</b> %{customdata[3]} | <b>Storage:</b> %{customdata[7]}<br>",
+                    "<b>Audit:</b> %{customdata[4]} | <b>Storage:</b> %{customdata[8]}<br>",
+                    "<i style='font-size:14px; text-decoration: underline;'>"
+                    "Across %{value} Data Entities:</i><br>",
+                    "<b>Purposes:</b> %{customdata[9]}<br>",
+                    "<b>Longest Retention:</b> %{customdata[10]}<br>",
+                    "<b>Storage Technologies:</b> %{customdata[11]}<br>",
+                ]
+            ),
+            insidetextorientation="auto",
+        )
 
     # Update font and layout
-    fig.update_layout(
-        font_family="DM Sans",
-        uniformtext=dict(minsize=8, mode="hide"),
-    )
+    fig["layout"].setdefault("font", {})["family"] = "DM Sans"
+    fig["layout"]["uniformtext"] = dict(minsize=8, mode="hide")
 
     return fig
 
 
-def filter_data(selectedPurpose, selectedRetention, selectedStorageTechnology):
+def triggered_only(*component_ids):
     """
-    Filters the dataset based on the selected Purpose, Retention, and Storage Technology.
-    Ensures filtering works across multiple columns dynamically.
+    Whether this callback run was triggered by these inputs alone
+    False on the initial call, and when called outside of dash
     """
-    filtered_df = radar_df.copy()
+    try:
+        triggered = dash.ctx.triggered_prop_ids
+    except dash.exceptions.MissingCallbackContextException:
+        return False
+    return bool(triggered) and set(triggered.values()) <= set(component_ids)
 
-    # Apply Purpose Filter
-    if selectedPurpose and selectedPurpose != "all":
-        filtered_df = filtered_df[filtered_df[selectedPurpose] == "y"]
 
-    # Apply Retention Filter
-    if selectedRetention and selectedRetention != "all":
-        retention_cols = [col for col in radar_df.columns if "retention" in col.lower()]
-        filtered_df = filtered_df[filtered_df[retention_cols].apply(lambda row: selectedRetention in row.values, axis=1)]
-
-    # Apply Storage Technology Filter
-    if selectedStorageTechnology and selectedStorageTechnology != "all":
-        storage_cols = [col for col in radar_df.columns if "storage technology" in col.lower()]
-        filtered_df = filtered_df[filtered_df[storage_cols].apply(lambda row: selectedStorageTechnology in row.values, axis=1)]
-
-    return filtered_df
+def focus_radar(figure, selectedNumLevels):
+    """
+    The figure dict showing as many rings as the Focus slider asks for
+    """
+    return dict(figure, data=[
+        dict(trace, maxdepth=selectedNumLevels)
+        if trace.get("type") == "sunburst" else trace
+        for trace in figure["data"]
+    ])
 
-################################################################################
-# Update Search Picker
-################################################################################
-@app.callback(
-    Output("search-picker", "options"),
-    Input("search-picker", "value"),
-)
-def update_search_options(search_value):
-    # Get unique values across all relevant columns (Level 1 to Level 7)
-    unique_values = pd.concat([radar_df[col] for col in radar_df.columns if 'level' in col]).unique()
 
-    if search_value:
-        filtered_values = [value for value in unique_values if search_value.lower() in str(value).lower()]
-    else:
-        filtered_values = unique_values
+def radar_cache_key(radar, searchValue, selectedView, cutLevels, expanded,
+                    *filters):
+    """
+    Figure cache key of the radar drawn from a snapshot for these inputs
+    filters are the Purpose, Retention, Storage Technology and Storage Type
+    picker values
+    """
+    return FigureCache.key(
+        radar["version"],
+        (searchValue or None, selectedView, cutLevels, expanded)
+        + canonical_inputs(*filters),
+    )
 
-    return [{'label': str(value), 'value': value} for value in filtered_values]
 
-################################################################################
-# Update Purpose Picker
-################################################################################
-@app.callback(
-    Output("purpose-picker", "options"),
-    Input("storage-technology-picker", "value"),
-    Input("retention-picker", "value"),  # Update Purpose dropdown based on selected filters
-    Input("search-picker", "value")  # Trigger update when search value changes
-)
-def update_purpose_options(selectedStorageTechnology, selectedRetention, search_value):
-    df_filtered = radar_df.copy()  # Copy the dataset
-
-    # Apply search filter if a search value is provided
-    if search_value:
-        search_columns = df_filtered.columns[0:8]  # Consider only the first 8 columns for search
-        df_filtered = df_filtered[df_filtered[search_columns].apply(lambda row: search_value in row.values, axis=1)]
-
-    # If no data remains after applying the search filter
-    if df_filtered.empty:
-        return [{"label": "No data found", "value": "none"}]
-
-    # Define the mapping of purposes to their respective columns
-    purpose_column_mapping = {
-        "Authentication": "Authentication",
-        "Audit": "Audit",
-        "Identity": "Identity",
-        "Analytics": "Analytics",
-        "User experience": "User experience"
-    }
+def radar_mask(radar, searchValue, selectedPurpose, selectedRetention,
+               selectedStorageTechnology, selectedStorageType):
+    """
+    Boolean mask of the snapshot rows the radar shows for these filters
+    """
+    # Search (columns 1 to 7 only), Purpose, Retention and Storage Technology
+    # filters are intersected as one mask over the precomputed index
+    mask = filter_mask(
+        radar["index"],
+        searchValue,
+        selectedPurpose,
+        selectedRetention,
+        selectedStorageTechnology,
+    )
 
-    # Initialise purpose options with "Show All"
-    purpose_options = [{"label": "Show All", "value": "all"}]
+    # Filter by Storage Type (if selected), with case-insensitive comparison,
+    # as derived from the first Storage Technology column alone
+    if selectedStorageType and selectedStorageType != "all":
+        mask &= derived_rows(
+            radar["derived"][storage_type_column], selectedStorageType,
+            radar_schema.radar_storage_column(radar["df"].columns))
+    return mask
 
-    # If a Storage Technology filter is selected, filter by that
-    if selectedStorageTechnology and selectedStorageTechnology != "all":
-        storage_cols = [col for col in df_filtered.columns if "storage technology" in col.lower()]
-        df_filtered = df_filtered[df_filtered[storage_cols].apply(lambda row: selectedStorageTechnology in row.values, axis=1)]
 
-    # If a Retention filter is selected, apply it
-    if selectedRetention and selectedRetention != "all":
-        retention_cols = [col for col in df_filtered.columns if "retention" in col.lower()]
-        df_filtered = df_filtered[df_filtered[retention_cols].apply(lambda row: selectedRetention in row.values, axis=1)]
+def no_data_figure():
+    """
+    Placeholder shown when the filters leave no rows
+    """
+    # plotly.express is slow to import and only needed here
+    import plotly.express as px
 
-    # If no data remains after applying filters
-    if df_filtered.empty:
-        return [{"label": "No data found", "value": "none"}]
+    return px.scatter(title="No data available for selected filters")
 
-    # Initialise a set to store the purposes that match the filters
-    filtered_purposes = set()
 
-    # Check each purpose group and see if there is any data that matches the filters
-    for purpose, column in purpose_column_mapping.items():
-        if column in df_filtered.columns:
-            # Only include purposes where the filtered DataFrame contains matching data
-            if df_filtered[df_filtered[column] == "y"].shape[0] > 0:
-                filtered_purposes.add(purpose)
+def restyle_radar(radar, selectedView, selectedNumLevels):
+    """
+    Patch of the radar already in the browser for the Colours and Focus
+    pickers, as radar_output would send it
+    Only valid while that radar was drawn for the other inputs as they are
+    """
+    patch = dash.Patch()
+    figure = patch["figure"] if slim_figures else patch
+    if selectedView == "Default":
+        figure["layout"]["sunburstcolorway"] = radar["colours"]
+    figure["data"][0]["maxdepth"] = selectedNumLevels
+    return patch
 
-    # If no filtered purposes are found, return "No data found"
-    if not filtered_purposes:
-        return [{"label": "No data found", "value": "none"}]
 
-    # Add filtered purpose options to the dropdown
-    purpose_options += [{"label": purpose, "value": purpose} for purpose in filtered_purposes]
+def radar_output(figure):
+    """
+    The radar figure dict as sent to the browser, packed in slim mode
+    """
+    if slim_figures:
+        return slim_figure(figure)
+    return figure
 
-    return purpose_options
 
-################################################################################
-# Update Retention Picker 
-################################################################################
-@app.callback(
-    Output("retention-picker", "options"),
-    Input("purpose-picker", "value"),  # Update Retention dropdown based on selected Purpose
-    Input("search-picker", "value")  # Trigger update when search value changes
+# Update data radar
+@background_callback(
+    Output("radar-figure-slim", "data") if slim_figures
+    else Output("data-radar", "figure"),
+    Output("radar-drawn", "data"),
+    Input("search-picker", "value"),
+    Input("colour-picker", "value"),
+    Input("purpose-picker", "value"),
+    Input("retention-picker", "value"),
+    Input("storage-technology-picker", "value"),
+    Input("storage-type-filter", "value"),
+    Input("num-levels", "value"),
+    Input("domain-picker", "value"),
+    Input("radar-expanded", "data"),
+    State("radar-drawn", "data"),
 )
-def update_retention_options(selectedPurpose, search_value):
-    df_filtered = radar_df.copy()  # Copy the dataset
-
-    # Apply search filter if a search value is provided
-    if search_value:
-        search_columns = df_filtered.columns[0:8]
-        df_filtered = df_filtered[df_filtered[search_columns].apply(lambda row: search_value in row.values, axis=1)]
-
-    # Define mapping of purposes to their respective retention columns
-    retention_column_mapping = {
-        "Authentication": "Authentication retention",
-        "Audit": "Audit retention",
-        "Identity": "Identity retention",
-        "Analytics": "Analytics retention"
-    }
+def pop_data_radar(
+    searchValue,
+    selectedView,
+    selectedPurpose,
+    selectedRetention,
+    selectedStorageTechnology,
+    selectedStorageType,
+    selectedNumLevels,
+    selectedDomain=None,
+    expandedNode=None,
+    drawnKey=None,
+):
+    """
+    The radar figure, and the key of the inputs it was drawn for, which the
+    browser sends back as drawnKey
+    Returns (figure, key)
+    """
 
-    # Initialise retention options with "Show All"
-    retention_options = [{"label": "Show All", "value": "all"}]
+    # The whole request works on the data as it was when it started
+    radar = domain_data(selectedDomain)
+
+    # Progressive mode draws the top rings, and the branch clicked into
+    expanded = None
+    if progressive_levels:
+        expanded = find_node(radar["tree"], expandedNode)
+
+    # Focus is applied in the browser, as the sunburst maxdepth
+    cut_levels = selectedNumLevels if progressive_levels else len(levels)
+
+    # what the radar shows apart from its colours
+    drawn_key = radar_cache_key(
+        radar,
+        searchValue,
+        None,
+        cut_levels,
+        expanded,
+        selectedPurpose,
+        selectedRetention,
+        selectedStorageTechnology,
+        selectedStorageType,
+    )
 
-    # If no Purpose is selected, show ALL unique retention values
-    if not selectedPurpose or selectedPurpose == "all":
-        all_retention_values = set()
-        for col in retention_column_mapping.values():
-            if col in df_filtered.columns:
-                all_retention_values.update(df_filtered[col].dropna().unique())
+    # Colours and Focus only restyle the radar already drawn, which holds
+    # every ring unless progressive mode cut it at the Focus depth. The
+    # browser drops a full render superseded by a newer request, so the
+    # radar it shows may be from before the last filter change, and is then
+    # drawn again
+    if drawnKey == drawn_key and triggered_only(
+            "colour-picker", *(() if progressive_levels else ("num-levels",))):
+        note(cache="patch")
+        return (restyle_radar(radar, selectedView, selectedNumLevels),
+                dash.no_update)
+
+    # Serve the figure already rendered for these inputs on this data
+    cache_key = radar_cache_key(
+        radar,
+        searchValue,
+        selectedView,
+        cut_levels,
+        expanded,
+        selectedPurpose,
+        selectedRetention,
+        selectedStorageTechnology,
+        selectedStorageType,
+    )
+    cached_figure = figure_cache.get(cache_key)
+    if cached_figure is not None:
+        note(cache="hit")
+        return (radar_output(focus_radar(cached_figure, selectedNumLevels)),
+                drawn_key)
+
+    # or the one rendered at build time, only done for views without a search
+    if prerendered is not None and not searchValue and expanded is None:
+        cached_figure = prerendered.get(radar["version"], cache_key)
+        if cached_figure is not None:
+            note(cache="prerendered")
+            return (radar_output(focus_radar(cached_figure,
+                                             selectedNumLevels)),
+                    drawn_key)
 
-        # Add all unique retention values to the dropdown options
-        retention_options += [{"label": value, "value": value} for value in sorted(all_retention_values)]
-        return retention_options
+#The below functions apply conditional transformations to the values in the df 
+    #based on the dimensions enabling independent filtering by each criterion:
+    mask = radar_mask(
+        radar,
+        searchValue,
+        selectedPurpose,
+        selectedRetention,
+        selectedStorageTechnology,
+        selectedStorageType,
+    )
+    note(rows=int(np.count_nonzero(mask)), cache="miss")
 
-    # If a Purpose is selected, find the corresponding retention column
-    retention_column_name = retention_column_mapping.get(selectedPurpose)
-    if not retention_column_name or retention_column_name not in df_filtered.columns:
-        return retention_options  # Return only "Show All" if column is missing
+    # If no data is available after filtering = return a placeholder page
+    if not mask.any():
+        return (radar_output(figure_cache.set(cache_key, no_data_figure())),
+                drawn_key)
 
-    # Filter DataFrame to include only rows where the selected Purpose is present
-    df_filtered = df_filtered[df_filtered[selectedPurpose] == "y"]
+    # The precomputed tree, cut off at that many rings
+    if selectedView == "Default":
+        fig = sunburst_figure(
+            radar["tree"], mask, cut_levels, radar["colours"],
+            progressive_levels or None, expanded)
+
+    return (radar_output(focus_radar(
+        figure_cache.set(cache_key, style_radar(fig)), selectedNumLevels)),
+        drawn_key)
 
-    # Get unique retention values in the filtered data
-    unique_retention_values = df_filtered[retention_column_name].dropna().unique()
 
-    # Add filtered retention options
-    retention_options += [{"label": value, "value": value} for value in sorted(unique_retention_values)]
-    
-    return retention_options
+################################################################################
+# Expand a Radar Branch
+################################################################################
+if progressive_levels:
+
+    @server_callback(
+        Output("radar-expanded", "data"),
+        Input("data-radar", "clickData"),
+        Input("domain-picker", "value"),
+        State("radar-expanded", "data"),
+        State("num-levels", "value"),
+    )
+    def expand_radar_node(
+        clickData, selectedDomain, expandedNode, selectedNumLevels):
+        # Another domain starts from its top rings
+        if dash.ctx.triggered_id == "domain-picker" or not clickData:
+            return None
+
+        tree = domain_data(selectedDomain)["tree"]
+        node = find_node(tree, clickData["points"][0].get("id"))
+        if node is None:
+            return dash.no_update
+
+        # The centre of the radar is the expanded node, or the root before
+        # any is: clicking it goes back up a ring
+        centre = find_node(tree, expandedNode)
+        if node == centre or tree["depths"][node] == 0:
+            parent = parent_node(tree, node)
+            if parent is None or tree["depths"][parent] == 0:
+                return None
+            return tree["ids"][parent]
+
+        # Nothing to fetch below a leaf, or past the Focus depth
+        if (tree["depths"][node] >= selectedNumLevels - 1
+                or not (tree["parents"] == node).any()):
+            return dash.no_update
+        return tree["ids"][node]
 
 ################################################################################
-# Update Storage Technology Picker 
+# Update Search Picker
 ################################################################################
 @app.callback(
-    Output("storage-technology-picker", "options"),
-    Input("purpose-picker", "value"),  # When Purpose is selected, update options
-    Input("storage-type-filter", "value"),  # When Storage Type is selected, update options
-    Input("search-picker", "value")  # Apply search filtering
+    Output("search-picker", "options"),
+    Input("search-picker", "search_value"),  # Match as the user types
+    State("search-picker", "value"),
+    Input("domain-picker", "value"),
 )
-def update_storage_technology_options(selectedPurpose, selectedStorageType, search_value):
-    df_filtered = radar_df.copy()  # Work on a copy of the dataset
-
-    # Apply search filter if a search value is provided
-    if search_value:
-        search_columns = df_filtered.columns[0:8]  # Consider only first 8 columns for search
-        df_filtered = df_filtered[df_filtered[search_columns].apply(lambda row: search_value in row.values, axis=1)]
-
-    # Define the mapping of purposes to their respective storage technology columns
-    storage_column_mapping = {
-        "Authentication": "Authentication Storage Technology",
-        "Audit": "Audit Storage Technology",
-        "Identity": "Identity Storage Technology",
-        "Analytics": "Analytics Storage Technology"
-    }
+def update_search_options(search_text, search_value, selectedDomain=None):
+    # Ranked matches across Level 1 to Level 7, capped to search_limit
+    matches = search(
+        domain_data(selectedDomain)["search"], search_text, search_limit)
 
-    # Initialise dropdown options with "Show All"
-    storage_technology_options = [{"label": "Show All", "value": "all"}]
-
-    # If no Purpose is selected, get all available storage technologies
-    if not selectedPurpose or selectedPurpose == "all":
-        all_storage_technologies = set()
-        for col in storage_column_mapping.values():
-            if col in df_filtered.columns:
-                all_storage_technologies.update(df_filtered[col].dropna().unique())
-
-        # Apply Storage Type filter if selected
-        if selectedStorageType and selectedStorageType != "all":
-            df_filtered["Storage Type"] = df_filtered.apply(
-                lambda row: "Ephemeral" if "AWS Lambda" in str(row[storage_column_mapping.values()]) else "Persisted",
-                axis=1
-            )
-            all_storage_technologies = df_filtered[df_filtered["Storage Type"].str.lower() == selectedStorageType.lower()][
-                storage_column_mapping.values()].stack().unique()
-
-        storage_technology_options += [{"label": tech, "value": tech} for tech in sorted(all_storage_technologies)]
-        return storage_technology_options
-
-    # If a Purpose is selected, filter accordingly
-    storage_column_name = storage_column_mapping.get(selectedPurpose)
-    if not storage_column_name or storage_column_name not in df_filtered.columns:
-        return storage_technology_options  # Return only "Show All" if column is missing
-
-    # Filter DataFrame by Purpose
-    df_filtered = df_filtered[df_filtered[selectedPurpose] == "y"]
-
-    # Apply Storage Type filter if selected
-    if selectedStorageType and selectedStorageType != "all":
-        df_filtered["Storage Type"] = df_filtered.apply(
-            lambda row: "Ephemeral" if "AWS Lambda" in str(row[storage_column_name]) else "Persisted",
-            axis=1
-        )
-        df_filtered = df_filtered[df_filtered["Storage Type"].str.lower() == selectedStorageType.lower()]
-
-    # Get unique storage technologies from the filtered data
-    unique_storage_technologies = df_filtered[storage_column_name].dropna().unique()
+    # Keep the selected entity available, so the dropdown can still show it
+    if search_value is not None and search_value not in matches:
+        matches = [search_value] + matches
 
-    # Convert to dropdown options
-    storage_technology_options += [{"label": tech, "value": tech} for tech in sorted(unique_storage_technologies)]
-    
-    return storage_technology_options
+    return [{'label': str(value), 'value': value} for value in matches]
 
 ################################################################################
-# Update Storage Type Picker 
+# Update Purpose, Retention, Storage Technology and Storage Type Pickers
 ################################################################################
-@app.callback(
-    Output("storage-type-filter", "options"),  # Update Storage Type dropdown
+@background_callback(
+    Output("purpose-picker", "options"),
+    Output("retention-picker", "options"),
+    Output("storage-technology-picker", "options"),
+    Output("storage-type-filter", "options"),
+    Input("search-picker", "value"),  # Every picker follows the search
     Input("purpose-picker", "value"),
+    Input("retention-picker", "value"),
     Input("storage-technology-picker", "value"),
-    Input("search-picker", "value")
+    Input("storage-type-filter", "value"),
+    Input("domain-picker", "value"),
 )
-def update_storage_type_options(selectedPurpose, selectedStorageTechnology, search_value):
-    df_filtered = radar_df.copy()
-
-    # Apply search filter if a search value is provided
-    if search_value:
-        search_columns = df_filtered.columns[0:8]
-        df_filtered = df_filtered[df_filtered[search_columns].apply(lambda row: search_value in row.values, axis=1)]
-
-    # Define the mapping of purposes to their respective storage technology columns
-    storage_column_mapping = {
-        "Authentication": "Authentication Storage Technology",
-        "Audit": "Audit Storage Technology",
-        "Identity": "Identity Storage Technology",
-        "Analytics": "Analytics Storage Technology"
-    }
-
-    storage_type_options = [{"label": "Show All", "value": "all"}]
-
-    if selectedPurpose and selectedPurpose != "all":
-        storage_column_name = storage_column_mapping.get(selectedPurpose)
-        if storage_column_name in df_filtered.columns:
-            df_filtered = df_filtered[df_filtered[selectedPurpose] == "y"]
-
-    if selectedStorageTechnology and selectedStorageTechnology != "all":
-        storage_tech_columns = storage_column_mapping.values()
-        df_filtered = df_filtered[df_filtered[storage_tech_columns].apply(
-            lambda row: selectedStorageTechnology in row.values, axis=1
-        )]
-
-    # Dynamically determine Storage Type based on Storage Technology
-    df_filtered["Storage Type"] = df_filtered.apply(
-        lambda row: "Ephemeral" if any("AWS Lambda" in str(row[col]) for col in storage_column_mapping.values()) else "Persisted",
-        axis=1
+def update_facet_options(
+    search_value,
+    selectedPurpose,
+    selectedRetention,
+    selectedStorageTechnology,
+    selectedStorageType,
+    selectedDomain=None,
+):
+    # Each picker only offers values still available under the other
+    # pickers' selections: Purpose follows Storage Technology and Retention,
+    # Retention follows Purpose, Storage Technology follows Purpose and
+    # Storage Type, and Storage Type follows Purpose and Storage Technology
+    return facet_options(
+        domain_data(selectedDomain)["facets"],
+        search_value,
+        selectedPurpose,
+        selectedRetention,
+        selectedStorageTechnology,
+        selectedStorageType,
     )
 
-    unique_storage_types = df_filtered["Storage Type"].dropna().unique()
-
-    # Convert to dropdown options
-    storage_type_options += [{"label": stype, "value": stype.lower()} for stype in sorted(unique_storage_types)]
-    
-    return storage_type_options
-
 ################################################################################
 # Update Purpose Title
 ################################################################################
@@ -746,16 +1056,10 @@ def update_storage_type_options(selectedPurpose, selectedStorageTechnology, sear
 )
 def update_purpose_title(selectedPurpose):
 
-    purposeNames = {
-        "all": "",
-        "Authentication": "Authentication",
-        "Identity": "Identity",
-        "User experience": "User experience",
-        "Analytics": "Analytics",
-        "Audit": "Audit",
-    }
+    if selectedPurpose in radar_schema.flags:
+        return selectedPurpose
 
-    return purposeNames.get(selectedPurpose, "")
+    return ""
 
 ################################################################################
 # Update Purpose Description
@@ -789,15 +1093,156 @@ def hide_purpose_row(selectedPurpose):
 
     return {"display": "none"}
 
+################################################################################
+# Client-side mode
+################################################################################
+if clientside_mode:
+    client_bundles = {}
+    client_bundles_lock = threading.Lock()
+
+    def client_bundle(radar):
+        """
+        The client-side data bundle of a snapshot, built on first use
+        Returns (version, bytes)
+        """
+        with client_bundles_lock:
+            if radar["version"] not in client_bundles:
+                # the unfiltered radar carries the styling every client
+                # render reuses
+                client_bundles[radar["version"]] = build_client_bundle(
+                    radar["df"],
+                    radar["tree"],
+                    radar["derived"][storage_type_column],
+                    radar_schema,
+                    style_radar(sunburst_figure(
+                        radar["tree"], filter_mask(radar["index"]),
+                        len(levels), radar["colours"])),
+                    no_data_figure(),
+                )
+                # pages opened before the last reload still fetch theirs
+                while len(client_bundles) > 2 * max(
+                        len(radar_domains.keys()), 1):
+                    del client_bundles[next(iter(client_bundles))]
+            return client_bundles[radar["version"]]
+
+    client_bundle(domain_data(selected_domain))
+
+    @app.server.route("/radar-data/<version>.json")
+    def serve_client_bundle(version):
+        # pages ask for the current data of a domain, and are sent to its
+        # versioned url
+        if version == "current":
+            bundle_version, _ = client_bundle(
+                domain_data(flask.request.args.get("domain")))
+            response = flask.redirect(app.get_relative_path(
+                "/radar-data/{}.json".format(bundle_version)))
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+
+        # the url is content addressed, so browsers may cache it for good
+        for bundle_version, bundle in list(client_bundles.values()):
+            if version == bundle_version:
+                response = flask.Response(
+                    bundle, mimetype="application/json")
+                response.headers["Cache-Control"] = (
+                    "public, max-age=31536000, immutable")
+                return response
+        flask.abort(404)
+
+    app.layout["radar-bundle-url"].data = app.get_relative_path(
+        "/radar-data/current.json")
+
+    app.clientside_callback(
+        ClientsideFunction(namespace="radar", function_name="load_bundle"),
+        Output("radar-bundle", "data"),
+        Input("radar-bundle-url", "data"),
+        Input("domain-picker", "value"),
+    )
+    app.clientside_callback(
+        ClientsideFunction(namespace="radar", function_name="pop_data_radar"),
+        Output("data-radar", "figure"),
+        Input("radar-bundle", "data"),
+        Input("search-picker", "value"),
+        Input("colour-picker", "value"),
+        Input("purpose-picker", "value"),
+        Input("retention-picker", "value"),
+        Input("storage-technology-picker", "value"),
+        Input("storage-type-filter", "value"),
+        Input("num-levels", "value"),
+    )
+    app.clientside_callback(
+        ClientsideFunction(
+            namespace="radar", function_name="update_facet_options"),
+        Output("purpose-picker", "options"),
+        Output("retention-picker", "options"),
+        Output("storage-technology-picker", "options"),
+        Output("storage-type-filter", "options"),
+        Input("radar-bundle", "data"),
+        Input("search-picker", "value"),
+        Input("purpose-picker", "value"),
+        Input("retention-picker", "value"),
+        Input("storage-technology-picker", "value"),
+        Input("storage-type-filter", "value"),
+    )
+
 # =============================================================================
 # app launch
 # =============================================================================
 
+# Slim mode: the browser expands the packed radar figure
+if slim_figures and not clientside_mode:
+    app.clientside_callback(
+        ClientsideFunction(namespace="radar", function_name="expand_figure"),
+        Output("data-radar", "figure"),
+        Input("radar-figure-slim", "data"),
+    )
+
+# Per-callback latency and payload histograms, if turned on
+if metrics_enabled:
+    callback_metrics = CallbackMetrics()
+    callback_metrics.add_stats(
+        "radar_figure_cache", figure_cache.stats,
+        counters=("hits", "misses"),
+        help_text="Radar figure cache of this worker")
+    instrument(app.server, callback_metrics)
+
+# Callback profiles, for requests sent with an X-Radar-Profile: 1 header and
+# a sampled share of the rest, if turned on
+if profile_dir:
+    callbackProfiler.instrument(
+        app.server,
+        callbackProfiler.ProfileRing(
+            profile_dir, int(os.environ.get("RADAR_PROFILE_KEEP", 100))),
+        float(os.environ.get("RADAR_PROFILE_SAMPLE", 0)),
+    )
+
+# Read-only JSON API over the entities and radar nodes, if turned on
+if api_enabled:
+    register_api(
+        app.server,
+        lambda domain: domain_data(domain)
+        if domain is None or domain in radar_domain_names else None,
+        radar_mask,
+        custom_data_columns,
+    )
+
+# gzip responses. Flask runs the newest after_request hook first, so the
+# metrics above count the compressed bytes
+if compress_enabled:
+    compress_responses(app.server)
+
+# Render the default view once, so workers forked from a preloading
+# gunicorn master start with it cached
+if not clientside_mode:
+    pop_data_radar(None, "Default", "all", "all", "all", "all", len(levels))
+
 # Expose the server for external / production use (e.g., Gunicorn)
 server = app.server
 
 # Run the server for development use
 if __name__ == "__main__":
+    radar_domains.start()
+    start_background_jobs()
     app.run_server(
         host="0.0.0.0",
         port=8050,
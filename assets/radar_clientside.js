@@ -0,0 +1,495 @@
+/*
+ * Client-side filtering mode for the data radar
+ *
+ * Only used when the app runs with RADAR_CLIENTSIDE=1. The compiled hierarchy
+ * and filterable columns are fetched once (clientBundle.py), then the radar
+ * figure and the picker options are recomputed here without a server round
+ * trip. pop_data_radar and update_facet_options mirror the server callbacks
+ * of the same name in app.py, and facetEngine.py for the picker options.
+ *
+ * expand_figure unpacks the slim figures the server sends with
+ * RADAR_SLIM_FIGURES=1 (slimPayload.py)
+ */
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    radar: (function () {
+        var bundles = {};
+        var MIXED = "(?)";
+        var NO_DATA = [{label: "No data found", value: "none"}];
+
+        function isSelected(value) {
+            return Boolean(value) && value !== "all";
+        }
+
+        function allRows(bundle) {
+            return new Uint8Array(bundle.rows).fill(1);
+        }
+
+        function intersect(mask, other) {
+            for (var i = 0; i < mask.length; i++) {
+                mask[i] &= other[i];
+            }
+            return mask;
+        }
+
+        function any(mask) {
+            for (var i = 0; i < mask.length; i++) {
+                if (mask[i]) {
+                    return true;
+                }
+            }
+            return false;
+        }
+
+        // rows where any of the columns equals value, like `value in row.values`
+        function matchRows(bundle, columns, value) {
+            var mask = new Uint8Array(bundle.rows);
+            columns.forEach(function (name) {
+                var column = bundle.columns[name];
+                var code = column ? column.values.indexOf(value) : -1;
+                if (code < 0) {
+                    return;
+                }
+                for (var i = 0; i < column.codes.length; i++) {
+                    if (column.codes[i] === code) {
+                        mask[i] = 1;
+                    }
+                }
+            });
+            return mask;
+        }
+
+        function searchMask(bundle, searchValue) {
+            if (!searchValue) {
+                return allRows(bundle);
+            }
+            return matchRows(bundle, bundle.groups.search, searchValue);
+        }
+
+        function hasColumn(bundle, name) {
+            return Boolean(name) && bundle.columns[name] !== undefined;
+        }
+
+        // rows of the selected Storage Type, as the rules derived it from
+        // the row, or from one of its columns when given
+        function storageTypeRows(bundle, selectedStorageType, name) {
+            var storageType = bundle.storage_type;
+            var codes = storageType.codes;
+            if (name !== undefined && storageType.columns[name]) {
+                codes = storageType.columns[name];
+            }
+            var wanted = storageType.values.map(function (value) {
+                return String(value).toLowerCase();
+            }).indexOf(selectedStorageType.toLowerCase());
+            var mask = new Uint8Array(bundle.rows);
+            if (wanted < 0) {
+                return mask;
+            }
+            for (var i = 0; i < mask.length; i++) {
+                mask[i] = codes[i] === wanted ? 1 : 0;
+            }
+            return mask;
+        }
+
+        // distinct non-empty values of the columns over the masked rows
+        function distinctValues(bundle, columns, mask) {
+            var seen = {};
+            var values = [];
+            columns.forEach(function (name) {
+                var column = bundle.columns[name];
+                if (!column) {
+                    return;
+                }
+                for (var i = 0; i < column.codes.length; i++) {
+                    var code = column.codes[i];
+                    if (mask[i] && code >= 0 && !seen[name + "\u0000" + code]) {
+                        seen[name + "\u0000" + code] = true;
+                        if (values.indexOf(column.values[code]) < 0) {
+                            values.push(column.values[code]);
+                        }
+                    }
+                }
+            });
+            return values.sort(function (a, b) {
+                return a < b ? -1 : (a > b ? 1 : 0);
+            });
+        }
+
+        function asOptions(values) {
+            return values.map(function (value) {
+                return {label: value, value: value};
+            });
+        }
+
+        function mappingColumns(mapping) {
+            return Object.keys(mapping).map(function (key) {
+                return mapping[key];
+            });
+        }
+
+        function filterMask(bundle, searchValue, selectedPurpose,
+                            selectedRetention, selectedStorageTechnology) {
+            var mask = searchMask(bundle, searchValue);
+            if (isSelected(selectedPurpose)) {
+                intersect(mask, matchRows(bundle, [selectedPurpose], true));
+            }
+            if (isSelected(selectedRetention)) {
+                intersect(mask, matchRows(
+                    bundle, bundle.groups.retention, selectedRetention));
+            }
+            if (isSelected(selectedStorageTechnology)) {
+                intersect(mask, matchRows(
+                    bundle, bundle.groups["storage technology"],
+                    selectedStorageTechnology));
+            }
+            return mask;
+        }
+
+        function purposeOptions(bundle, selectedStorageTechnology,
+                                selectedRetention, searchValue) {
+            var mask = searchMask(bundle, searchValue);
+            if (!any(mask)) {
+                return NO_DATA;
+            }
+            if (isSelected(selectedStorageTechnology)) {
+                intersect(mask, matchRows(
+                    bundle, bundle.groups["storage technology"],
+                    selectedStorageTechnology));
+            }
+            if (isSelected(selectedRetention)) {
+                intersect(mask, matchRows(
+                    bundle, bundle.groups.retention, selectedRetention));
+            }
+            if (!any(mask)) {
+                return NO_DATA;
+            }
+
+            var mapping = bundle.mappings.purpose;
+            var purposes = Object.keys(mapping).filter(function (purpose) {
+                return hasColumn(bundle, mapping[purpose])
+                    && any(intersect(
+                        matchRows(bundle, [mapping[purpose]], true), mask));
+            });
+            if (!purposes.length) {
+                return NO_DATA;
+            }
+            return [{label: "Show All", value: "all"}].concat(
+                asOptions(purposes));
+        }
+
+        function retentionOptions(bundle, selectedPurpose, searchValue) {
+            var mapping = bundle.mappings.retention;
+            var options = [{label: "Show All", value: "all"}];
+            var mask = searchMask(bundle, searchValue);
+
+            if (!isSelected(selectedPurpose)) {
+                return options.concat(asOptions(distinctValues(
+                    bundle, mappingColumns(mapping), mask)));
+            }
+            var column = mapping[selectedPurpose];
+            if (!hasColumn(bundle, column)) {
+                return options;
+            }
+            intersect(mask, matchRows(bundle, [selectedPurpose], true));
+            return options.concat(asOptions(
+                distinctValues(bundle, [column], mask)));
+        }
+
+        function storageTechnologyOptions(bundle, selectedPurpose,
+                                          selectedStorageType, searchValue) {
+            var mapping = bundle.mappings.storage;
+            var columns = mappingColumns(mapping);
+            var options = [{label: "Show All", value: "all"}];
+            var mask = searchMask(bundle, searchValue);
+
+            if (!isSelected(selectedPurpose)) {
+                if (isSelected(selectedStorageType)) {
+                    intersect(mask, storageTypeRows(
+                        bundle, selectedStorageType));
+                }
+                return options.concat(asOptions(
+                    distinctValues(bundle, columns, mask)));
+            }
+
+            var column = mapping[selectedPurpose];
+            if (!hasColumn(bundle, column)) {
+                return options;
+            }
+            intersect(mask, matchRows(bundle, [selectedPurpose], true));
+            if (isSelected(selectedStorageType)) {
+                intersect(mask, storageTypeRows(
+                    bundle, selectedStorageType, column));
+            }
+            return options.concat(asOptions(
+                distinctValues(bundle, [column], mask)));
+        }
+
+        function storageTypeOptions(bundle, selectedPurpose,
+                                    selectedStorageTechnology, searchValue) {
+            var columns = mappingColumns(bundle.mappings.storage);
+            var mask = searchMask(bundle, searchValue);
+
+            if (isSelected(selectedPurpose)
+                    && hasColumn(bundle, bundle.mappings.storage[selectedPurpose])) {
+                intersect(mask, matchRows(bundle, [selectedPurpose], true));
+            }
+            if (isSelected(selectedStorageTechnology)) {
+                intersect(mask, matchRows(
+                    bundle, columns, selectedStorageTechnology));
+            }
+
+            var storageType = bundle.storage_type;
+            var present = new Uint8Array(storageType.values.length);
+            for (var i = 0; i < mask.length; i++) {
+                if (mask[i] && storageType.codes[i] >= 0) {
+                    present[storageType.codes[i]] = 1;
+                }
+            }
+
+            var options = [{label: "Show All", value: "all"}];
+            storageType.values.forEach(function (value, code) {
+                if (present[code]) {
+                    options.push({
+                        label: value, value: String(value).toLowerCase()});
+                }
+            });
+            return options;
+        }
+
+        function joinedNames(names, present, at, n) {
+            var held = [];
+            for (var k = 0; k < n; k++) {
+                if (present[at + k]) {
+                    held.push(names[k]);
+                }
+            }
+            return held.length ? held.join(", ") : "N/A";
+        }
+
+        // radarTree.node_rollups: the purposes, longest retention and
+        // storage technologies of the masked rows under each node, placed
+        // on their deepest node and merged up a ring at a time
+        function nodeRollups(tree, mask) {
+            var nNodes = tree.ids.length;
+            var sets = [tree.rollup_purposes, tree.rollup_storage].map(
+                function (set) {
+                    var n = set.names.length;
+                    var present = new Uint8Array(nNodes * n);
+                    for (var k = 0; k < set.rows.length; k++) {
+                        var row = set.rows[k];
+                        var leaf = tree.row_leaf[row];
+                        if (mask[row] && leaf >= 0) {
+                            present[leaf * n + set.items[k]] = 1;
+                        }
+                    }
+                    return {names: set.names, n: n, present: present};
+                });
+            var ranks = tree.rollup_retention.ranks;
+            var longest = new Int32Array(nNodes).fill(-1);
+            for (var i = 0; i < ranks.length; i++) {
+                var node = tree.row_leaf[i];
+                if (mask[i] && node >= 0) {
+                    longest[node] = Math.max(longest[node], ranks[i]);
+                }
+            }
+            for (var d = tree.depth_order.length - 1; d > 0; d--) {
+                tree.depth_order[d].forEach(function (child) {
+                    var parent = tree.parents[child];
+                    sets.forEach(function (set) {
+                        for (var k = 0; k < set.n; k++) {
+                            set.present[parent * set.n + k] |=
+                                set.present[child * set.n + k];
+                        }
+                    });
+                    longest[parent] = Math.max(longest[parent], longest[child]);
+                });
+            }
+            return function (node) {
+                return [
+                    joinedNames(sets[0].names, sets[0].present,
+                                node * sets[0].n, sets[0].n),
+                    longest[node] >= 0
+                        ? tree.rollup_retention.names[longest[node]] : "N/A",
+                    joinedNames(sets[1].names, sets[1].present,
+                                node * sets[1].n, sets[1].n)
+                ];
+            };
+        }
+
+        function nodeId(slim, ids, i) {
+            // parents may come after their children, walk up to a known id
+            var chain = [];
+            while (ids[i] === undefined) {
+                chain.push(i);
+                if (slim.parents[i] < 0) {
+                    break;
+                }
+                i = slim.parents[i];
+            }
+            for (var k = chain.length - 1; k >= 0; k--) {
+                var node = chain[k];
+                var label = String(slim.labels[node]);
+                ids[node] = slim.parents[node] < 0
+                    ? label : ids[slim.parents[node]] + "/" + label;
+            }
+        }
+
+        return {
+            load_bundle: function (url, domain) {
+                if (!url) {
+                    return window.dash_clientside.no_update;
+                }
+                if (domain) {
+                    url += "?domain=" + encodeURIComponent(domain);
+                }
+                if (bundles[url]) {
+                    return url;
+                }
+                // redirected to the url carrying the content hash, which the
+                // browser may cache
+                return fetch(url).then(function (response) {
+                    return response.json();
+                }).then(function (bundle) {
+                    bundles[url] = bundle;
+                    return url;
+                });
+            },
+
+            pop_data_radar: function (bundleUrl, searchValue, selectedView,
+                                      selectedPurpose, selectedRetention,
+                                      selectedStorageTechnology,
+                                      selectedStorageType, selectedNumLevels) {
+                var bundle = bundles[bundleUrl];
+                if (!bundle || selectedView !== "Default") {
+                    return window.dash_clientside.no_update;
+                }
+
+                var mask = filterMask(
+                    bundle, searchValue, selectedPurpose, selectedRetention,
+                    selectedStorageTechnology);
+                if (isSelected(selectedStorageType)) {
+                    intersect(mask, storageTypeRows(
+                        bundle, selectedStorageType,
+                        bundle.storage_type.radar_column));
+                }
+                if (!any(mask)) {
+                    return bundle.empty_figure;
+                }
+
+                var tree = bundle.tree;
+                var nNodes = tree.ids.length;
+                var nCols = tree.custom_codes.length;
+                var counts = new Int32Array(nNodes);
+                var low = new Int32Array(nNodes * nCols).fill(2147483647);
+                var high = new Int32Array(nNodes * nCols).fill(-1);
+                tree.row_node.forEach(function (nodes) {
+                    for (var i = 0; i < nodes.length; i++) {
+                        var node = nodes[i];
+                        if (!mask[i] || node < 0) {
+                            continue;
+                        }
+                        counts[node] += 1;
+                        for (var c = 0; c < nCols; c++) {
+                            var code = tree.custom_codes[c][i];
+                            var at = node * nCols + c;
+                            low[at] = Math.min(low[at], code);
+                            high[at] = Math.max(high[at], code);
+                        }
+                    }
+                });
+
+                var rollups = tree.row_leaf ? nodeRollups(tree, mask) : null;
+
+                var trace = Object.assign({}, bundle.figure.data[0], {
+                    ids: [], labels: [], parents: [], values: [], customdata: []
+                });
+                var depth = Math.min(selectedNumLevels, tree.depth_order.length);
+                for (var d = depth - 1; d >= 0; d--) {
+                    tree.depth_order[d].forEach(function (node) {
+                        if (!counts[node]) {
+                            return;
+                        }
+                        var parent = tree.parents[node];
+                        var custom = [];
+                        for (var c = 0; c < nCols; c++) {
+                            var at = node * nCols + c;
+                            custom.push(low[at] === high[at] && high[at] >= 0
+                                ? tree.custom_uniques[c][high[at]] : MIXED);
+                        }
+                        trace.ids.push(tree.ids[node]);
+                        trace.labels.push(tree.labels[node]);
+                        trace.parents.push(parent >= 0 ? tree.ids[parent] : "");
+                        trace.values.push(counts[node]);
+                        if (rollups) {
+                            custom = custom.concat(rollups(node));
+                        }
+                        trace.customdata.push(custom);
+                    });
+                }
+
+                return {
+                    data: [trace],
+                    layout: JSON.parse(JSON.stringify(bundle.figure.layout))
+                };
+            },
+
+            update_facet_options: function (bundleUrl, searchValue,
+                                            selectedPurpose, selectedRetention,
+                                            selectedStorageTechnology,
+                                            selectedStorageType) {
+                var bundle = bundles[bundleUrl];
+                if (!bundle) {
+                    return [window.dash_clientside.no_update,
+                            window.dash_clientside.no_update,
+                            window.dash_clientside.no_update,
+                            window.dash_clientside.no_update];
+                }
+                return [
+                    purposeOptions(bundle, selectedStorageTechnology,
+                                   selectedRetention, searchValue),
+                    retentionOptions(bundle, selectedPurpose, searchValue),
+                    storageTechnologyOptions(bundle, selectedPurpose,
+                                             selectedStorageType, searchValue),
+                    storageTypeOptions(bundle, selectedPurpose,
+                                       selectedStorageTechnology, searchValue)
+                ];
+            },
+
+            expand_figure: function (slim) {
+                // slim figures come from slimPayload.py, RADAR_SLIM_FIGURES=1
+                if (!slim) {
+                    return window.dash_clientside.no_update;
+                }
+                if (!slim.labels) {
+                    return slim.figure;
+                }
+                var n = slim.labels.length;
+                var ids = slim.ids ? slim.ids.slice() : new Array(n);
+                if (!slim.ids) {
+                    for (var i = 0; i < n; i++) {
+                        nodeId(slim, ids, i);
+                    }
+                }
+                var combos = slim.combos.map(function (combo) {
+                    return combo.map(function (k) {
+                        return slim.strings[k];
+                    });
+                });
+                var parents = new Array(n);
+                var customdata = new Array(n);
+                for (var j = 0; j < n; j++) {
+                    parents[j] = slim.parents[j] < 0 ? "" : ids[slim.parents[j]];
+                    customdata[j] = combos[slim.custom[j]];
+                }
+                var trace = Object.assign({}, slim.figure.data[0], {
+                    ids: ids,
+                    labels: slim.labels,
+                    parents: parents,
+                    values: slim.values,
+                    customdata: customdata
+                });
+                return {data: [trace], layout: slim.figure.layout};
+            }
+        };
+    })()
+});
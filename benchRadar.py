@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the radar callbacks on synthetic data
+
+    python benchRadar.py --rows 1000 10000 --json bench.json
+    python benchRadar.py --rows 1000 10000 --baseline bench.json
+
+For each data size the app is loaded on a synthetic radar (synthRadar.py),
+then pop_data_radar, update_search_options and update_facet_options are
+called directly over a matrix of filter combinations. Reports latency
+percentiles, traced peak memory and the serialised payload size, plain and
+gzipped, per callback, and with --baseline the change against an earlier
+--json run
+"""
+
+import argparse
+import gzip
+import importlib
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import plotly
+
+from synthRadar import add_arguments, generator_options, synthetic_radar
+
+# the repo data files the app reads besides the radar data itself
+_DATA_FILES = ["radar_data_colours.csv", "purpose.txt",
+               "radar_data_rules.csv"]
+
+
+def _payload_bytes(output):
+    # what dash sends to the browser, as is and gzipped
+    body = json.dumps(output, cls=plotly.utils.PlotlyJSONEncoder).encode()
+    return len(body), len(gzip.compress(body, compresslevel=6))
+
+
+def load_app(df, workdir, env=None):
+    """
+    Imports app.py afresh on df, from a data folder under workdir
+    Figure caching and data reloading are off, so every call is measured,
+    and env sets any other variables, e.g. {"RADAR_CLIENTSIDE": "1"}
+    Returns (app module, seconds to load)
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    data = os.path.join(workdir, "data")
+    os.makedirs(data, exist_ok=True)
+    for name in _DATA_FILES:
+        shutil.copy(os.path.join(here, "data", name), data)
+    with open(os.path.join(data, "radar_data_index.csv"), "w") as wf:
+        wf.write("domain,value\nConcepts,radar_data_cdm.csv\n")
+    df.to_csv(os.path.join(data, "radar_data_cdm.csv"), index=False)
+
+    os.environ.update({
+        "RADAR_FIGURE_CACHE_MB": "0",
+        "RADAR_RELOAD_INTERVAL": "0",
+    })
+    for name in ("RADAR_FIGURE_CACHE_DIR", "RADAR_CLIENTSIDE",
+                 "RADAR_SHARED_DIR"):
+        os.environ.pop(name, None)
+    os.environ.update(env or {})
+
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        start = time.perf_counter()
+        sys.modules.pop("app", None)
+        app = importlib.import_module("app")
+        return app, time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+
+
+def callback_cases(df):
+    """
+    Argument tuples per callback, over a matrix of filter combinations
+    Search values are drawn from the data: a top level group, a deeper
+    group, an entity, and a value that matches nothing
+    Returns dict of callback name -> list of argument tuples
+    """
+    levels = [col for col in df.columns if "level" in col]
+    entities = df[levels].ffill(axis=1).iloc[:, -1]
+    searches = [
+        None,
+        df[levels[0]].dropna().iloc[0],
+        df[levels[2]].dropna().iloc[0],
+        entities.iloc[len(df) // 2],
+        "no such entity",
+    ]
+    purposes = ["all", "Authentication", "Audit"]
+    retention = ["all", df["Authentication retention"].dropna().iloc[0]]
+    technology = ["all", "AWS Lambda"]
+    storage_types = ["all", "ephemeral", "persisted"]
+    num_levels = [4, 8]
+
+    return {
+        "pop_data_radar": [
+            (search, "Default", purpose, ret, tech, stype, levels_shown)
+            for search, purpose, ret, tech, stype, levels_shown
+            in itertools.product(searches, purposes, retention, technology,
+                                 storage_types, num_levels)
+        ],
+        "update_search_options": [
+            (text, None)
+            for text in ["", "e", "Ent", "entity 00", "group 1.", "zzz"]
+        ],
+        "update_facet_options": list(itertools.product(
+            searches, purposes, retention, technology, storage_types)),
+    }
+
+
+def _summary(samples):
+    samples = np.asarray(samples, dtype=float)
+    return {
+        "p50": float(np.percentile(samples, 50)),
+        "p95": float(np.percentile(samples, 95)),
+        "max": float(samples.max()),
+    }
+
+
+def run_benchmark(app, cases, repeat=3):
+    """
+    Calls each callback over its cases, repeat times for the latencies and
+    once more under tracemalloc for memory
+    Returns dict of callback name -> stats
+    """
+    results = {}
+    for name, arguments in cases.items():
+        func = getattr(app, name)
+        func = getattr(func, "__wrapped__", func)
+
+        latencies = []
+        for _ in range(repeat):
+            for args in arguments:
+                start = time.perf_counter()
+                func(*args)
+                latencies.append(time.perf_counter() - start)
+
+        # tracing slows every allocation, so it has a pass of its own
+        peaks = []
+        payloads = []
+        compressed = []
+        tracemalloc.start()
+        for args in arguments:
+            tracemalloc.reset_peak()
+            output = func(*args)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            size, gzipped = _payload_bytes(output)
+            payloads.append(size)
+            compressed.append(gzipped)
+        tracemalloc.stop()
+
+        results[name] = {
+            "calls": len(latencies),
+            "ms": {key: value * 1000
+                   for key, value in _summary(latencies).items()},
+            "peak_kib": {key: value / 1024
+                         for key, value in _summary(peaks).items()},
+            "payload_kib": {key: value / 1024
+                            for key, value in _summary(payloads).items()},
+            "gzip_kib": {key: value / 1024
+                         for key, value in _summary(compressed).items()},
+        }
+    return results
+
+
+def _change(value, baseline):
+    if not baseline:
+        return ""
+    return "({:+.0%})".format(value / baseline - 1)
+
+
+def report(rows, load_seconds, results, baseline=None):
+    print("{} rows, app loaded in {:.2f}s".format(rows, load_seconds))
+    print("  {:<22} {:>9} {:>9} {:>9} {:>12} {:>12} {:>9}".format(
+        "callback", "p50 ms", "p95 ms", "max ms", "peak KiB", "payload KiB",
+        "gzip KiB"))
+    for name, stats in results.items():
+        before = (baseline or {}).get(name)
+        line = ("  {:<22} {:>9.2f} {:>9.2f} {:>9.2f} {:>12.0f} {:>12.1f}"
+                " {:>9.1f}").format(
+            name, stats["ms"]["p50"], stats["ms"]["p95"], stats["ms"]["max"],
+            stats["peak_kib"]["max"], stats["payload_kib"]["max"],
+            stats["gzip_kib"]["max"])
+        print(line)
+        if before:
+            print("  {:<22} {:>9} {:>9} {:>9} {:>12} {:>12} {:>9}".format(
+                "  vs baseline",
+                _change(stats["ms"]["p50"], before["ms"]["p50"]),
+                _change(stats["ms"]["p95"], before["ms"]["p95"]),
+                _change(stats["ms"]["max"], before["ms"]["max"]),
+                _change(stats["peak_kib"]["max"],
+                        before["peak_kib"]["max"]),
+                _change(stats["payload_kib"]["max"],
+                        before["payload_kib"]["max"]),
+                _change(stats["gzip_kib"]["max"],
+                        before.get("gzip_kib", {}).get("max"))))
+
+
+if __name__ == "__main__":
+    parser = add_arguments(argparse.ArgumentParser(
+        description="Benchmarks the radar callbacks on synthetic data"))
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000],
+                        help="data sizes to benchmark")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare with an earlier --json")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as rf:
+            baseline = json.load(rf)["sizes"]
+
+    options = generator_options(args)
+    runs = {}
+    for rows in args.rows:
+        df = synthetic_radar(rows, **options)
+        with tempfile.TemporaryDirectory() as workdir:
+            app, load_seconds = load_app(df, workdir)
+            results = run_benchmark(app, callback_cases(df), args.repeat)
+        report(rows, load_seconds, results, baseline.get(str(rows)))
+        runs[str(rows)] = dict(results, load_seconds=load_seconds)
+
+    if args.json:
+        with open(args.json, "w") as wf:
+            json.dump({"options": options, "sizes": runs}, wf, indent=2)
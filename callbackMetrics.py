@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-callback latency and payload metrics, in Prometheus text format
+
+instrument() times every dash callback request on the flask server and
+serves histograms of wall time, rows after filtering and response bytes on
+/metrics, labelled by callback and by whether a cache served the result,
+with any counters added through add_stats(), e.g. figure cache hits.
+Callbacks report rows and cache use with note(), which does nothing unless
+a request is being measured. Each gunicorn worker keeps its own counts
+"""
+
+import threading
+import time
+from contextvars import ContextVar
+
+import flask
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROWS_BUCKETS = (0, 10, 100, 1000, 10000, 100000, 1000000)
+BYTES_BUCKETS = (1000, 10000, 100000, 300000, 1000000, 3000000, 10000000)
+
+# what the callback running in this request noted, None when not measured
+_notes = ContextVar("radar_callback_notes", default=None)
+
+
+def note(**values):
+    """
+    Records rows= or cache= for the callback request being measured
+    """
+    notes = _notes.get()
+    if notes is not None:
+        notes.update(values)
+
+
+def _escape(value):
+    return (str(value).replace("\\", "\\\\").replace("\"", "\\\"")
+            .replace("\n", "\\n"))
+
+
+def _labels(pairs):
+    return ",".join('{}="{}"'.format(key, _escape(value))
+                    for key, value in pairs)
+
+
+class Histogram:
+    """
+    Prometheus histogram with one series per label set
+    """
+
+    def __init__(self, name, help_text, buckets, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # one count per bucket, then sum and count
+                series = [0] * len(self.buckets) + [0, 0]
+                self._series[labels] = series
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [
+            "# HELP {} {}".format(self.name, self.help_text),
+            "# TYPE {} histogram".format(self.name),
+        ]
+        with self._lock:
+            series = sorted((labels, list(values))
+                            for labels, values in self._series.items())
+        for labels, values in series:
+            pairs = list(zip(self.label_names, labels))
+            for bound, count in zip(self.buckets, values):
+                lines.append("{}_bucket{{{}}} {}".format(
+                    self.name, _labels(pairs + [("le", bound)]), count))
+            lines.append("{}_bucket{{{}}} {}".format(
+                self.name, _labels(pairs + [("le", "+Inf")]), values[-1]))
+            lines.append("{}_sum{{{}}} {}".format(
+                self.name, _labels(pairs), values[-2]))
+            lines.append("{}_count{{{}}} {}".format(
+                self.name, _labels(pairs), values[-1]))
+        return "\n".join(lines) + "\n"
+
+
+class CallbackMetrics:
+    """
+    Wall time, rows and response bytes histograms per callback
+    """
+
+    def __init__(self):
+        labels = ("callback", "cache")
+        self.seconds = Histogram(
+            "radar_callback_seconds",
+            "Wall time of dash callback requests", SECONDS_BUCKETS, labels)
+        self.rows = Histogram(
+            "radar_callback_rows",
+            "Rows left after filtering", ROWS_BUCKETS, labels)
+        self.bytes = Histogram(
+            "radar_callback_response_bytes",
+            "Size of dash callback responses", BYTES_BUCKETS, labels)
+        self._stats = []
+
+    def add_stats(self, prefix, stats, counters=(), help_text=""):
+        """
+        Serves the numbers stats() returns alongside the histograms, each as
+        prefix_<name>, those named in counters as counters, the rest as
+        gauges
+        """
+        self._stats.append((prefix, stats, set(counters), help_text))
+
+    def observe(self, callback, seconds, nbytes, rows=None, cache=None):
+        labels = (callback, cache or "none")
+        self.seconds.observe(seconds, *labels)
+        self.bytes.observe(nbytes, *labels)
+        if rows is not None:
+            self.rows.observe(rows, *labels)
+
+    def render(self):
+        lines = []
+        for prefix, stats, counters, help_text in self._stats:
+            for name, value in stats().items():
+                kind = "counter" if name in counters else "gauge"
+                metric = "{}_{}{}".format(
+                    prefix, name, "_total" if kind == "counter" else "")
+                lines += [
+                    "# HELP {} {}, {}".format(metric, help_text, name),
+                    "# TYPE {} {}".format(metric, kind),
+                    "{} {}".format(metric, value),
+                ]
+        return "".join(histogram.render()
+                       for histogram in (self.seconds, self.rows, self.bytes)
+                       ) + "".join(line + "\n" for line in lines)
+
+
+def instrument(server, metrics, path="/metrics"):
+    """
+    Measures every dash callback request on server and adds the metrics
+    route. Without this nothing is measured and note() is a no-op
+    """
+
+    @server.before_request
+    def start_callback_metrics():
+        if flask.request.path.endswith("/_dash-update-component"):
+            flask.g.radar_metrics = (time.perf_counter(), _notes.set({}))
+
+    @server.after_request
+    def observe_callback_metrics(response):
+        started = flask.g.pop("radar_metrics", None)
+        if started is None:
+            return response
+        start, token = started
+        notes = _notes.get() or {}
+        _notes.reset(token)
+        # dash names a callback after its outputs
+        body = flask.request.get_json(silent=True) or {}
+        metrics.observe(
+            body.get("output", "unknown"),
+            time.perf_counter() - start,
+            response.calculate_content_length() or 0,
+            notes.get("rows"),
+            notes.get("cache"),
+        )
+        return response
+
+    @server.route(path)
+    def serve_metrics():
+        return flask.Response(
+            metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    return metrics
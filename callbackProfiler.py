@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+On-demand cProfile of dash callback requests
+
+instrument() profiles the callback requests that carry an X-Radar-Profile
+header, and a sampled share of the others. Each profile is written to a
+directory, with the callback inputs that triggered it, and only the newest
+are kept
+
+    python callbackProfiler.py /tmp/data-radar-profiles
+
+lists the kept profiles, with their inputs and slowest functions
+"""
+
+import cProfile
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+import flask
+
+HEADER = "X-Radar-Profile"
+
+
+class ProfileRing:
+    """
+    Directory of the newest max_files profiles, oldest dropped first
+    """
+
+    def __init__(self, directory, max_files=100):
+        self.directory = directory
+        self.max_files = max_files
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, profile, details):
+        """
+        Stores a cProfile.Profile with a json description next to it
+        Returns the profile path
+        """
+        # names sort oldest first, and never collide between workers
+        name = "{:.6f}-{}".format(time.time(), os.getpid())
+        path = os.path.join(self.directory, name + ".prof")
+        profile.dump_stats(path)
+        # the description is renamed into place last, marking it complete
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as wf:
+            json.dump(dict(details, profile=os.path.basename(path)), wf,
+                      indent=1, default=str)
+        os.replace(tmp_path, os.path.join(self.directory, name + ".json"))
+        self._trim()
+        return path
+
+    def entries(self):
+        """
+        Returns the kept description paths, oldest first
+        """
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted(os.path.join(self.directory, name)
+                      for name in names if name.endswith(".json"))
+
+    def _trim(self):
+        entries = self.entries()
+        for path in entries[:max(len(entries) - self.max_files, 0)]:
+            for drop in (path, path[:-len(".json")] + ".prof"):
+                try:
+                    os.remove(drop)
+                except OSError:
+                    # another worker trimmed it first
+                    pass
+
+
+def instrument(server, ring, sample_rate=0.0):
+    """
+    Profiles dash callback requests on server that ask for it with the
+    header, or fall in the sample
+    """
+    # cProfile can only run one profile at a time from python 3.12
+    busy = threading.Lock()
+
+    @server.before_request
+    def start_callback_profile():
+        if not flask.request.path.endswith("/_dash-update-component"):
+            return
+        wanted = flask.request.headers.get(HEADER) == "1"
+        if not (wanted or (sample_rate and random.random() < sample_rate)):
+            return
+        if not busy.acquire(blocking=False):
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # another profiler is active in this process
+            busy.release()
+            return
+        flask.g.radar_profile = (profile, time.perf_counter())
+
+    @server.after_request
+    def write_callback_profile(response):
+        started = flask.g.pop("radar_profile", None)
+        if started is None:
+            return response
+        profile, start = started
+        profile.disable()
+        busy.release()
+
+        body = flask.request.get_json(silent=True) or {}
+        try:
+            ring.write(profile, {
+                "callback": body.get("output"),
+                "inputs": body.get("inputs"),
+                "state": body.get("state"),
+                "seconds": time.perf_counter() - start,
+                "status": response.status_code,
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            })
+        except OSError:
+            # profiling must never fail the request
+            pass
+        return response
+
+    @server.teardown_request
+    def stop_callback_profile(error=None):
+        # a request that raised never reaches after_request
+        started = flask.g.pop("radar_profile", None)
+        if started is not None:
+            started[0].disable()
+            busy.release()
+
+    return ring
+
+
+if __name__ == "__main__":
+    import pstats
+    import sys
+
+    for path in ProfileRing(sys.argv[1]).entries():
+        with open(path) as rf:
+            details = json.load(rf)
+        print("{time}  {callback}  {seconds:.3f}s".format(**details))
+        for item in details.get("inputs") or []:
+            print("    {}.{} = {!r}".format(
+                item.get("id"), item.get("property"), item.get("value")))
+        stats = pstats.Stats(os.path.join(sys.argv[1], details["profile"]))
+        stats.sort_stats("cumulative").print_stats(10)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Data bundle for the client-side filtering mode
+
+Packs the compiled hierarchy and the filterable columns into one JSON
+document, addressed by its content hash, so the browser can fetch it once
+and recompute the radar and picker options itself (assets/radar_clientside.js)
+"""
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+
+def _encode_column(series):
+    """
+    Column as distinct values plus a per-row code, -1 for empty cells
+    """
+    codes, uniques = pd.factorize(series)
+    return {"values": uniques.tolist(), "codes": codes.tolist()}
+
+
+def build_client_bundle(df, tree, storage_type, schema, figure, empty_figure):
+    """
+    Serialises what the client-side callbacks need, ready to serve
+    schema is the RadarSchema of df, the browser filters by column name
+    storage_type is the derived Storage Type, from radarRules.derive_columns
+    figure is a styled radar figure used as the template for client renders
+    Returns (version, bytes)
+    """
+    groups = schema.groups
+    # every mapping goes from a purpose to the column holding its data
+    mappings = {
+        "purpose": schema.flags,
+        "retention": schema.picker_retention,
+        "storage": schema.storage,
+    }
+    columns = set(col for group in groups.values() for col in group)
+    for mapping in mappings.values():
+        columns.update(mapping.values())
+    columns = [col for col in df.columns if col in columns]
+
+    # the figure arrays are filled in per render, keep only the styling
+    figure = json.loads(pio.to_json(figure, validate=False))
+    trace = figure["data"][0]
+    for key in ("ids", "labels", "parents", "values", "customdata"):
+        trace.pop(key, None)
+
+    bundle_tree = {
+        "ids": tree["ids"].tolist(),
+        "labels": tree["labels"].tolist(),
+        "parents": tree["parents"].tolist(),
+        "depth_order": [ring.tolist() for ring in tree["depth_order"]],
+        "row_node": tree["row_node"].tolist(),
+        "custom_codes": np.ascontiguousarray(
+            tree["custom_codes"].T).tolist(),
+        "custom_uniques": [uniques.tolist()
+                           for uniques in tree["custom_uniques"]],
+    }
+    # rows are rolled up from their deepest node, see radarTree.node_rollups
+    if "rollups" in tree:
+        bundle_tree["row_leaf"] = tree["row_leaf"].tolist()
+        for key in ("rollup_purposes", "rollup_storage", "rollup_retention"):
+            bundle_tree[key] = {name: values.tolist()
+                                for name, values in tree[key].items()}
+
+    bundle = {
+        "rows": len(df),
+        "columns": {col: _encode_column(df[col]) for col in columns},
+        "groups": groups,
+        "storage_type": {
+            "values": storage_type["values"],
+            "codes": storage_type["codes"].tolist(),
+            "columns": {col: codes.tolist() for col, codes
+                        in storage_type["columns"].items()},
+            # the column the radar's own Storage Type filter reads
+            "radar_column": schema.radar_storage_column(df.columns),
+        },
+        "mappings": mappings,
+        "tree": bundle_tree,
+        "figure": figure,
+        "empty_figure": json.loads(pio.to_json(empty_figure, validate=False)),
+    }
+
+    payload = json.dumps(bundle, separators=(",", ":"), default=str).encode()
+    version = hashlib.sha256(payload).hexdigest()[:16]
+    return version, payload
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compact in-memory representation of the radar data
+
+The level, retention and storage technology columns repeat a few hundred
+names across every row, and the purpose columns only ever hold "y". At load
+time the former become categoricals, columns of a group sharing one
+dictionary, and the latter become booleans
+
+    python compactFrame.py data/radar_data_cdm.csv
+
+prints the bytes each worker holds for the data, before and after
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+# columns with more distinct values than this share of rows stay as objects
+MAX_DISTINCT_SHARE = 0.5
+
+
+def _low_cardinality(series):
+    return series.nunique() <= MAX_DISTINCT_SHARE * max(len(series), 1)
+
+
+def compact_frame(df, flag_columns=(), shared_columns=()):
+    """
+    Stores flag columns as booleans, True where the cell is "y", and
+    low-cardinality text columns as categoricals
+    Each list in shared_columns is given one sorted dictionary, so codes
+    compare across those columns
+    Returns a new df, values are unchanged apart from the flags
+    """
+    compact = {}
+    for col in flag_columns:
+        if col in df.columns:
+            compact[col] = (df[col] == "y").to_numpy()
+
+    for columns in shared_columns:
+        columns = [col for col in columns
+                   if col in df.columns and col not in compact]
+        if not columns:
+            continue
+        values = pd.unique(df[columns].to_numpy().ravel())
+        categories = sorted(value for value in values if pd.notna(value))
+        dtype = pd.CategoricalDtype(categories)
+        for col in columns:
+            compact[col] = df[col].astype(dtype)
+
+    for col in df.columns:
+        if (col not in compact and df[col].dtype == object
+                and _low_cardinality(df[col])):
+            compact[col] = df[col].astype("category")
+
+    return df.assign(**compact)
+
+
+def frame_bytes(df):
+    """
+    Returns pandas Series of bytes held per column, strings included
+    """
+    return df.memory_usage(index=False, deep=True)
+
+
+def held_bytes(value):
+    """
+    Bytes held by value and everything it refers to: arrays, the strings in
+    object arrays, dataframes with their index, and the dicts, lists and
+    objects holding them. Whatever is reached twice is counted once
+    """
+    seen = set()
+    total = 0
+    pending = [value]
+    while pending:
+        item = pending.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, np.ndarray):
+            total += item.nbytes
+            if item.dtype == object:
+                pending.extend(item.ravel().tolist())
+        elif isinstance(item, pd.DataFrame):
+            total += int(frame_bytes(item).sum())
+            total += item.index.memory_usage(deep=True)
+        elif isinstance(item, (pd.Series, pd.Index)):
+            total += int(item.memory_usage(deep=True))
+        elif isinstance(item, dict):
+            total += sys.getsizeof(item)
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            total += sys.getsizeof(item)
+            pending.extend(item)
+        else:
+            total += sys.getsizeof(item)
+            if hasattr(item, "__dict__"):
+                pending.append(vars(item))
+    return total
+
+
+if __name__ == "__main__":
+    from pdAutoRead import pdAutoRead
+
+    for path in sys.argv[1:]:
+        df = pdAutoRead(path)
+        # the purpose flags are the columns holding nothing but "y"
+        flags = [col for col in df.columns
+                 if set(df[col].dropna().unique()) == {"y"}]
+        groups = [
+            [col for col in df.columns if key in col.lower()]
+            for key in ("retention", "storage technology")
+        ]
+        before = frame_bytes(df)
+        after = frame_bytes(compact_frame(df, flags, groups))
+
+        print(path, "-", len(df), "rows")
+        width = max(len(str(col)) for col in df.columns)
+        for col in df.columns:
+            print("  {:<{}} {:>12,} -> {:>12,}".format(
+                str(col), width, before[col], after[col]))
+        print("  {:<{}} {:>12,} -> {:>12,} bytes ({:.0%})".format(
+            "total", width, before.sum(), after.sum(),
+            after.sum() / max(before.sum(), 1)))
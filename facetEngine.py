@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Facet aggregation for the radar option pickers
+
+Everything the purpose, retention, storage technology and storage type
+pickers need is prepared once per dataset. Each interaction then computes
+the search mask once and derives the available values, with row counts, for
+every picker from it
+"""
+
+import numpy as np
+import pandas as pd
+
+from filterIndex import filter_mask, match_rows, purpose_rows
+from radarRules import derived_rows
+
+NO_DATA = [{"label": "No data found", "value": "none"}]
+SHOW_ALL = {"label": "Show All", "value": "all"}
+
+
+def _selected(value):
+    return bool(value) and value != "all"
+
+
+def _joint_codes(df, columns):
+    """
+    Codes for several columns against one shared dictionary, -1 when empty
+    "codes" keeps every cell, "rows" blanks repeats so each row counts once
+    """
+    columns = list(columns)
+    codes, values = pd.factorize(df[columns].to_numpy().ravel())
+    codes = codes.reshape(len(df), len(columns))
+
+    rows = np.sort(codes, axis=1)
+    rows[:, 1:][rows[:, 1:] == rows[:, :-1]] = -1
+
+    return {"columns": columns, "codes": codes, "rows": rows,
+            "values": list(values)}
+
+
+def build_facet_engine(df, index, schema, storage_type):
+    """
+    Precomputes purpose flags and shared value codes
+    schema is the RadarSchema the index was built with, storage_type the
+    derived Storage Type column from radarRules.derive_columns
+    Returns dict used by facet_counts
+    """
+    return {
+        "index": index,
+        "retention_mapping": schema.picker_retention,
+        "storage_mapping": schema.storage,
+        "flags": {purpose: purpose_rows(index, purpose)
+                  for purpose in schema.purposes},
+        "retention": _joint_codes(df, schema.picker_retention.values()),
+        "storage": _joint_codes(df, schema.storage_columns),
+        "storage_type": storage_type,
+    }
+
+
+def _value_counts(facet, mask, column=None):
+    """
+    Rows per value over the masked rows, sorted on value
+    With a column, only that column of the facet is counted
+    """
+    if column is None:
+        codes = facet["rows"][mask]
+    else:
+        codes = facet["codes"][mask, facet["columns"].index(column)]
+    codes = codes[codes >= 0]
+    counts = np.bincount(codes, minlength=len(facet["values"]))
+    present = sorted(np.flatnonzero(counts), key=lambda i: facet["values"][i])
+    return {facet["values"][i]: int(counts[i]) for i in present}
+
+
+def facet_counts(
+    engine,
+    searchValue=None,
+    selectedPurpose=None,
+    selectedRetention=None,
+    selectedStorageTechnology=None,
+    selectedStorageType=None,
+):
+    """
+    Available values and their row counts for every picker, in one pass
+    Each picker ignores its own selection, as the separate callbacks did
+    Returns dict of picker -> {value: count}
+    """
+    index = engine["index"]
+    # every picker starts from the same search filter
+    search = filter_mask(index, searchValue)
+    purpose_selected = _selected(selectedPurpose)
+    retention_column = engine["retention_mapping"].get(selectedPurpose)
+    storage_column = engine["storage_mapping"].get(selectedPurpose)
+
+    # Purpose: narrowed by Storage Technology and Retention
+    mask = filter_mask(
+        index,
+        selectedRetention=selectedRetention,
+        selectedStorageTechnology=selectedStorageTechnology,
+    ) & search
+    purposes = {}
+    for purpose, flags in engine["flags"].items():
+        count = int(np.count_nonzero(mask & flags))
+        if count:
+            purposes[purpose] = count
+
+    # Retention: narrowed by Purpose
+    retention = {}
+    if not purpose_selected:
+        retention = _value_counts(engine["retention"], search)
+    elif retention_column in engine["retention"]["columns"]:
+        retention = _value_counts(
+            engine["retention"],
+            search & engine["flags"][selectedPurpose],
+            retention_column,
+        )
+
+    # Storage Technology: narrowed by Purpose and Storage Type
+    storage_technology = {}
+    if not purpose_selected:
+        mask = search
+        if _selected(selectedStorageType):
+            mask = mask & derived_rows(
+                engine["storage_type"], selectedStorageType)
+        storage_technology = _value_counts(engine["storage"], mask)
+    elif storage_column in engine["storage"]["columns"]:
+        mask = search & engine["flags"][selectedPurpose]
+        if _selected(selectedStorageType):
+            mask &= derived_rows(
+                engine["storage_type"], selectedStorageType, storage_column)
+        storage_technology = _value_counts(
+            engine["storage"], mask, storage_column)
+
+    # Storage Type: narrowed by Purpose and Storage Technology
+    mask = search
+    if purpose_selected and storage_column is not None:
+        mask = mask & engine["flags"][selectedPurpose]
+    if _selected(selectedStorageTechnology):
+        mask = mask & match_rows(
+            index, index["groups"]["storage technology"],
+            selectedStorageTechnology)
+    codes = engine["storage_type"]["codes"][mask]
+    counts = np.bincount(codes[codes >= 0],
+                         minlength=len(engine["storage_type"]["values"]))
+    storage_type = {label: int(count) for label, count
+                    in zip(engine["storage_type"]["values"], counts) if count}
+
+    return {
+        "purpose": purposes,
+        "retention": retention,
+        "storage technology": storage_technology,
+        "storage type": storage_type,
+    }
+
+
+def facet_options(engine, *selections):
+    """
+    Dropdown options for every picker, from facet_counts
+    Returns (purpose, retention, storage technology, storage type) options
+    """
+    counts = facet_counts(engine, *selections)
+
+    purpose_options = NO_DATA
+    if counts["purpose"]:
+        purpose_options = [SHOW_ALL] + [
+            {"label": purpose, "value": purpose}
+            for purpose in counts["purpose"]]
+
+    return (
+        purpose_options,
+        [SHOW_ALL] + [{"label": value, "value": value}
+                      for value in counts["retention"]],
+        [SHOW_ALL] + [{"label": tech, "value": tech}
+                      for tech in counts["storage technology"]],
+        [SHOW_ALL] + [{"label": stype, "value": stype.lower()}
+                      for stype in counts["storage type"]],
+    )
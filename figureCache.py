@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bounded LRU cache for rendered radar figures
+
+Figures are keyed on the canonicalised callback inputs plus a dataset version,
+so a data change can never serve a stale figure. An optional directory
+backend lets every gunicorn worker reuse figures rendered by the others
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.io as pio
+
+
+def dataset_version(df, *extra):
+    """
+    Content hash of a dataframe, used to tie cached output to the data
+    extra values that also shape the output, e.g. colours, are hashed in too
+    Returns short hex string
+    """
+    row_hashes = pd.util.hash_pandas_object(df, index=True).values
+    digest = hashlib.sha256(row_hashes.tobytes())
+    digest.update(json.dumps([str(col) for col in df.columns]).encode())
+    for value in extra:
+        digest.update(json.dumps(value, default=str).encode())
+    return digest.hexdigest()[:16]
+
+
+def canonical_inputs(*values):
+    """
+    Collapses the equivalent "nothing selected" forms of filter picker values
+    None, "" and "all" all mean no filter
+    """
+    return tuple(None if value in (None, "", "all") else value
+                 for value in values)
+
+
+class FigureCache:
+    """
+    LRU of figures in memory, optionally backed by a shared directory
+    Both tiers hold figures as serialised json and are bounded by its bytes
+    Hits and misses are counted across both tiers
+    """
+
+    def __init__(self, max_bytes=64 * 2**20, directory=None,
+                 max_dir_bytes=512 * 2**20):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_dir_bytes = max_dir_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def enabled(self):
+        """
+        Whether either tier keeps figures
+        """
+        return self.max_bytes > 0 or bool(self.directory)
+
+    @staticmethod
+    def key(version, inputs):
+        """
+        Stable key for a dataset version and canonicalised inputs
+        """
+        blob = json.dumps([version, list(inputs)], default=str)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached figure dict for key, or None
+        """
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if body is not None:
+            return json.loads(body)
+
+        body = self._read_file(key)
+        figure = None
+        if body is not None:
+            try:
+                figure = json.loads(body)
+            except ValueError:
+                # a damaged file is a miss
+                body = None
+
+        with self._lock:
+            if body is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, body)
+        return figure
+
+    def set(self, key, figure):
+        """
+        Stores a figure (go.Figure or dict) and returns it as a plain dict
+        Nothing is serialised when neither tier keeps figures
+        """
+        if hasattr(figure, "to_plotly_json"):
+            figure = figure.to_plotly_json()
+        if not self.enabled:
+            return figure
+        body = pio.to_json(figure, validate=False).encode()
+        with self._lock:
+            self._remember(key, body)
+        self._write_file(key, body)
+        return figure
+
+    def clear(self):
+        """
+        Drops the in-memory tier, the shared directory is left to expire
+        """
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        """
+        Returns dict of hit / miss counters and the in-memory tier's size
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _remember(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= len(previous)
+        self._entries[key] = body
+        self.bytes += len(body)
+        while self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= len(evicted)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def _read_file(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as rf:
+                body = rf.read()
+            # refresh mtime so the directory evicts least recently used
+            os.utime(path)
+        except OSError:
+            return None
+        return body
+
+    def _write_file(self, key, body):
+        if not self.directory or len(body) > self.max_dir_bytes:
+            return
+        try:
+            # write then rename, so other workers never read a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as wf:
+                wf.write(body)
+            os.replace(tmp_path, self._path(key))
+            self._evict_files()
+        except OSError:
+            pass
+
+    def _evict_files(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    entries.append((entry.stat(), entry.path))
+                except OSError:
+                    pass
+        total = sum(stat.st_size for stat, _ in entries)
+        if total <= self.max_dir_bytes:
+            return
+        entries.sort(key=lambda entry: entry[0].st_mtime)
+        for stat, path in entries:
+            if total <= self.max_dir_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= stat.st_size
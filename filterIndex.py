@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Precomputed filter index for the data radar
+
+Built once when the radar data is loaded, so callbacks can filter with
+vectorised boolean masks rather than row-wise apply()
+"""
+
+import numpy as np
+import pandas as pd
+
+_NO_ROWS = np.empty(0, dtype=np.intp)
+
+
+def build_filter_index(df, schema):
+    """
+    Maps every value of every column to the sorted row positions holding it,
+    and resolves the columns each picker filters across to their positions
+    Returns dict with the row count, column groups and postings by position
+    """
+    postings = []
+    for col in df.columns:
+        codes, uniques = pd.factorize(df[col])
+        # a stable sort keeps row positions ascending within each value
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        postings.append({
+            value: order[bounds[i]:bounds[i + 1]]
+            for i, value in enumerate(uniques.tolist())
+        })
+
+    return {"rows": len(df), "groups": schema.positions(df),
+            "postings": postings}
+
+
+def match_rows(index, columns, value):
+    """
+    Boolean mask of rows where any of the given column positions equals value
+    Matches the semantics of `value in row.values` across those columns
+    """
+    mask = np.zeros(index["rows"], dtype=bool)
+    for col in columns:
+        mask[index["postings"][col].get(value, _NO_ROWS)] = True
+    return mask
+
+
+def purpose_rows(index, purpose):
+    """
+    Boolean mask of rows flagged for purpose, none for an unknown purpose
+    """
+    flags = index["groups"]["purpose"]
+    if purpose not in flags:
+        return np.zeros(index["rows"], dtype=bool)
+    return match_rows(index, [flags[purpose]], True)
+
+
+def filter_mask(
+    index,
+    searchValue=None,
+    selectedPurpose=None,
+    selectedRetention=None,
+    selectedStorageTechnology=None,
+):
+    """
+    Intersects the search, purpose, retention and storage technology filters
+    "all" or an empty selection leaves that filter off
+    Returns a boolean mask over the indexed rows
+    """
+    mask = np.ones(index["rows"], dtype=bool)
+
+    if searchValue:
+        mask &= match_rows(index, index["groups"]["search"], searchValue)
+
+    # purpose columns are True where the purpose applies
+    if selectedPurpose and selectedPurpose != "all":
+        mask &= purpose_rows(index, selectedPurpose)
+
+    if selectedRetention and selectedRetention != "all":
+        mask &= match_rows(
+            index, index["groups"]["retention"], selectedRetention)
+
+    if selectedStorageTechnology and selectedStorageTechnology != "all":
+        mask &= match_rows(
+            index, index["groups"]["storage technology"],
+            selectedStorageTechnology)
+
+    return mask
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+gunicorn settings for the data radar
+
+The app is imported once, in the master: the heavy imports, reading and
+indexing the default domain and rendering its default view all happen
+there. Workers are forked from it and share those pages copy-on-write
+instead of each redoing the work. The master logs how long the app took to
+load and every worker how long it took to be ready after its fork
+"""
+
+import gc
+import os
+import time
+
+# when gunicorn read this file, just before it loads the app
+_started = time.perf_counter()
+
+# RADAR_PRELOAD=0 has every worker import the app itself, as gunicorn's
+# --reload needs
+preload_app = os.environ.get("RADAR_PRELOAD", "1") == "1"
+
+
+def when_ready(server):
+    if preload_app:
+        server.log.info(
+            "Radar app loaded in %.2fs", time.perf_counter() - _started)
+
+
+def pre_fork(server, worker):
+    # the collector would otherwise write to every shared object it visits,
+    # copying its page into the worker
+    gc.freeze()
+    worker.radar_forked = time.perf_counter()
+
+
+def post_worker_init(worker):
+    import app
+
+    # threads do not survive a fork, so each worker watches the data itself
+    app.radar_domains.start()
+    # nor may an sqlite connection be shared, so each opens its own
+    app.start_background_jobs()
+    worker.log.info(
+        "Radar worker %s ready %.3fs after fork",
+        worker.pid,
+        time.perf_counter() - getattr(worker, "radar_forked", _started),
+    )
@@ -6,22 +6,254 @@ Created on Fri Jan 21 12:25:26 2022
 @author: dan.budden
 """
 
-def pdAutoRead(filepath):
+import hashlib
+import json
+import os
+import sys
+
+# bump when the snapshot layout changes, so old snapshots are re-parsed
+CACHE_FORMAT = 1
+
+
+def pdAutoRead(filepath, cache=False, usecols=None, dtype=None,
+               chunksize=None, validate=None):
     """
     Detects filetype based on string, and uses pandas.read_* to ingest
+    With cache=True, a parsed snapshot kept next to the source is reused
+    for as long as the source is unchanged
+    usecols is the list of columns to keep, those missing from the file are
+    skipped, and dtype maps columns to the dtype to read them as
+    With chunksize, csv and xlsx files are streamed that many rows at a
+    time, so only the kept columns of one chunk are ever held as parsed text
+    validate(chunk) is called on every chunk, or the whole df, and raises
+    to reject the file
     Returns pandas df
     """
     import pandas as pd
-    
-    if filepath[-4:] == ".xls":
-        output = pd.read_excel(filepath, engine="xlrd")
-    elif filepath[-5:] == ".xlsx":
-        output = pd.read_excel(filepath, engine="openpyxl")
-    elif filepath[-4:] == ".csv":
-        output = pd.read_csv(filepath)
-    elif filepath[-7:] == ".pickle":
-        output = pd.read_pickle(filepath)
+
+    options = _read_options(usecols, dtype)
+    if cache:
+        output = _read_cache(filepath, options)
+        if output is not None:
+            return output
+        # taken before parsing, so a file replaced mid-read is parsed again
+        # next time rather than its old content kept as the new version
+        fingerprint = _fingerprint(filepath, options=options)
+
+    keep = None if usecols is None else set(usecols)
+    wanted = None if keep is None else (lambda col: col in keep)
+    if chunksize and filepath[-4:] == ".csv":
+        # closed too when a chunk is rejected
+        with pd.read_csv(filepath, usecols=wanted, dtype=dtype,
+                         chunksize=chunksize) as chunks:
+            output = _concat_chunks(chunks, validate)
+    elif chunksize and filepath[-5:] == ".xlsx":
+        output = _concat_chunks(
+            _xlsx_chunks(filepath, wanted, dtype, chunksize), validate)
     else:
-        raise ValueError("Check format is: xls, xlsx, csv, pickle")
+        if filepath[-4:] == ".xls":
+            output = pd.read_excel(
+                filepath, engine="xlrd", usecols=wanted, dtype=dtype)
+        elif filepath[-5:] == ".xlsx":
+            output = pd.read_excel(
+                filepath, engine="openpyxl", usecols=wanted, dtype=dtype)
+        elif filepath[-4:] == ".csv":
+            output = pd.read_csv(filepath, usecols=wanted, dtype=dtype)
+        elif filepath[-7:] == ".pickle":
+            output = pd.read_pickle(filepath)
+            if wanted is not None:
+                output = output[[col for col in output.columns if wanted(col)]]
+            if dtype:
+                output = output.astype(
+                    {col: t for col, t in dtype.items() if col in output})
+        else:
+            raise ValueError("Check format is: xls, xlsx, csv, pickle")
+        if validate is not None:
+            validate(output)
+
+    if cache:
+        _write_cache(filepath, output, fingerprint, options=options)
+
+    return output
+
+
+def _read_options(usecols, dtype):
+    # what shapes the parsed df besides the file, recorded in its snapshot
+    return {
+        "usecols": None if usecols is None else sorted(usecols),
+        "dtype": {col: str(t) for col, t in sorted((dtype or {}).items())},
+    }
+
+
+def _xlsx_chunks(filepath, wanted, dtype, chunksize):
+    """
+    Streams the first sheet of a workbook without loading it whole
+    Yields pandas df of up to chunksize rows
+    """
+    import openpyxl
+    import pandas as pd
+
+    workbook = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [
+            "Unnamed: {}".format(i) if name is None else str(name)
+            for i, name in enumerate(next(rows, ()))]
+        keep = [i for i, name in enumerate(header)
+                if wanted is None or wanted(name)]
+        names = [header[i] for i in keep]
+        types = {col: t for col, t in (dtype or {}).items() if col in names}
+
+        # rows are numbered on from chunk to chunk, as read_csv does
+        start = 0
+        batch = []
+        for row in _trim_blank_rows(rows):
+            batch.append([row[i] if i < len(row) else None for i in keep])
+            if len(batch) == chunksize:
+                yield pd.DataFrame(
+                    batch, columns=names,
+                    index=range(start, start + len(batch))).astype(types)
+                start += len(batch)
+                batch = []
+        if batch or not start:
+            yield pd.DataFrame(
+                batch, columns=names,
+                index=range(start, start + len(batch))).astype(types)
+    finally:
+        workbook.close()
+
+
+def _trim_blank_rows(rows):
+    """
+    The rows of a sheet up to its last one with a value, as read_excel
+    reads them: blank rows after it, e.g. styled but empty, are dropped,
+    blank rows between others are kept
+    """
+    blank = []
+    for row in rows:
+        if all(value is None or value == "" for value in row):
+            blank.append(row)
+            continue
+        yield from blank
+        blank = []
+        yield row
+
+
+def _concat_chunks(chunks, validate=None):
+    """
+    Validates each chunk as it is read, then joins them
+    Categorical columns are joined on the union of their categories, sorted
+    Returns pandas df
+    """
+    import pandas as pd
+    from pandas.api.types import union_categoricals
+
+    frames = []
+    for chunk in chunks:
+        if validate is not None:
+            validate(chunk)
+        frames.append(chunk)
+    if not frames:
+        raise ValueError("No rows to read")
+
+    columns = {}
+    for col in frames[0].columns:
+        parts = [frame[col] for frame in frames]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            columns[col] = union_categoricals(
+                parts, sort_categories=True, ignore_order=True)
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def cache_path(filepath, options=None):
+    """
+    Where the snapshot of filepath lives: a hidden file beside it, one per
+    set of read options, so reads that keep different columns never
+    replace each other's snapshot
+    """
+    folder, name = os.path.split(filepath)
+    if options is None or options == _read_options(None, None):
+        return os.path.join(folder, "." + name + ".pdcache")
+    digest = hashlib.sha256(
+        json.dumps(options, sort_keys=True).encode()).hexdigest()[:12]
+    return os.path.join(folder, ".{}.{}.pdcache".format(name, digest))
+
+
+def _fingerprint(filepath, content_hash=True, options=None):
+    import pandas as pd
+
+    stat = os.stat(filepath)
+    fingerprint = {
+        "format": CACHE_FORMAT,
+        "pandas": pd.__version__,
+        "read": options or _read_options(None, None),
+        "path": os.path.abspath(filepath),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+    if content_hash:
+        digest = hashlib.sha256()
+        with open(filepath, "rb") as rf:
+            for block in iter(lambda: rf.read(1 << 20), b""):
+                digest.update(block)
+        fingerprint["sha256"] = digest.hexdigest()
+    return fingerprint
+
+
+def _read_cache(filepath, options=None):
+    import pickle
+
+    try:
+        with open(cache_path(filepath, options), "rb") as rf:
+            snapshot = pickle.load(rf)
+        stored = snapshot["fingerprint"]
+        current = _fingerprint(filepath, content_hash=False, options=options)
+    except (OSError, pickle.UnpicklingError, EOFError, KeyError,
+            AttributeError, ImportError, TypeError):
+        return None
+
+    if any(stored.get(key) != value for key, value in current.items()):
+        # size or mtime moved, the content may still be the same
+        if stored.get("size") != current["size"]:
+            return None
+        current = _fingerprint(filepath, options=options)
+        unchanged = ("format", "pandas", "read", "path", "size", "sha256")
+        if any(stored.get(key) != current[key] for key in unchanged):
+            return None
+        _write_cache(filepath, snapshot["df"], current, options)
+
+    return snapshot["df"]
+
+
+def _write_cache(filepath, df, fingerprint=None, options=None):
+    import pickle
+    import tempfile
+
+    target = cache_path(filepath, options)
+    try:
+        snapshot = {
+            "fingerprint": fingerprint or _fingerprint(
+                filepath, options=options),
+            "df": df,
+        }
+        # write then rename, so a concurrent reader never sees half a file
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(target) or ".", suffix=".tmp")
+        with os.fdopen(fd, "wb") as wf:
+            pickle.dump(snapshot, wf, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, target)
+    except OSError:
+        # a read-only data folder just means no snapshot
+        pass
+
 
-    return output
\ No newline at end of file
+if __name__ == "__main__":
+    # pre-build snapshots of whole files, e.g. at image build time:
+    # python pdAutoRead.py data/radar_data_cdm.csv
+    # the app reads only some columns, into snapshots of its own, which
+    # prerenderRadar.py builds
+    for path in sys.argv[1:]:
+        pdAutoRead(path, cache=True)
+        print("cached", path, "->", cache_path(path))
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Radar figures rendered ahead of time, for every view without a search
+
+    python prerenderRadar.py /app/prerendered --workers 4
+
+renders the radar of every domain for each reachable combination of the
+Purpose, Retention, Storage Technology and Storage Type pickers, across a
+process pool. Each distinct figure is written once, named after the hash of
+its content, and a manifest per dataset version maps the figure cache key
+of every combination to its file. Focus is applied in the browser, so one
+figure serves every Focus level, except in progressive mode
+
+With RADAR_PRERENDER_DIR set to the directory, the app serves these figures
+instead of rendering them while the data is unchanged. The manifest records
+RADAR_PROGRESSIVE_LEVELS, which decides the rings a figure holds, and an app
+running with another setting renders every view itself
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly.io as pio
+
+logger = logging.getLogger(__name__)
+
+# the app as loaded in this process, by prerender() or a pool worker
+_app = None
+
+
+class PrerenderedFigures:
+    """
+    Read side of a directory written by prerender(), for an app drawing
+    progressive_levels rings at first, as app.progressive_levels
+    """
+
+    def __init__(self, directory, progressive_levels=0):
+        self.directory = directory
+        self.progressive_levels = progressive_levels
+        self._manifests = {}
+        self._lock = threading.Lock()
+
+    def manifest(self, version):
+        """
+        Returns dict of figure cache key -> file for a dataset version,
+        empty when that version was not prerendered, or was for another
+        progressive_levels
+        """
+        with self._lock:
+            if version not in self._manifests:
+                try:
+                    with open(os.path.join(
+                            self.directory, version + ".json")) as rf:
+                        manifest = json.load(rf)
+                except (OSError, ValueError):
+                    # looked for again, it may be rendered yet
+                    return {}
+                self._manifests[version] = self._figures(version, manifest)
+            return self._manifests[version]
+
+    def _figures(self, version, manifest):
+        if manifest.get("progressive_levels") != self.progressive_levels:
+            logger.warning(
+                "not serving the figures prerendered for %s, they were "
+                "rendered with RADAR_PROGRESSIVE_LEVELS=%s", version,
+                manifest.get("progressive_levels"))
+            return {}
+        return manifest["figures"]
+
+    def get(self, version, key):
+        """
+        Returns the prerendered figure dict for key, or None
+        """
+        name = self.manifest(version).get(key)
+        if name is None:
+            return None
+        try:
+            with open(os.path.join(self.directory, "figures", name)) as rf:
+                return json.load(rf)
+        except (OSError, ValueError):
+            return None
+
+
+def _write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as wf:
+        wf.write(data)
+    os.replace(tmp_path, path)
+
+
+def _load_app(root):
+    global _app
+    # rendered for the files, nothing cached, nothing served or reloaded
+    os.environ.update({
+        "RADAR_FIGURE_CACHE_MB": "0",
+        "RADAR_RELOAD_INTERVAL": "0",
+    })
+    for name in ("RADAR_FIGURE_CACHE_DIR", "RADAR_PRERENDER_DIR",
+                 "RADAR_SLIM_FIGURES", "RADAR_CLIENTSIDE",
+                 "RADAR_SHARED_DIR"):
+        os.environ.pop(name, None)
+    os.chdir(root)
+    _app = importlib.import_module("app")
+    return _app
+
+
+def combinations(app, domain):
+    """
+    Filter values reachable through the pickers' own options, Focus cut
+    levels last
+    Yields (purpose, retention, storage technology, storage type, levels)
+    """
+    radar = app.domain_data(domain)
+    facets = radar["facets"]
+    storage_types = ["all"] + [
+        value.lower() for value
+        in radar["derived"][app.storage_type_column]["values"]]
+    cuts = [len(app.levels)]
+    if app.progressive_levels:
+        cuts = range(2, len(app.levels) + 1)
+    for purpose in ["all"] + app.radar_schema.purposes:
+        for storage_type in storage_types:
+            # Retention follows Purpose, Storage Technology follows Purpose
+            # and Storage Type
+            _, retention, technology, _ = app.facet_options(
+                facets, None, purpose, "all", "all", storage_type)
+            for ret in retention:
+                for tech in technology:
+                    for cut in cuts:
+                        yield (purpose, ret["value"], tech["value"],
+                               storage_type, cut)
+
+
+def _render(task):
+    domain, (purpose, retention, technology, storage_type, cut) = task
+    radar = _app.domain_data(domain)
+    key = _app.radar_cache_key(
+        radar, None, "Default", cut, None,
+        purpose, retention, technology, storage_type)
+    render = getattr(_app.pop_data_radar, "__wrapped__", _app.pop_data_radar)
+    figure, _ = render(
+        None, "Default", purpose, retention, technology, storage_type, cut,
+        domain)
+    # the figure may hold numpy arrays, which plotly's encoder handles
+    body = pio.to_json(figure, validate=False).encode()
+    return radar["version"], key, hashlib.sha256(body).hexdigest()[:32], body
+
+
+def prerender(directory, domains=None, workers=None, root=None):
+    """
+    Renders every view without a search into directory
+    Returns dict of counts for the run
+    """
+    root = os.path.abspath(root or os.path.dirname(os.path.abspath(__file__)))
+    directory = os.path.abspath(directory)
+    os.makedirs(os.path.join(directory, "figures"), exist_ok=True)
+    app = _app or _load_app(root)
+
+    tasks = [(domain, combination)
+             for domain in domains or app.radar_domain_names
+             for combination in combinations(app, domain)]
+
+    manifests = {}
+    written = 0
+    with ProcessPoolExecutor(
+            workers, initializer=_load_app, initargs=(root,)) as pool:
+        for version, key, digest, body in pool.map(
+                _render, tasks, chunksize=16):
+            name = digest + ".json"
+            path = os.path.join(directory, "figures", name)
+            if not os.path.exists(path):
+                _write_atomic(path, body)
+                written += 1
+            manifests.setdefault(version, {})[key] = name
+
+    # a manifest is written last, so the app never sees missing figures
+    for version, manifest in manifests.items():
+        _write_atomic(os.path.join(directory, version + ".json"), json.dumps(
+            {"progressive_levels": app.progressive_levels,
+             "figures": manifest}, sort_keys=True).encode())
+    return {"views": len(tasks), "figures": written,
+            "versions": len(manifests)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Renders every radar view without a search to a folder")
+    parser.add_argument("directory", help="folder to write the figures to")
+    parser.add_argument("--domain", action="append",
+                        help="domain to render, every domain by default")
+    parser.add_argument(
+        "--workers", type=int,
+        help="processes to render with, one per cpu by default")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = prerender(args.directory, args.domain, args.workers,
+                       root=os.getcwd())
+    print("{views} views, {figures} new figures, {versions} data versions"
+          .format(**counts),
+          "in {:.1f}s".format(time.perf_counter() - start))
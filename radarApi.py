@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Read-only JSON API over the radar data
+
+register_api() adds to the flask server
+
+    /api/v1/entities   the data entities, one per row of the radar data
+    /api/v1/subtree    the radar nodes under a node, with their entity counts
+                       and rollups
+
+both filtered with the same domain, search, purpose, retention,
+storage_technology and storage_type parameters as the radar, and entities
+also by node. Results come a page at a time, limit at most, with the cursor
+of the next page under "next" and in a Link header. Asking for
+application/x-ndjson, or format=ndjson, streams the records one per line.
+Every response carries a weak ETag derived from the dataset version and
+the query, so a client polling with If-None-Match gets a 304 until the data
+changes. It is weak as the same answer may be sent gzipped or not
+"""
+
+import base64
+import hashlib
+import json
+
+import flask
+import numpy as np
+
+from radarTree import (
+    ROLLUP_COLUMNS, node_counts, node_customdata, node_rollups)
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 10000
+# records serialised at a time when streaming
+_STREAM_BATCH = 500
+
+_FILTERS = ("search", "purpose", "retention", "storage_technology",
+            "storage_type")
+
+
+class ApiError(Exception):
+    """
+    A request the API cannot answer, sent back as a json error
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _jsonable(value):
+    # numpy scalars and missing values as json understands them
+    if value is None or value != value:
+        return None
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def encode_cursor(version, position):
+    """
+    Opaque cursor for the rows or nodes from position on, in this version
+    """
+    return base64.urlsafe_b64encode(
+        "{}:{}".format(version, position).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, version):
+    """
+    Returns the position a cursor points at
+    Raises ApiError if it is malformed, or from another version of the data
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_version, position = base64.urlsafe_b64decode(
+            padded.encode()).decode().split(":")
+        position = int(position)
+    except ValueError:
+        raise ApiError("malformed cursor")
+    if cursor_version != version:
+        raise ApiError("the data has changed since this cursor, start again",
+                       409)
+    return position
+
+
+def _limit(args):
+    try:
+        limit = int(args.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiError("limit must be a number")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError("limit must be between 1 and {}".format(MAX_LIMIT))
+    return limit
+
+
+def _page(positions, version, args):
+    """
+    The positions of the requested page, and the cursor after it or None
+    """
+    start = 0
+    if args.get("cursor"):
+        start = decode_cursor(args["cursor"], version)
+    limit = _limit(args)
+    positions = positions[np.searchsorted(positions, start):]
+    if len(positions) <= limit:
+        return positions, None
+    return positions[:limit], encode_cursor(version, positions[limit])
+
+
+def _etag(version, args):
+    query = json.dumps(sorted(args.items(multi=True)))
+    return hashlib.sha256(
+        (version + query).encode()).hexdigest()[:32]
+
+
+def _respond(name, version, records, next_cursor):
+    """
+    The page as one json document, or streamed as ndjson, with the caching
+    and paging headers
+    """
+    request = flask.request
+    accepted = request.accept_mimetypes.best_match(
+        ["application/json", "application/x-ndjson"])
+    ndjson = request.args.get("format") == "ndjson" or (
+        accepted == "application/x-ndjson")
+
+    if ndjson:
+        def lines():
+            batch = []
+            for record in records:
+                batch.append(json.dumps(record, default=_jsonable))
+                if len(batch) == _STREAM_BATCH:
+                    yield "\n".join(batch) + "\n"
+                    batch = []
+            if batch:
+                yield "\n".join(batch) + "\n"
+
+        response = flask.Response(lines(), mimetype="application/x-ndjson")
+    else:
+        response = flask.Response(
+            json.dumps({"version": version, name: list(records),
+                        "next": next_cursor}, default=_jsonable),
+            mimetype="application/json")
+
+    if next_cursor is not None:
+        args = request.args.to_dict()
+        args["cursor"] = next_cursor
+        response.headers["Link"] = '<{}>; rel="next"'.format(
+            flask.url_for(request.endpoint, **args))
+    return response
+
+
+def register_api(server, snapshot, radar_mask, custom_data_columns,
+                 prefix="/api/v1"):
+    """
+    Adds the entity and subtree routes to server
+    snapshot(domain) returns the data of a domain, None if there is none,
+    radar_mask(radar, search, purpose, retention, storage technology,
+    storage type) the rows the radar shows for those filters
+    """
+
+    def query():
+        args = flask.request.args
+        radar = snapshot(args.get("domain"))
+        if radar is None:
+            raise ApiError("no such domain", 404)
+        etag = _etag(radar["version"], args)
+        if flask.request.if_none_match.contains_weak(etag):
+            return radar, None, etag
+        mask = radar_mask(radar, *(args.get(name) for name in _FILTERS))
+        return radar, mask, etag
+
+    def subtree_node(radar, node_id):
+        tree = radar["tree"]
+        position = tree["id_index"].get_indexer([node_id])[0]
+        if position < 0:
+            raise ApiError("no such node", 404)
+        return int(position)
+
+    def conditional(view):
+        # a 304 for a client that has this version of the answer
+        def respond():
+            try:
+                radar, mask, etag = query()
+                if mask is None:
+                    response = flask.Response(status=304)
+                else:
+                    response = view(radar, mask)
+            except ApiError as error:
+                return flask.jsonify(error=str(error)), error.status
+            response.set_etag(etag, weak=True)
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+
+        respond.__name__ = view.__name__
+        return respond
+
+    @server.route(prefix + "/entities")
+    @conditional
+    def api_entities(radar, mask):
+        tree = radar["tree"]
+        args = flask.request.args
+        if args.get("node"):
+            node = subtree_node(radar, args["node"])
+            mask = mask & (tree["row_node"][tree["depths"][node]] == node)
+
+        positions, next_cursor = _page(
+            np.flatnonzero(mask), radar["version"], args)
+        df = radar["df"]
+        columns = list(df.columns)
+        # the node of a row is the deepest one it reaches
+        reached = (tree["row_node"] >= 0).sum(axis=0)
+
+        def records():
+            for start in range(0, len(positions), _STREAM_BATCH):
+                rows = positions[start:start + _STREAM_BATCH]
+                values = df.iloc[rows].astype(object).to_numpy()
+                nodes = tree["row_node"][reached[rows] - 1, rows]
+                # and the columns the rules derive, e.g. "storage type"
+                derived = [
+                    (name.lower(), entry["values"], entry["codes"][rows])
+                    for name, entry in radar["derived"].items()]
+                for i, (row_values, node) in enumerate(zip(values, nodes)):
+                    record = {"id": tree["ids"][node] if node >= 0 else None}
+                    record.update(
+                        (col, _jsonable(value))
+                        for col, value in zip(columns, row_values))
+                    record.update(
+                        (name, names[codes[i]] if codes[i] >= 0 else None)
+                        for name, names, codes in derived)
+                    yield record
+
+        return _respond("entities", radar["version"], records(), next_cursor)
+
+    @server.route(prefix + "/subtree")
+    @conditional
+    def api_subtree(radar, mask):
+        tree = radar["tree"]
+        args = flask.request.args
+        root = 0
+        if args.get("node"):
+            root = subtree_node(radar, args["node"])
+
+        unfiltered = mask.all()
+        counts = tree["leaf_counts"] if unfiltered else node_counts(tree, mask)
+
+        # nodes in creation order, every parent before its children
+        under = tree["ancestors"][tree["depths"][root]] == root
+        positions, next_cursor = _page(
+            np.flatnonzero(under & (counts > 0)), radar["version"], args)
+
+        # hover data of this page's nodes only, pre-joined when unfiltered
+        if unfiltered:
+            customdata = tree["customdata"][positions]
+            rollups = tree.get("rollups")
+            rollups = None if rollups is None else rollups[positions]
+        else:
+            customdata = node_customdata(tree, mask, positions)
+            rollups = (node_rollups(tree, mask, positions) if "rollups" in tree
+                       else None)
+
+        def records():
+            for i, node in enumerate(positions):
+                parent = tree["parents"][node]
+                record = {
+                    "id": tree["ids"][node],
+                    "label": tree["labels"][node],
+                    "parent": tree["ids"][parent] if parent >= 0 else None,
+                    "depth": int(tree["depths"][node]),
+                    "entities": int(counts[node]),
+                    "hover": dict(zip(custom_data_columns, customdata[i])),
+                }
+                if rollups is not None:
+                    record["rollup"] = dict(zip(ROLLUP_COLUMNS, rollups[i]))
+                yield record
+
+        return _respond("nodes", radar["version"], records(), next_cursor)
+
+    return server
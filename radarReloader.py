@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hot reload of the radar data, for one or several domains
+
+The data and everything derived from it are built into one snapshot by a
+loader function. A background thread watches the files the snapshot was
+built from and, when any of them changes, builds a new snapshot and swaps it
+in. Callbacks take the current snapshot once and use it throughout, so a
+request always finishes on the data it started with. SnapshotLRU keeps
+snapshots of several domains, loaded on first use and bounded in memory
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from functools import partial
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+
+def file_signature(paths):
+    """
+    (size, mtime) of each path, None for a missing file
+    Returns tuple, equal for as long as none of the files change
+    """
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def file_digest(path):
+    """
+    sha256 of the content of path, None for a missing file
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as rf:
+            for block in iter(lambda: rf.read(1 << 20), b""):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+class SnapshotReloader:
+    """
+    Holds the current snapshot, rebuilding it when its sources change
+    load() must return a dict with a "sources" list of the files it read
+    """
+
+    def __init__(self, load, interval=5.0):
+        self.load = load
+        self.interval = interval
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        snapshot = load()
+        self._snapshot = MappingProxyType(dict(snapshot))
+        self._signature = file_signature(snapshot["sources"])
+        self._failed = None
+
+    @property
+    def current(self):
+        """
+        The latest snapshot, a read-only mapping
+        """
+        return self._snapshot
+
+    def check(self):
+        """
+        Rebuilds and swaps in the snapshot if any source file has changed
+        A failed rebuild keeps the current snapshot
+        Returns True when a new snapshot was swapped in
+        """
+        with self._lock:
+            sources = self._snapshot["sources"]
+            signature = file_signature(sources)
+            if signature in (self._signature, self._failed):
+                return False
+            try:
+                snapshot = self.load()
+            except Exception:
+                # a half-written file is normal mid-update, the next write
+                # to it is retried
+                logger.exception("radar data reload failed")
+                self._failed = signature
+                return False
+            # sampled before loading, so a write during the load is seen
+            # as a change next time round
+            if list(snapshot["sources"]) != list(sources):
+                signature = file_signature(snapshot["sources"])
+            self._snapshot = MappingProxyType(dict(snapshot))
+            self._signature = signature
+            self.reloads += 1
+            logger.info("radar data reloaded, version %s",
+                        snapshot.get("version"))
+            return True
+
+    def start(self):
+        """
+        Starts the background watcher, once per process
+        """
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(
+                target=self._watch, name="radar-reloader", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+
+class SnapshotLRU:
+    """
+    Snapshots of several datasets, each loaded on first use and reloaded as
+    its files change
+    load(key) must return a snapshot dict with "sources", and "bytes" for
+    its approximate size. Least recently used snapshots are dropped once the
+    total passes max_bytes, or there are more than max_items
+    """
+
+    def __init__(self, load, max_bytes=None, max_items=None, interval=5.0):
+        self.load = load
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.interval = interval
+        self.loads = 0
+        self.evictions = 0
+        self._reloaders = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def get(self, key):
+        """
+        The current snapshot for key, loading it if need be
+        Concurrent first requests for a key load it once
+        """
+        with self._lock:
+            reloader = self._reloaders.get(key)
+            if reloader is not None:
+                self._reloaders.move_to_end(key)
+                return reloader.current
+            loading = self._loading.setdefault(key, threading.Lock())
+
+        with loading:
+            with self._lock:
+                reloader = self._reloaders.get(key)
+            if reloader is None:
+                try:
+                    # the watcher thread checks every loaded key, not one
+                    # each
+                    reloader = SnapshotReloader(
+                        partial(self.load, key), interval=0)
+                    with self._lock:
+                        self._reloaders[key] = reloader
+                        self.loads += 1
+                        self._evict(key)
+                finally:
+                    # also when the load failed, for the next request to
+                    # try afresh
+                    with self._lock:
+                        if self._loading.get(key) is loading:
+                            del self._loading[key]
+        return reloader.current
+
+    def _evict(self, keep):
+        def over():
+            if self.max_items and len(self._reloaders) > self.max_items:
+                return True
+            return bool(self.max_bytes) and sum(
+                reloader.current.get("bytes", 0)
+                for reloader in self._reloaders.values()) > self.max_bytes
+
+        while len(self._reloaders) > 1 and over():
+            oldest = next(iter(self._reloaders))
+            if oldest == keep:
+                self._reloaders.move_to_end(keep)
+                continue
+            # requests already holding its snapshot keep it until they finish
+            del self._reloaders[oldest]
+            self.evictions += 1
+
+    def keys(self):
+        with self._lock:
+            return list(self._reloaders)
+
+    def check(self):
+        """
+        Reloads every loaded snapshot whose files have changed
+        Returns the keys reloaded
+        """
+        with self._lock:
+            reloaders = list(self._reloaders.items())
+        return [key for key, reloader in reloaders if reloader.check()]
+
+    def start(self):
+        """
+        Starts the background watcher, once per process
+        """
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(
+                target=self._watch, name="radar-reloader", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            self.check()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Derived columns of the radar data, declared in a rules file
+
+    column,value,source,match,pattern
+    Storage Type,Ephemeral,storage technology,contains,AWS Lambda
+    Storage Type,Persisted,,default,
+
+Each rule gives a derived column a value on the rows where its source
+matches. The source is a column of the radar data, or a group of columns
+by role ("search", "retention", "storage technology"), which matches if any
+of its columns does. match is contains, equals or regex, against pattern,
+or default, which matches every row. The first matching rule of a column
+wins, rows no rule matches are left empty
+
+compile_rules() turns the table into tests, run on the distinct values of
+each source column rather than on every row. derive_columns() materialises
+every derived column once per load, per row and per source column
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+_MATCHES = {
+    "contains": lambda values, pattern: values.str.contains(
+        pattern, regex=False),
+    "equals": lambda values, pattern: values == pattern,
+    # not str.contains, which warns of a pattern with groups
+    "regex": lambda values, pattern: values.map(
+        lambda value: re.search(pattern, value) is not None),
+}
+
+
+def compile_rules(rules_df, schema, columns):
+    """
+    Checks the rules against the schema groups and the radar data columns
+    Returns dict of derived column -> list of (value, source columns, match,
+    pattern), source columns empty for a default rule
+    Raises ValueError for a rule that cannot be applied, naming its line in
+    the rules file, the header being line 1
+    """
+    compiled = {}
+    for i, row in enumerate(rules_df.fillna("").itertuples(index=False)):
+        rule = "Rule on line {} for {}".format(i + 2, row.column)
+        match = row.match.strip().lower()
+        if match == "default":
+            sources = []
+        elif match not in _MATCHES:
+            raise ValueError(
+                "{} has unknown match {!r}".format(rule, row.match))
+        elif row.source in schema.groups:
+            sources = schema.groups[row.source]
+        elif row.source in columns:
+            sources = [row.source]
+        else:
+            raise ValueError(
+                "{} has unknown source {!r}".format(rule, row.source))
+        if match == "regex":
+            try:
+                re.compile(str(row.pattern))
+            except re.error as error:
+                raise ValueError("{} has an invalid pattern {!r}: {}".format(
+                    rule, row.pattern, error))
+        compiled.setdefault(row.column, []).append(
+            (row.value, sources, match, str(row.pattern)))
+    return compiled
+
+
+def _column_matches(series, match, pattern):
+    """
+    Boolean per row of series, tested on its distinct values only
+    Empty cells never match
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        uniques = series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series)
+    hits = np.asarray(
+        _MATCHES[match](pd.Series(uniques.astype(str)), pattern), dtype=bool)
+    return np.where(codes >= 0, hits[np.maximum(codes, 0)], False)
+
+
+def _apply(rules, values, n_rows, matches, only=None):
+    # codes into values, the first matching rule per row, -1 for none
+    codes = np.full(n_rows, -1, dtype=np.int8)
+    for value, sources, match, pattern in rules:
+        if only is not None and sources:
+            sources = [col for col in sources if col == only]
+            if not sources:
+                continue
+        hit = np.ones(n_rows, dtype=bool)
+        if sources:
+            hit = np.zeros(n_rows, dtype=bool)
+            for col in sources:
+                hit |= matches[col, match, pattern]
+        codes[(codes < 0) & hit] = values.index(value)
+    return codes
+
+
+def derive_columns(df, compiled):
+    """
+    Evaluates the compiled rules over df
+    Returns dict of derived column -> dict of its "values" in rule order,
+    per row "codes" into them, -1 where no rule matched, and "columns", the
+    codes from each source column on its own
+    """
+    # each distinct test is run once, whichever rules share it
+    matches = {}
+    for rules in compiled.values():
+        for _, sources, match, pattern in rules:
+            for col in sources:
+                if (col, match, pattern) not in matches:
+                    matches[col, match, pattern] = _column_matches(
+                        df[col], match, pattern)
+
+    derived = {}
+    for name, rules in compiled.items():
+        values = list(dict.fromkeys(value for value, _, _, _ in rules))
+        sources = list(dict.fromkeys(
+            col for _, cols, _, _ in rules for col in cols))
+        derived[name] = {
+            "values": values,
+            "codes": _apply(rules, values, len(df), matches),
+            "columns": {col: _apply(rules, values, len(df), matches, col)
+                        for col in sources},
+        }
+    return derived
+
+
+def derived_rows(derived, value, column=None):
+    """
+    Boolean mask of rows whose derived value is value, compared without
+    case, from one source column if given and derived from it
+    """
+    codes = derived["columns"].get(column, derived["codes"])
+    for i, name in enumerate(derived["values"]):
+        if str(name).lower() == str(value).lower():
+            return codes == i
+    return np.zeros(len(codes), dtype=bool)
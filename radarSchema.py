@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+What each column of the radar data is for
+
+A RadarSchema is declared once, with the sunburst levels, the hover columns
+and for each purpose its flag column and, where it has them, its retention
+and storage technology columns. Everything else is derived from it: the
+columns to read, the picker groups, and the checks a spreadsheet has to
+pass. positions() resolves the groups against a loaded df to the integer
+column positions the filter index addresses them by
+"""
+
+import numpy as np
+
+
+class RadarSchema:
+    """
+    Column roles of the radar data
+    purposes maps each purpose, in picker order, to its (flag, retention,
+    storage technology) columns, None where it has none
+    retention_picker lists the purposes whose retention periods the
+    Retention picker offers, every purpose with a retention column if None
+    """
+
+    def __init__(self, levels, purposes, hover_columns,
+                 retention_picker=None):
+        # levels[0] is the domain, added to the data once it is read
+        self.levels = list(levels)
+        self.hover_columns = list(hover_columns)
+        self.purposes = list(purposes)
+        self.flags = {}
+        self.retention = {}
+        self.storage = {}
+        for purpose, (flag, retention, storage) in purposes.items():
+            self.flags[purpose] = flag
+            if retention is not None:
+                self.retention[purpose] = retention
+            if storage is not None:
+                self.storage[purpose] = storage
+
+        self.retention_columns = list(self.retention.values())
+        # the Retention filter reads every retention column, its picker
+        # may offer the values of fewer
+        self.picker_retention = {
+            purpose: col for purpose, col in self.retention.items()
+            if retention_picker is None or purpose in retention_picker}
+        self.storage_columns = list(self.storage.values())
+        # search looks at the entity names, every level below the domain
+        self.search_columns = self.levels[1:]
+        # each repeats a few values over every row
+        self.category_columns = _unique(
+            list(self.flags.values()) + self.retention_columns
+            + self.storage_columns + self.hover_columns)
+        self.source_columns = _unique(
+            self.search_columns + self.category_columns)
+        # the columns each picker filters across
+        self.groups = {
+            "search": self.search_columns,
+            "retention": self.retention_columns,
+            "storage technology": self.storage_columns,
+        }
+
+    def validate(self, df):
+        """
+        Rejects radar data missing a column of the schema, or with a level
+        left empty above a filled one, which the sunburst cannot draw
+        Raises ValueError
+        """
+        missing = [col for col in self.source_columns if col not in df.columns]
+        if missing:
+            raise ValueError(
+                "Radar data is missing columns: {}".format(", ".join(missing)))
+
+        filled = df[self.search_columns].notna().to_numpy()
+        gaps = np.flatnonzero((~filled[:, :-1] & filled[:, 1:]).any(axis=1))
+        if len(gaps):
+            raise ValueError(
+                "Radar data rows {} have an empty level above a filled one"
+                .format(", ".join(str(row) for row in df.index[gaps[:5]])))
+
+    def radar_storage_column(self, columns):
+        """
+        The storage technology column the radar's Storage Type filter reads,
+        the first of them in the data's column order, None if there is none
+        """
+        return next((col for col in columns if col in self.storage_columns),
+                    None)
+
+    def positions(self, df):
+        """
+        Integer positions in df of the columns each picker filters on
+        Returns dict of picker -> list of positions, "purpose" as dict of
+        purpose -> position of its flag
+        """
+        self.validate(df.iloc[:0])
+        position = {col: i for i, col in enumerate(df.columns)}
+        positions = {group: [position[col] for col in columns]
+                     for group, columns in self.groups.items()}
+        positions["purpose"] = {purpose: position[col]
+                                for purpose, col in self.flags.items()}
+        return positions
+
+
+def _unique(columns):
+    # first occurrence of each, in order
+    return list(dict.fromkeys(columns))
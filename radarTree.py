@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compiled hierarchy for the data radar sunburst
+
+The domain / level columns are turned into an array-backed tree once at load
+time. Each request then only counts the filtered rows per node, and the
+sunburst is assembled from the arrays rather than re-aggregated by
+px.sunburst. Node order, ids, values and customdata match what
+px.sunburst(path=...) produces for the same rows
+
+The figure can also be cut to its top rings plus the subtree of one node,
+so a deep or wide radar is sent a branch at a time as the user clicks in
+
+Given the schema, each node also gets a rollup of the rows under it: the
+purposes they are flagged for, their longest retention and their storage
+technologies. Rows are placed on their deepest node and merged up the tree a
+ring at a time, once at load time for the unfiltered view and again per
+filtered render, which only touches the masked rows and the node arrays
+"""
+
+import functools
+import json
+import re
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+# px.sunburst marks a node whose rows disagree on a custom_data value this way
+MIXED = "(?)"
+
+# hover names of the node_rollups() columns, in order
+ROLLUP_COLUMNS = ["Purposes", "Longest retention", "Storage technologies"]
+
+_RETENTION_DAYS = {"day": 1, "week": 7, "month": 30, "year": 365}
+
+
+def build_radar_tree(df, levels, custom_data_columns, schema=None):
+    """
+    Builds the node arrays for the given path columns, root first
+    Rows stop contributing at their first empty level, as in px.sunburst
+    With the RadarSchema of df, the per-row rollup inputs are added too
+    Returns dict of node and per-row arrays
+    """
+    n_rows = len(df)
+    ids, labels, parents, depths = [], [], [], []
+    sort_keys = []
+    row_node = np.full((len(levels), n_rows), -1, dtype=np.intp)
+    depth_order = []
+
+    reached = np.ones(n_rows, dtype=bool)
+    parent_of_row = np.zeros(n_rows, dtype=np.intp)
+    for depth, level in enumerate(levels):
+        values = df[level]
+        reached &= values.notna().to_numpy()
+        rows = np.flatnonzero(reached)
+
+        # a node is a distinct (parent, value) pair among the rows reaching it
+        value_codes, value_uniques = pd.factorize(values.iloc[rows])
+        parent_codes = (parent_of_row[rows] if depth
+                        else np.zeros(len(rows), dtype=np.intp))
+        pair_codes, pairs = pd.factorize(
+            parent_codes * (len(value_uniques) + 1) + value_codes)
+
+        first = len(ids)
+        node_parent = np.empty(len(pairs), dtype=np.intp)
+        node_value = np.empty(len(pairs), dtype=object)
+        node_parent[pair_codes] = parent_codes
+        node_value[pair_codes] = np.asarray(
+            value_uniques, dtype=object)[value_codes]
+
+        for parent, value in zip(node_parent, node_value):
+            label = str(value)
+            labels.append(label)
+            depths.append(depth)
+            if depth:
+                ids.append(ids[parent] + "/" + label)
+                parents.append(parent)
+                sort_keys.append((value,) + sort_keys[parent])
+            else:
+                ids.append(label)
+                parents.append(-1)
+                sort_keys.append((value,))
+
+        # px emits each ring sorted on the raw values, deepest level first
+        ring = np.arange(first, len(ids))
+        ring_order = sorted(ring, key=lambda node: sort_keys[node])
+        depth_order.append(np.asarray(ring_order, dtype=np.intp))
+
+        row_node[depth, rows] = first + pair_codes
+        parent_of_row = row_node[depth]
+
+    # customdata columns as codes, so per-node agreement is a min / max test
+    custom = df[custom_data_columns].astype(object).fillna("N/A")
+    custom_codes = np.empty((n_rows, len(custom_data_columns)), dtype=np.intp)
+    custom_uniques = []
+    for i, col in enumerate(custom_data_columns):
+        codes, uniques = pd.factorize(custom[col])
+        custom_codes[:, i] = codes
+        custom_uniques.append(np.asarray(uniques, dtype=object))
+
+    # ancestor of every node at each depth, itself at its own depth, so a
+    # subtree is one comparison over a row of this
+    depths = np.asarray(depths, dtype=np.int8)
+    parents = np.asarray(parents, dtype=np.intp)
+    ancestors = np.full((len(levels), len(ids)), -1, dtype=np.int32)
+    for depth in range(len(levels)):
+        nodes = np.flatnonzero(depths == depth)
+        ancestors[:depth, nodes] = ancestors[:depth, parents[nodes]]
+        ancestors[depth, nodes] = nodes
+
+    tree = {
+        "ids": np.asarray(ids, dtype=object),
+        "labels": np.asarray(labels, dtype=object),
+        "parents": parents,
+        "depths": depths,
+        "ancestors": ancestors,
+        "id_index": pd.Index(ids, dtype=object),
+        "depth_order": depth_order,
+        "row_node": row_node,
+        "custom_codes": custom_codes,
+        "custom_uniques": custom_uniques,
+    }
+    # the node of a row is the deepest one it reaches
+    reached = (row_node >= 0).sum(axis=0)
+    tree["row_leaf"] = np.where(
+        reached > 0, row_node[np.maximum(reached - 1, 0),
+                              np.arange(n_rows)], -1).astype(np.int32)
+
+    # the unfiltered view is the most common, so pre-join its node data
+    all_rows = np.ones(n_rows, dtype=bool)
+    tree["leaf_counts"] = node_counts(tree, all_rows)
+    tree["customdata"] = node_customdata(tree, all_rows)
+    if schema is not None:
+        tree.update(_rollup_rows(df, schema))
+        tree["rollups"] = node_rollups(tree, all_rows)
+    return tree
+
+
+def _retention_key(value):
+    """
+    Sort key of a retention period, e.g. "30 days" before "1 year"
+    Periods that do not parse, e.g. "Indefinitely", sort after every one
+    that does
+    """
+    match = re.match(r"\s*(\d+(?:\.\d+)?)\s*(day|week|month|year)s?\b",
+                     str(value), re.IGNORECASE)
+    if match is None:
+        return (np.inf, str(value))
+    days = float(match.group(1)) * _RETENTION_DAYS[match.group(2).lower()]
+    return (days, str(value))
+
+
+def _rollup_set(names, held):
+    # the (row, item) pairs of a rows x names bool array
+    rows, items = np.nonzero(held)
+    return {
+        "names": np.asarray(names, dtype=object),
+        "rows": rows.astype(np.int32),
+        "items": items.astype(np.int32),
+    }
+
+
+def _rollup_rows(df, schema):
+    """
+    Per-row inputs of node_rollups(): the purposes and storage technologies
+    each row holds, and the rank of its longest retention among every
+    retention value, shortest first, -1 for none
+    Returns dict of tree entries
+    """
+    purposes = list(schema.flags)
+    flags = np.zeros((len(df), len(purposes)), dtype=bool)
+    for i, purpose in enumerate(purposes):
+        flags[:, i] = df[schema.flags[purpose]].to_numpy(dtype=bool)
+
+    storage = df[schema.storage_columns].astype(object).to_numpy()
+    codes, uniques = pd.factorize(storage.ravel())
+    codes = codes.reshape(storage.shape)
+    names = sorted(str(value) for value in uniques)
+    order = np.asarray([names.index(str(value)) for value in uniques],
+                       dtype=np.intp)
+    held = np.zeros((len(df), len(names)), dtype=bool)
+    rows, cols = np.nonzero(codes >= 0)
+    held[rows, order[codes[rows, cols]]] = True
+
+    retention = df[schema.retention_columns].astype(object).to_numpy()
+    codes, uniques = pd.factorize(retention.ravel())
+    retention_names = sorted((str(value) for value in uniques),
+                             key=_retention_key)
+    # one more rank for the -1 code of an empty cell, below every value
+    rank = np.asarray(
+        [retention_names.index(str(value)) for value in uniques] + [-1],
+        dtype=np.int16)
+    ranks = rank[codes].reshape(retention.shape)
+
+    return {
+        "rollup_purposes": _rollup_set(purposes, flags),
+        "rollup_storage": _rollup_set(names, held),
+        "rollup_retention": {
+            "names": np.asarray(retention_names, dtype=object),
+            "ranks": ranks.max(axis=1, initial=-1).astype(np.int16),
+        },
+    }
+
+
+def node_rollups(tree, mask, nodes=None):
+    """
+    Rollup of the masked rows under each node, from build_radar_tree()
+    given a schema: their purposes, longest retention and storage
+    technologies, "N/A" where they have none
+    Only for the given node positions if any, in their order
+    Returns object array of nodes x ROLLUP_COLUMNS
+    """
+    n_nodes = len(tree["ids"])
+    parents = tree["parents"]
+    row_leaf = tree["row_leaf"]
+
+    held = []
+    for key in ("rollup_purposes", "rollup_storage"):
+        entry = tree[key]
+        keep = mask[entry["rows"]] & (row_leaf[entry["rows"]] >= 0)
+        present = np.zeros((n_nodes, len(entry["names"])), dtype=bool)
+        present[row_leaf[entry["rows"][keep]], entry["items"][keep]] = True
+        held.append(present)
+
+    ranks = tree["rollup_retention"]["ranks"]
+    rows = np.flatnonzero(mask & (row_leaf >= 0))
+    longest = np.full(n_nodes, -1, dtype=np.int16)
+    np.maximum.at(longest, row_leaf[rows], ranks[rows])
+
+    # children into their parents, deepest ring first, so each node is
+    # merged once whatever the number of rows under it
+    for ring in tree["depth_order"][:0:-1]:
+        up = parents[ring]
+        for present in held:
+            np.logical_or.at(present, up, present[ring])
+        np.maximum.at(longest, up, longest[ring])
+
+    if nodes is not None:
+        held, longest = [present[nodes] for present in held], longest[nodes]
+
+    rollups = np.empty((len(longest), len(ROLLUP_COLUMNS)), dtype=object)
+    rollups[:, 0] = _joined(held[0], tree["rollup_purposes"]["names"])
+    names = np.append(tree["rollup_retention"]["names"], "N/A")
+    rollups[:, 1] = names[np.where(longest >= 0, longest, len(names) - 1)]
+    rollups[:, 2] = _joined(held[1], tree["rollup_storage"]["names"])
+    return rollups
+
+
+def _joined(present, names):
+    # each node's names as one string, built once per distinct combination
+    if not present.shape[1]:
+        return np.full(len(present), "N/A", dtype=object)
+    if present.shape[1] < 63:
+        # a bit per name, so each combination is one integer
+        bits = np.left_shift(1, np.arange(present.shape[1], dtype=np.int64))
+        _, first, inverse = np.unique(
+            present @ bits, return_index=True, return_inverse=True)
+        combos = present[first]
+    else:
+        combos, inverse = np.unique(present, axis=0, return_inverse=True)
+    labels = np.asarray(
+        [", ".join(names[combo]) or "N/A" for combo in combos], dtype=object)
+    return labels[inverse.reshape(-1)]
+
+
+def node_counts(tree, mask):
+    """
+    Number of masked rows under each node
+    """
+    counts = np.zeros(len(tree["ids"]), dtype=np.int64)
+    for nodes in tree["row_node"]:
+        nodes = nodes[mask]
+        counts += np.bincount(nodes[nodes >= 0], minlength=len(counts))
+    return counts
+
+
+def node_customdata(tree, mask, nodes=None):
+    """
+    Hover customdata per node: the value its masked rows share, else "(?)"
+    Only for the given node positions if any, in their order
+    Returns object array of nodes x customdata columns
+    """
+    n_nodes = len(tree["ids"])
+    n_cols = tree["custom_codes"].shape[1]
+    low = np.full((n_nodes, n_cols), np.iinfo(np.intp).max, dtype=np.intp)
+    high = np.full((n_nodes, n_cols), -1, dtype=np.intp)
+    parents = tree["parents"]
+    rows = np.flatnonzero(mask & (tree["row_leaf"] >= 0))
+    leaves, codes = tree["row_leaf"][rows], tree["custom_codes"][rows]
+    np.minimum.at(low, leaves, codes)
+    np.maximum.at(high, leaves, codes)
+
+    # children into their parents, deepest ring first, skipping the nodes no
+    # masked row reaches
+    for ring in tree["depth_order"][:0:-1]:
+        ring = ring[high[ring, 0] >= 0] if n_cols else ring[:0]
+        np.minimum.at(low, parents[ring], low[ring])
+        np.maximum.at(high, parents[ring], high[ring])
+    if nodes is not None:
+        low, high = low[nodes], high[nodes]
+
+    # one lookup per column, "(?)" past the end of its values
+    customdata = np.empty(low.shape, dtype=object)
+    for i, uniques in enumerate(tree["custom_uniques"]):
+        same = (low[:, i] == high[:, i]) & (high[:, i] >= 0)
+        values = np.append(np.asarray(uniques, dtype=object), MIXED)
+        customdata[:, i] = values[np.where(same, high[:, i], len(uniques))]
+    return customdata
+
+
+def find_node(tree, node_id):
+    """
+    Returns the position of the node with this id, None if there is none
+    """
+    if not isinstance(node_id, str):
+        return None
+    position = tree["id_index"].get_indexer([node_id])[0]
+    return None if position < 0 else int(position)
+
+
+def parent_node(tree, node):
+    """
+    Returns the position of the parent of a node, None for the root
+    """
+    parent = tree["parents"][node]
+    return None if parent < 0 else int(parent)
+
+
+def shown_nodes(tree, nodes, top_levels, expanded=None):
+    """
+    Which of nodes are in the top_levels rings, or on the path to or in the
+    subtree of the expanded node
+    Returns bool array over nodes
+    """
+    shown = tree["depths"][nodes] < top_levels
+    if expanded is not None:
+        depth = tree["depths"][expanded]
+        shown |= tree["ancestors"][depth, nodes] == expanded
+        shown[np.isin(nodes, tree["ancestors"][:depth, expanded])] = True
+    return shown
+
+
+@functools.lru_cache(maxsize=None)
+def _template_json():
+    return pio.json.to_json_plotly(pio.templates[pio.templates.default])
+
+
+def default_template():
+    """
+    The layout template go.Figure applies, as a dict
+    """
+    return json.loads(_template_json())
+
+
+def sunburst_figure(tree, mask, num_levels, colours, top_levels=None,
+                    expanded=None):
+    """
+    Sunburst of the masked rows, cut off below num_levels rings
+    Mirrors px.sunburst(path=levels[:num_levels], custom_data=...), with
+    the node rollups appended to the customdata of a tree that has them
+    With top_levels, only those rings are drawn plus the branch of the
+    expanded node, which the figure opens on
+    Built as the plain dict go.Figure would serialise to, without
+    validating every array
+    Returns figure dict
+    """
+    unfiltered = mask.all()
+    counts = tree["leaf_counts"] if unfiltered else node_counts(tree, mask)
+
+    order = np.concatenate(tree["depth_order"][:num_levels][::-1])
+    order = order[counts[order] > 0]
+    if expanded is not None and (
+            counts[expanded] == 0
+            or tree["depths"][expanded] >= num_levels - 1):
+        # the filters have since emptied it, or Focus no longer reaches it
+        expanded = None
+    if top_levels is not None and top_levels < num_levels:
+        order = order[shown_nodes(tree, order, top_levels, expanded)]
+    parents = tree["parents"][order]
+
+    # hover data of the drawn nodes only, the unfiltered view's pre-joined
+    if unfiltered:
+        customdata, rollups = tree["customdata"][order], tree.get("rollups")
+        rollups = None if rollups is None else rollups[order]
+    else:
+        customdata = node_customdata(tree, mask, order)
+        rollups = (node_rollups(tree, mask, order) if "rollups" in tree
+                   else None)
+    if rollups is not None:
+        # after the customdata columns, in ROLLUP_COLUMNS order
+        customdata = np.hstack([customdata, rollups])
+
+    trace = {
+        "type": "sunburst",
+        "ids": tree["ids"][order],
+        "labels": tree["labels"][order],
+        "parents": np.where(parents >= 0, tree["ids"][parents], ""),
+        "values": counts[order],
+        "customdata": customdata,
+        "branchvalues": "total",
+        "domain": {"x": [0.0, 1.0], "y": [0.0, 1.0]},
+        "name": "",
+    }
+    if expanded is not None:
+        trace["level"] = tree["ids"][expanded]
+    return {
+        "data": [trace],
+        "layout": {
+            "template": default_template(),
+            "legend": {"tracegroupgap": 0},
+            "margin": {"t": 60},
+            "sunburstcolorway": colours,
+        },
+    }
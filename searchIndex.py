@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Type-ahead search index for the search picker
+
+The distinct level values are indexed once: a sorted token list answers
+prefix queries, and an n-gram index answers substring queries. Matches are
+ranked and capped, so the dropdown payload no longer grows with the data
+"""
+
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+# substring lookups use grams up to this length
+GRAM = 3
+_NO_IDS = np.empty(0, dtype=np.int32)
+
+
+def build_search_index(df, columns):
+    """
+    Indexes the distinct non-empty values of columns, case-insensitively
+    Value ids are ranked shortest first then alphabetically, so sorting ids
+    sorts matches within a tier
+    Returns dict of values, lowered keys, prefix tokens and n-gram postings
+    """
+    values = pd.concat([df[col] for col in columns]).dropna().unique()
+    values = sorted(values, key=lambda value: (len(str(value)),
+                                               str(value).lower(), str(value)))
+    keys = [str(value).lower() for value in values]
+
+    # the whole value, and every word start within it, as prefix tokens
+    tokens = []
+    grams = {}
+    for i, key in enumerate(keys):
+        tokens.append((key, 0, i))
+        for start in range(1, len(key)):
+            if key[start - 1] in " -_/(" and key[start] not in " -_/(":
+                tokens.append((key[start:], 1, i))
+        for size in range(1, GRAM + 1):
+            for start in range(len(key) - size + 1):
+                grams.setdefault(key[start:start + size], set()).add(i)
+    tokens.sort()
+
+    return {
+        "values": values,
+        "keys": keys,
+        "tokens": [token for token, _, _ in tokens],
+        "token_words": np.array([word for _, word, _ in tokens], dtype=bool),
+        "token_ids": np.array([i for _, _, i in tokens], dtype=np.int32),
+        "grams": {gram: np.array(sorted(ids), dtype=np.int32)
+                  for gram, ids in grams.items()},
+    }
+
+
+def _prefix_ids(index, query):
+    lo = bisect_left(index["tokens"], query)
+    hi = bisect_left(index["tokens"], query + chr(0x10FFFF))
+    return index["token_ids"][lo:hi], index["token_words"][lo:hi]
+
+
+def _substring_ids(index, query):
+    if len(query) <= GRAM:
+        return index["grams"].get(query, _NO_IDS)
+
+    postings = []
+    for start in range(len(query) - GRAM + 1):
+        ids = index["grams"].get(query[start:start + GRAM])
+        if ids is None:
+            return _NO_IDS
+        postings.append(ids)
+    postings.sort(key=len)
+    candidates = postings[0]
+    for ids in postings[1:]:
+        candidates = np.intersect1d(candidates, ids, assume_unique=True)
+    # grams only narrow the candidates, confirm the whole query is present
+    return np.array([i for i in candidates if query in index["keys"][i]],
+                    dtype=np.int32)
+
+
+def search(index, query, limit=50):
+    """
+    Values containing query, case-insensitively, best matches first:
+    exact, then starts with, then a word starts with, then contains
+    Returns at most limit values
+    """
+    if not query:
+        return index["values"][:limit]
+
+    query = query.lower()
+    ids, words = _prefix_ids(index, query)
+    whole = np.unique(ids[~words])
+    exact = [i for i in whole[:limit] if index["keys"][i] == query]
+    tiers = [exact, whole, np.unique(ids[words]), _substring_ids(index, query)]
+
+    found = []
+    seen = set()
+    for tier in tiers:
+        for i in tier:
+            if i not in seen:
+                seen.add(i)
+                found.append(index["values"][i])
+                if len(found) == limit:
+                    return found
+    return found
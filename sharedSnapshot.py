@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Radar snapshots shared between processes through memory-mapped files
+
+SharedSnapshots.publish() writes a snapshot to one file: its numeric arrays,
+those inside the dataframe included, laid out raw and the rest pickled.
+attach() maps such a file read-only, and the arrays come back as views of
+the mapping, so every worker that attaches the same file shares its pages
+instead of holding a copy. In a tmpfs such as /dev/shm the file is never
+written to disk. Files are named after the domain and the signature of its
+data files, so the worker that first sees a change publishes a new file,
+and the others switch to it when they see the same change. The name also
+hashes FORMAT_VERSION and the layout the directory was opened with, so
+after a deploy that changes either, stale files are never attached
+
+Text, e.g. node ids and hover strings, is still unpickled by each worker.
+As unpickling runs code, the directory is created private to the user, and
+a directory or file that another user owns or could have written is never
+attached
+"""
+
+import hashlib
+import io
+import json
+import logging
+import mmap
+import os
+import pickle
+import re
+import struct
+import tempfile
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# smaller arrays are pickled with the rest
+MIN_SHARED_BYTES = 4096
+
+# bump when the file format changes
+FORMAT_VERSION = 1
+
+_MAGIC = b"RADARSNAP1"
+_HEADER = struct.Struct("<Q")
+# the data of every array starts on a boundary of this many bytes
+_ALIGN = 64
+_SHAREABLE = "biufcmM"
+
+
+def _aligned(offset):
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def _private(stat):
+    # owned by this user and writable by no other
+    owner = os.geteuid() if hasattr(os, "geteuid") else stat.st_uid
+    return stat.st_uid == owner and not stat.st_mode & 0o022
+
+
+class _ArrayPickler(pickle.Pickler):
+    """
+    Pickles large numeric arrays as references to the data region
+    """
+
+    def __init__(self, file):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.arrays = []
+        self.size = 0
+        self._ids = {}
+
+    def persistent_id(self, obj):
+        if type(obj) is not np.ndarray or obj.dtype.kind not in _SHAREABLE:
+            return None
+        if obj.nbytes < MIN_SHARED_BYTES:
+            return None
+        if id(obj) not in self._ids:
+            # written in whichever order is contiguous, read back the same
+            fortran = obj.flags.f_contiguous and not obj.flags.c_contiguous
+            data = np.ascontiguousarray(obj.T if fortran else obj)
+            self.size = _aligned(self.size)
+            self._ids[id(obj)] = ("ndarray", self.size, data.dtype.str,
+                                  data.shape, fortran)
+            # kept, so the id is not reused while pickling
+            self.arrays.append((self.size, data, obj))
+            self.size += data.nbytes
+        return self._ids[id(obj)]
+
+
+class _ArrayUnpickler(pickle.Unpickler):
+    """
+    Resolves array references to read-only views of the mapped file
+    """
+
+    def __init__(self, file, buffer, start):
+        super().__init__(file)
+        self.buffer = buffer
+        self.start = start
+        self._arrays = {}
+
+    def persistent_load(self, pid):
+        if pid not in self._arrays:
+            _, offset, dtype, shape, fortran = pid
+            array = np.frombuffer(
+                self.buffer, dtype=np.dtype(dtype),
+                count=int(np.prod(shape)), offset=self.start + offset,
+            ).reshape(shape)
+            self._arrays[pid] = array.T if fortran else array
+        return self._arrays[pid]
+
+
+class SharedSnapshots:
+    """
+    Directory of published snapshots, one file per domain and data version
+    layout is whatever else decides what a snapshot holds, e.g. the schema
+    and the version of the code building it, as json
+    """
+
+    def __init__(self, directory, layout=None):
+        self.directory = directory
+        self.layout = json.dumps(layout, sort_keys=True, default=str)
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        if not self._trusted():
+            logger.warning("not sharing radar snapshots, %s is not private "
+                           "to this user", directory)
+
+    def _trusted(self, file=None):
+        """
+        Whether the directory, and the open file if given, are this user's
+        alone, so the snapshots in them are safe to unpickle
+        """
+        try:
+            stats = [os.stat(self.directory)]
+        except OSError:
+            return False
+        if file is not None:
+            stats.append(os.fstat(file.fileno()))
+        return all(_private(stat) for stat in stats)
+
+    def path(self, key, signature):
+        """
+        File of the snapshot of key built from files with this signature
+        """
+        digest = hashlib.sha256(json.dumps(
+            [FORMAT_VERSION, self.layout, str(key), signature],
+            default=str).encode()).hexdigest()[:16]
+        return os.path.join(self.directory, "{}.{}.radar".format(
+            self._prefix(key), digest))
+
+    def _prefix(self, key):
+        # no dots, they separate the key from the version
+        return re.sub(r"[^\w-]", "_", str(key))
+
+    def attach(self, key, signature):
+        """
+        Maps the published snapshot of key for these files
+        Returns the snapshot dict, or None if none was published
+        """
+        try:
+            with open(self.path(key, signature), "rb") as rf:
+                if not self._trusted(rf):
+                    return None
+                buffer = mmap.mmap(rf.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if buffer[:len(_MAGIC)] != _MAGIC:
+            return None
+        header_end = len(_MAGIC) + _HEADER.size
+        (length,) = _HEADER.unpack(buffer[len(_MAGIC):header_end])
+        skeleton = io.BytesIO(buffer[header_end:header_end + length])
+        return _ArrayUnpickler(
+            skeleton, buffer, _aligned(header_end + length)).load()
+
+    def publish(self, key, signature, snapshot):
+        """
+        Writes snapshot for the other processes, and drops older snapshots
+        of key, which the processes still using them keep mapped
+        Returns the snapshot as attached, or as given if it cannot be written
+        """
+        if not self._trusted():
+            return snapshot
+        path = self.path(key, signature)
+        skeleton = io.BytesIO()
+        pickler = _ArrayPickler(skeleton)
+        pickler.dump(snapshot)
+        header = _MAGIC + _HEADER.pack(len(skeleton.getbuffer()))
+        start = _aligned(len(header) + len(skeleton.getbuffer()))
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as wf:
+                wf.write(header)
+                wf.write(skeleton.getbuffer())
+                for offset, data, _ in pickler.arrays:
+                    wf.seek(start + offset)
+                    wf.write(data.reshape(-1).view(np.uint8))
+                wf.truncate(start + pickler.size)
+            os.replace(tmp_path, path)
+        except OSError:
+            # e.g. /dev/shm is full, this process keeps its own copy
+            logger.warning("could not share the radar snapshot of %s", key,
+                           exc_info=True)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return snapshot
+
+        prefix = self._prefix(key)
+        for name in os.listdir(self.directory):
+            other = os.path.join(self.directory, name)
+            if other == path or not name.endswith(".radar"):
+                continue
+            if name.split(".")[0] == prefix:
+                try:
+                    os.remove(other)
+                except OSError:
+                    pass
+        return self.attach(key, signature) or snapshot
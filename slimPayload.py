@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Smaller radar responses
+
+slim_figure() packs a radar figure for the wire: parents become node
+positions instead of repeated id paths, ids are left for the browser to
+rebuild from them, and the nine hover strings of every node are replaced by
+a position in a table of their distinct combinations, themselves positions
+in a table of the distinct strings. radar.expand_figure in
+assets/radar_clientside.js turns it back into the figure.
+compress_responses() gzips the server's responses
+"""
+
+import gzip
+
+import flask
+
+# trace arrays the slim form carries in its own encoding
+_NODE_ARRAYS = ("ids", "labels", "parents", "values", "customdata")
+
+# smaller bodies gain too little to be worth compressing
+MIN_COMPRESS_BYTES = 1024
+_COMPRESSIBLE = ("application/json", "application/javascript", "text/")
+
+
+def slim_figure(figure):
+    """
+    Compact form of a radar figure dict
+    Figures other than a sunburst are passed through unchanged
+    Returns dict for radar.expand_figure
+    """
+    data = figure.get("data") or []
+    if len(data) != 1 or data[0].get("type") != "sunburst":
+        return {"figure": figure}
+    trace = data[0]
+
+    position = {node_id: i for i, node_id in enumerate(trace["ids"])}
+    if any(parent and parent not in position for parent in trace["parents"]):
+        return {"figure": figure}
+    parents = [position.get(parent, -1) for parent in trace["parents"]]
+
+    # each hover string is sent once, each combination of them once
+    strings = {}
+    combos = {}
+    custom = []
+    customdata = trace.get("customdata")
+    for row in [] if customdata is None else customdata:
+        combo = tuple(strings.setdefault(value, len(strings)) for value in row)
+        custom.append(combos.setdefault(combo, len(combos)))
+
+    skeleton = {key: value for key, value in trace.items()
+                if key not in _NODE_ARRAYS}
+    slim = {
+        "figure": {"data": [skeleton], "layout": figure.get("layout", {})},
+        "labels": trace["labels"],
+        "parents": parents,
+        "values": trace["values"],
+        "custom": custom,
+        "strings": list(strings),
+        "combos": [list(combo) for combo in combos],
+    }
+
+    # radar ids are the parent id and the label joined by "/", other ids are
+    # sent as they are
+    ids = [None] * len(parents)
+    for i in range(len(parents)):
+        _node_id(i, ids, trace["labels"], parents)
+    if ids != list(trace["ids"]):
+        slim["ids"] = trace["ids"]
+    return slim
+
+
+def _node_id(i, ids, labels, parents):
+    # parents may come after their children, walk up to a known id
+    chain = []
+    while ids[i] is None:
+        chain.append(i)
+        if parents[i] < 0:
+            break
+        i = parents[i]
+    for node in reversed(chain):
+        label = str(labels[node])
+        if parents[node] < 0:
+            ids[node] = label
+        else:
+            ids[node] = ids[parents[node]] + "/" + label
+
+
+def compress_responses(server, level=6):
+    """
+    Gzips text and json responses on server for clients that accept it
+    """
+
+    @server.after_request
+    def gzip_response(response):
+        if (response.direct_passthrough
+                or response.is_streamed
+                or response.status_code < 200
+                or response.status_code >= 300
+                or "Content-Encoding" in response.headers
+                or not (response.mimetype or "").startswith(_COMPRESSIBLE)
+                or "gzip" not in flask.request.headers.get(
+                    "Accept-Encoding", "")):
+            return response
+
+        body = response.get_data()
+        if len(body) < MIN_COMPRESS_BYTES:
+            return response
+        response.set_data(gzip.compress(body, compresslevel=level))
+        response.headers["Content-Encoding"] = "gzip"
+        response.vary.add("Accept-Encoding")
+        return response
+
+    return server
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synthetic radar data, for trying and benchmarking the app without the real
+data
+
+    python synthRadar.py --rows 10000 --depth 7 --fan-out 6 out.csv
+
+The same arguments always give the same file. Columns follow the radar data
+layout: level 1 to level 7, a "y" flag per purpose, then retention and
+storage technology per purpose
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+PURPOSES = ["Authentication", "Identity", "User experience", "Analytics",
+            "Audit"]
+# User experience has no storage technology column in the radar data
+STORAGE_PURPOSES = ["Authentication", "Identity", "Analytics", "Audit"]
+MAX_DEPTH = 7
+
+_RETENTION = ["30 days", "90 days", "6 months", "1 year", "2 years",
+              "6 years", "7 years", "Indefinitely"]
+_TECHNOLOGY = ["AWS Lambda", "Amazon DynamoDB", "Amazon S3", "Amazon RDS",
+               "Amazon SQS", "Amazon CloudWatch", "Amazon Kinesis"]
+
+
+def _vocabulary(names, size, pattern):
+    # the real names first, then numbered ones past them
+    return (names + [pattern.format(i)
+                     for i in range(len(names) + 1, size + 1)])[:size]
+
+
+def synthetic_radar(
+    rows=1000,
+    depth=MAX_DEPTH,
+    fan_out=5,
+    retention_values=5,
+    technologies=4,
+    purpose_share=0.5,
+    empty_share=0.1,
+    seed=0,
+):
+    """
+    Random radar data: rows entities, each a path of 2 to depth levels,
+    with up to fan_out children under every node
+    Entities are always leaves, so the hierarchy is valid for a sunburst
+    Returns pandas df
+    """
+    if not 2 <= depth <= MAX_DEPTH:
+        raise ValueError("depth must be between 2 and {}".format(MAX_DEPTH))
+    rng = np.random.default_rng(seed)
+
+    # each row stops at its own depth, its last level names the entity
+    row_depths = rng.integers(2, depth + 1, size=rows)
+    branches = rng.integers(0, fan_out, size=(rows, MAX_DEPTH))
+    data = {}
+    for level in range(1, MAX_DEPTH + 1):
+        # a node is named after its branch from the root, so siblings differ
+        path = branches[:, :level].astype(str)
+        names = pd.Series(["Level {} group {}".format(level, ".".join(p))
+                           for p in path], dtype=object)
+        names[row_depths < level] = None
+        leaves = np.flatnonzero(row_depths == level)
+        names[leaves] = ["Entity {:07d}".format(i) for i in leaves]
+        data["level {}".format(level)] = names
+
+    for purpose in PURPOSES:
+        data[purpose] = np.where(
+            rng.random(rows) < purpose_share, "y", None)
+
+    retention = _vocabulary(_RETENTION, retention_values, "{} years")
+    for purpose in PURPOSES:
+        values = rng.choice(np.array(retention, dtype=object), size=rows)
+        values[rng.random(rows) < empty_share] = None
+        data[purpose + " retention"] = values
+
+    technology = _vocabulary(_TECHNOLOGY, technologies, "Data store {}")
+    for purpose in STORAGE_PURPOSES:
+        values = rng.choice(np.array(technology, dtype=object), size=rows)
+        values[rng.random(rows) < empty_share] = None
+        data[purpose + " Storage Technology"] = values
+
+    return pd.DataFrame(data)
+
+
+def add_arguments(parser):
+    """
+    The generator options other than rows, shared with the benchmark
+    command line
+    """
+    parser.add_argument("--depth", type=int, default=MAX_DEPTH)
+    parser.add_argument("--fan-out", type=int, default=5)
+    parser.add_argument("--retention-values", type=int, default=5)
+    parser.add_argument("--technologies", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+def generator_options(args):
+    return {
+        "depth": args.depth,
+        "fan_out": args.fan_out,
+        "retention_values": args.retention_values,
+        "technologies": args.technologies,
+        "seed": args.seed,
+    }
+
+
+if __name__ == "__main__":
+    parser = add_arguments(argparse.ArgumentParser(
+        description="Writes synthetic radar data to a csv file"))
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("output", help="csv file to write")
+    args = parser.parse_args()
+    synthetic_radar(args.rows, **generator_options(args)).to_csv(
+        args.output, index=False)
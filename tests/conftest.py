@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+# the app's modules sit at the root of the repo
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchRadar import load_app  # noqa: E402
+from synthRadar import synthetic_radar  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def load_radar_app(tmp_path_factory):
+    # app.py is configured at import, so each load is a fresh import on df,
+    # a small synthetic radar by default, with env on top of the benchmark's
+    # settings
+    environ = dict(os.environ)
+
+    def load(df=None, **env):
+        if df is None:
+            df = synthetic_radar(rows=400, fan_out=3)
+        app, _ = load_app(df, str(tmp_path_factory.mktemp("radar")), env)
+        return app
+
+    yield load
+    os.environ.clear()
+    os.environ.update(environ)
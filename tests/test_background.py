@@ -0,0 +1,73 @@
+import json
+import time
+
+import plotly
+import pytest
+
+for module in ("diskcache", "multiprocess", "psutil"):
+    pytest.importorskip(module)
+
+NAMES = ["search-picker", "colour-picker", "purpose-picker",
+         "retention-picker", "storage-technology-picker",
+         "storage-type-filter", "num-levels", "domain-picker",
+         "radar-expanded"]
+VALUES = [None, "Default", "Audit", "all", "all", "all", 4, None, None]
+
+
+def _load(load_radar_app, tmp_path_factory):
+    return load_radar_app(
+        RADAR_BACKGROUND="1", RADAR_DEBOUNCE_MS="0",
+        RADAR_BACKGROUND_DIR=str(tmp_path_factory.mktemp("background")))
+
+
+@pytest.fixture(scope="module")
+def app(load_radar_app, tmp_path_factory):
+    app = _load(load_radar_app, tmp_path_factory)
+    app.start_background_jobs()
+    return app
+
+
+def test_job_store_is_opened_after_import(load_radar_app, tmp_path_factory):
+    # a preloading gunicorn master must not fork an open sqlite connection
+    app = _load(load_radar_app, tmp_path_factory)
+    assert app.app._background_manager is None
+    app.start_background_jobs()
+    manager = app.app._background_manager
+    assert manager.handle.directory == app.background_dir
+    app.start_background_jobs()
+    assert app.app._background_manager is manager
+
+
+def test_radar_renders_as_background_job(app):
+    body = {
+        "output": "..data-radar.figure...radar-drawn.data..",
+        "outputs": [{"id": "data-radar", "property": "figure"},
+                    {"id": "radar-drawn", "property": "data"}],
+        "inputs": [
+            {"id": name,
+             "property": "data" if name == "radar-expanded" else "value",
+             "value": value}
+            for name, value in zip(NAMES, VALUES)],
+        "state": [{"id": "radar-drawn", "property": "data", "value": None}],
+        "changedPropIds": ["purpose-picker.value"],
+    }
+    client = app.server.test_client()
+    job = client.post("/_dash-update-component", json=body).get_json()
+    assert set(job) == {"cacheKey", "job"}
+
+    # polled as dash-renderer does, until the job has left its result
+    deadline = time.monotonic() + 30
+    while True:
+        response = client.post(
+            "/_dash-update-component?cacheKey={cacheKey}&job={job}".format(
+                **job), json=body)
+        result = response.get_json() or {}
+        if result.get("response") or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+
+    figure, drawn = app.pop_data_radar(*VALUES)
+    expected = json.loads(json.dumps(
+        figure, cls=plotly.utils.PlotlyJSONEncoder))
+    assert result["response"]["data-radar"]["figure"] == expected
+    assert result["response"]["radar-drawn"]["data"] == drawn
@@ -0,0 +1,127 @@
+import re
+
+import pytest
+
+from callbackMetrics import CallbackMetrics, Histogram
+
+RADAR = "..data-radar.figure...radar-drawn.data.."
+
+
+def test_histogram_counts_each_value_in_every_bucket_above_it():
+    histogram = Histogram("radar_test_seconds", "Test", (0.1, 1, 10),
+                          ("callback",))
+    for value in [0.05, 0.1, 0.5, 2, 20]:
+        histogram.observe(value, "radar")
+    histogram.observe(3, "search")
+
+    assert histogram.render() == "\n".join([
+        "# HELP radar_test_seconds Test",
+        "# TYPE radar_test_seconds histogram",
+        'radar_test_seconds_bucket{callback="radar",le="0.1"} 2',
+        'radar_test_seconds_bucket{callback="radar",le="1"} 3',
+        'radar_test_seconds_bucket{callback="radar",le="10"} 4',
+        'radar_test_seconds_bucket{callback="radar",le="+Inf"} 5',
+        'radar_test_seconds_sum{callback="radar"} 22.65',
+        'radar_test_seconds_count{callback="radar"} 5',
+        'radar_test_seconds_bucket{callback="search",le="0.1"} 0',
+        'radar_test_seconds_bucket{callback="search",le="1"} 0',
+        'radar_test_seconds_bucket{callback="search",le="10"} 1',
+        'radar_test_seconds_bucket{callback="search",le="+Inf"} 1',
+        'radar_test_seconds_sum{callback="search"} 3',
+        'radar_test_seconds_count{callback="search"} 1',
+    ]) + "\n"
+
+
+def test_label_values_are_escaped():
+    histogram = Histogram("radar_test", "Test", (1,), ("callback",))
+    histogram.observe(1, 'a "b"\\\n')
+    assert 'radar_test_count{callback="a \\"b\\"\\\\\\n"} 1' in (
+        histogram.render().splitlines())
+
+
+def test_stats_are_served_as_counters_and_gauges():
+    metrics = CallbackMetrics()
+    metrics.add_stats("radar_cache", lambda: {"hits": 3, "bytes": 120},
+                      counters=("hits",), help_text="Cache")
+    lines = metrics.render().splitlines()
+    assert lines[-6:] == [
+        "# HELP radar_cache_hits_total Cache, hits",
+        "# TYPE radar_cache_hits_total counter",
+        "radar_cache_hits_total 3",
+        "# HELP radar_cache_bytes Cache, bytes",
+        "# TYPE radar_cache_bytes gauge",
+        "radar_cache_bytes 120",
+    ]
+
+
+def _samples(text):
+    # {(metric, labels): value} from the exposition format
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        match = re.fullmatch(r"(\w+)(?:\{(.*)\})? (\S+)", line)
+        assert match, line
+        labels = tuple(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"',
+                                  match.group(2) or ""))
+        samples[match.group(1), labels] = float(match.group(3))
+    return samples
+
+
+@pytest.fixture(scope="module")
+def app(load_radar_app):
+    return load_radar_app(RADAR_METRICS="1")
+
+
+def test_callback_requests_are_measured(app):
+    client = app.server.test_client()
+    sizes = []
+    for purpose in ["all", "Audit"]:
+        response = client.post("/_dash-update-component", json={
+            "output": RADAR,
+            "outputs": [{"id": "data-radar", "property": "figure"},
+                        {"id": "radar-drawn", "property": "data"}],
+            "inputs": [
+                {"id": "search-picker", "property": "value", "value": None},
+                {"id": "colour-picker", "property": "value",
+                 "value": "Default"},
+                {"id": "purpose-picker", "property": "value",
+                 "value": purpose},
+                {"id": "retention-picker", "property": "value",
+                 "value": "all"},
+                {"id": "storage-technology-picker", "property": "value",
+                 "value": "all"},
+                {"id": "storage-type-filter", "property": "value",
+                 "value": "all"},
+                {"id": "num-levels", "property": "value", "value": 4},
+                {"id": "domain-picker", "property": "value", "value": None},
+                {"id": "radar-expanded", "property": "data", "value": None},
+            ],
+            "state": [{"id": "radar-drawn", "property": "data",
+                       "value": None}],
+            "changedPropIds": ["purpose-picker.value"],
+        })
+        assert response.status_code == 200
+        sizes.append(len(response.get_data()))
+
+    response = client.get("/metrics")
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert "# TYPE radar_callback_seconds histogram" in text
+    assert "# TYPE radar_figure_cache_misses_total counter" in text
+    samples = _samples(text)
+    labels = (("callback", RADAR), ("cache", "miss"))
+
+    assert samples["radar_callback_seconds_count", labels] == 2
+    assert samples[
+        "radar_callback_seconds_bucket", labels + (("le", "+Inf"),)] == 2
+    assert samples["radar_callback_response_bytes_sum", labels] == sum(sizes)
+
+    # every row, then the Audit rows
+    rows = app.domain_data(None)["df"]
+    audit = int(rows["Audit"].sum())
+    assert samples["radar_callback_rows_sum", labels] == len(rows) + audit
+    for bound in ["100", "1000"]:
+        assert samples["radar_callback_rows_bucket", labels + (
+            ("le", bound),)] == (len(rows) <= int(bound)) + (
+                audit <= int(bound))
@@ -0,0 +1,72 @@
+import cProfile
+import json
+import os
+import pstats
+
+import pytest
+
+from callbackProfiler import HEADER, ProfileRing
+
+
+def _details(path):
+    with open(path) as rf:
+        return json.load(rf)
+
+
+def test_ring_keeps_the_newest_profiles(tmp_path):
+    ring = ProfileRing(str(tmp_path / "profiles"), max_files=3)
+    for n in range(5):
+        profile = cProfile.Profile()
+        profile.runcall(sum, range(1000))
+        ring.write(profile, {"n": n})
+
+    assert [_details(path)["n"] for path in ring.entries()] == [2, 3, 4]
+    kept = sorted(os.listdir(ring.directory))
+    assert len(kept) == 6
+    for path in ring.entries():
+        assert os.path.basename(path)[:-len(".json")] + ".prof" in kept
+
+
+@pytest.fixture(scope="module")
+def app(load_radar_app, tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp("profiles"))
+    return load_radar_app(RADAR_PROFILE_DIR=directory, RADAR_PROFILE_KEEP="2")
+
+
+def _search(app, text, **headers):
+    # a search picker update, as dash-renderer sends it
+    response = app.server.test_client().post(
+        "/_dash-update-component", headers=headers, json={
+            "output": "search-picker.options",
+            "outputs": {"id": "search-picker", "property": "options"},
+            "inputs": [
+                {"id": "search-picker", "property": "search_value",
+                 "value": text},
+                {"id": "domain-picker", "property": "value", "value": None}],
+            "state": [{"id": "search-picker", "property": "value",
+                       "value": None}],
+            "changedPropIds": ["search-picker.search_value"],
+        })
+    assert response.status_code == 200
+
+
+def test_requests_asking_for_it_are_profiled(app):
+    ring = ProfileRing(app.profile_dir)
+    _search(app, "entity")
+    assert ring.entries() == []
+
+    _search(app, "group", **{HEADER: "1"})
+    (path,) = ring.entries()
+    details = _details(path)
+    assert details["callback"] == "search-picker.options"
+    assert details["inputs"][0]["value"] == "group"
+    assert details["status"] == 200
+    stats = pstats.Stats(os.path.join(app.profile_dir, details["profile"]))
+    assert any(name == "update_search_options"
+               for _, _, name in stats.stats)
+
+    # RADAR_PROFILE_KEEP of them
+    for text in ["level", "1.2"]:
+        _search(app, text, **{HEADER: "1"})
+    assert [_details(path)["inputs"][0]["value"]
+            for path in ring.entries()] == ["level", "1.2"]
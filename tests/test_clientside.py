@@ -0,0 +1,97 @@
+import itertools
+import json
+import os
+import shutil
+import subprocess
+
+import plotly.io as pio
+import pytest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "assets", "radar_clientside.js")
+
+pytestmark = pytest.mark.skipif(
+    shutil.which("node") is None, reason="needs node")
+
+# runs each case through assets/radar_clientside.js, with the bundle the
+# server would send, and prints the results as one json array
+DRIVER = """
+const fs = require("fs");
+const [script, bundle, cases] = process.argv.slice(2);
+global.window = {dash_clientside: {no_update: null}};
+global.fetch = () => Promise.resolve(
+    {json: () => JSON.parse(fs.readFileSync(bundle))});
+eval(fs.readFileSync(script, "utf8"));
+const radar = window.dash_clientside.radar;
+radar.load_bundle("bundle").then((url) => {
+    const results = JSON.parse(fs.readFileSync(cases)).map(
+        ([name, args]) => radar[name](url, ...args));
+    process.stdout.write(JSON.stringify(results));
+});
+"""
+
+
+@pytest.fixture(scope="module")
+def app(load_radar_app):
+    return load_radar_app(RADAR_CLIENTSIDE="1")
+
+
+def _cases(app):
+    df = app.domain_data(None)["df"]
+    searches = [None, df["level 1"].iloc[0], df["level 3"].iloc[0],
+                "no such entity"]
+    purposes = ["all", "Authentication", "User experience"]
+    retention = ["all", df["Authentication retention"].dropna().iloc[0]]
+    technology = ["all", "AWS Lambda"]
+    storage_types = ["all", "ephemeral", "Persisted"]
+    filters = list(itertools.product(
+        searches, purposes, retention, technology, storage_types))
+    radars = [("pop_data_radar", [search, "Default", purpose, ret, tech,
+                                  stype, num_levels])
+              for (search, purpose, ret, tech, stype), num_levels
+              in itertools.product(filters, [3, 8])]
+    options = [("update_facet_options", list(args)) for args in filters]
+    return radars + options
+
+
+def _drawn(figure, num_levels):
+    # the server sends every ring with Focus as the sunburst maxdepth, the
+    # browser only the rings Focus shows
+    trace = figure["data"][0]
+    if trace.get("type") != "sunburst":
+        return figure
+    parents = dict(zip(trace["ids"], trace["parents"]))
+
+    def depth(node):
+        return depth(parents[node]) + 1 if parents[node] else 0
+
+    keep = [i for i, node in enumerate(trace["ids"])
+            if depth(node) < num_levels]
+    for key in ("ids", "labels", "parents", "values", "customdata"):
+        trace[key] = [trace[key][i] for i in keep]
+    del trace["maxdepth"]
+    return figure
+
+
+def _server(app, name, args):
+    if name == "pop_data_radar":
+        figure, _ = app.pop_data_radar(*args)
+        return _drawn(json.loads(pio.to_json(figure, validate=False)),
+                      args[-1])
+    return json.loads(json.dumps(list(app.update_facet_options(*args))))
+
+
+def test_clientside_matches_server(app, tmp_path):
+    _, bundle = app.client_bundle(app.domain_data(None))
+    cases = _cases(app)
+    (tmp_path / "bundle.json").write_bytes(bundle)
+    (tmp_path / "cases.json").write_text(json.dumps(cases))
+    (tmp_path / "driver.js").write_text(DRIVER)
+
+    output = subprocess.run(
+        ["node", str(tmp_path / "driver.js"), SCRIPT,
+         str(tmp_path / "bundle.json"), str(tmp_path / "cases.json")],
+        capture_output=True, text=True, check=True).stdout
+
+    for (name, args), result in zip(cases, json.loads(output)):
+        assert result == _server(app, name, args), (name, args)
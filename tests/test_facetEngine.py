@@ -0,0 +1,170 @@
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from synthRadar import synthetic_radar
+
+NO_DATA = [{"label": "No data found", "value": "none"}]
+SHOW_ALL = [{"label": "Show All", "value": "all"}]
+# the purpose of each retention and storage technology column, as the
+# baseline callbacks mapped them
+RETENTION = {purpose: purpose + " retention"
+             for purpose in ["Authentication", "Audit", "Identity",
+                             "Analytics"]}
+STORAGE = {purpose: purpose + " Storage Technology"
+           for purpose in ["Authentication", "Audit", "Identity",
+                           "Analytics"]}
+
+
+# The option callbacks before facetEngine, one per picker, on the raw data
+
+def _searched(df, search_value):
+    if search_value:
+        levels = [col for col in df.columns if "level" in col]
+        df = df[df[levels].apply(
+            lambda row: search_value in row.values, axis=1)]
+    return df
+
+
+def _storage_type(row, columns):
+    if any("AWS Lambda" in str(row[col]) for col in columns):
+        return "Ephemeral"
+    return "Persisted"
+
+
+def baseline_purpose_options(df, search_value, selectedRetention,
+                             selectedStorageTechnology):
+    df = _searched(df, search_value)
+    if selectedStorageTechnology and selectedStorageTechnology != "all":
+        storage_cols = [col for col in df.columns
+                        if "storage technology" in col.lower()]
+        df = df[df[storage_cols].apply(
+            lambda row: selectedStorageTechnology in row.values, axis=1)]
+    if selectedRetention and selectedRetention != "all":
+        retention_cols = [col for col in df.columns
+                          if "retention" in col.lower()]
+        df = df[df[retention_cols].apply(
+            lambda row: selectedRetention in row.values, axis=1)]
+    purposes = [purpose for purpose in ["Authentication", "Audit",
+                                        "Identity", "Analytics",
+                                        "User experience"]
+                if (df[purpose] == "y").any()]
+    if not purposes:
+        return NO_DATA
+    return SHOW_ALL + [{"label": purpose, "value": purpose}
+                       for purpose in purposes]
+
+
+def baseline_retention_options(df, selectedPurpose, search_value):
+    df = _searched(df, search_value)
+    if not selectedPurpose or selectedPurpose == "all":
+        values = set()
+        for col in RETENTION.values():
+            values.update(df[col].dropna().unique())
+    elif selectedPurpose in RETENTION:
+        df = df[df[selectedPurpose] == "y"]
+        values = df[RETENTION[selectedPurpose]].dropna().unique()
+    else:
+        values = []
+    return SHOW_ALL + [{"label": value, "value": value}
+                       for value in sorted(values)]
+
+
+def baseline_storage_technology_options(df, selectedPurpose,
+                                        selectedStorageType, search_value):
+    df = _searched(df, search_value)
+    if not selectedPurpose or selectedPurpose == "all":
+        columns = list(STORAGE.values())
+    elif selectedPurpose in STORAGE:
+        columns = [STORAGE[selectedPurpose]]
+        df = df[df[selectedPurpose] == "y"]
+    else:
+        return SHOW_ALL
+    if selectedStorageType and selectedStorageType != "all":
+        df = df[np.array([
+            _storage_type(row, columns).lower() == selectedStorageType.lower()
+            for _, row in df.iterrows()], dtype=bool)]
+    values = df[columns].stack().unique()
+    return SHOW_ALL + [{"label": tech, "value": tech}
+                       for tech in sorted(values)]
+
+
+def baseline_storage_type_options(df, selectedPurpose,
+                                  selectedStorageTechnology, search_value):
+    df = _searched(df, search_value)
+    if selectedPurpose in STORAGE:
+        df = df[df[selectedPurpose] == "y"]
+    if selectedStorageTechnology and selectedStorageTechnology != "all":
+        df = df[df[list(STORAGE.values())].apply(
+            lambda row: selectedStorageTechnology in row.values, axis=1)]
+    types = [_storage_type(row, STORAGE.values())
+             for _, row in df.iterrows()]
+    return SHOW_ALL + [{"label": stype, "value": stype.lower()}
+                       for stype in sorted(set(types))]
+
+
+@pytest.fixture(scope="module")
+def app(load_radar_app):
+    df = synthetic_radar(rows=400, fan_out=3)
+    # and a period only User experience keeps data for
+    df.loc[df.index[::7], "User experience retention"] = "3 months"
+    app = load_radar_app(df)
+    raw = pd.read_csv(os.path.join(
+        os.path.dirname(app.radar_data_config_path), "radar_data_cdm.csv"))
+    return app, raw
+
+
+def _selections(raw):
+    searches = [None, raw["level 1"].iloc[0], raw["level 7"].dropna().iloc[0]]
+    purposes = ["all", "Authentication", "User experience", "Audit"]
+    retention = ["all", "3 months", raw["Audit retention"].dropna().iloc[0]]
+    technology = ["all", "AWS Lambda"]
+    storage_types = ["all", "ephemeral", "persisted"]
+    return itertools.product(searches, purposes, retention, technology,
+                             storage_types)
+
+
+def test_picker_options_match_the_baseline_callbacks(app):
+    app, raw = app
+    update_facet_options = getattr(
+        app.update_facet_options, "__wrapped__", app.update_facet_options)
+    # each baseline callback read only some of the selections
+    answers = {}
+
+    def baseline(callback, *args):
+        if (callback, args) not in answers:
+            answers[callback, args] = callback(raw, *args)
+        return answers[callback, args]
+
+    for search, purpose, retention, tech, stype in _selections(raw):
+        purposes, retentions, technologies, types = update_facet_options(
+            search, purpose, retention, tech, stype)
+        expected = baseline(baseline_purpose_options, search, retention, tech)
+        # the baseline offered the purposes in no set order
+        assert sorted(purposes, key=str) == sorted(expected, key=str)
+        assert retentions == baseline(
+            baseline_retention_options, purpose, search)
+        assert technologies == baseline(
+            baseline_storage_technology_options, purpose, stype, search)
+        assert types == baseline(
+            baseline_storage_type_options, purpose, tech, search)
+
+
+def test_user_experience_retention_is_filtered_on_but_not_offered(app):
+    app, raw = app
+    update_facet_options = getattr(
+        app.update_facet_options, "__wrapped__", app.update_facet_options)
+    offered = {option["value"] for option in update_facet_options(
+        None, "all", "all", "all", "all")[1]}
+    only_ux = set(raw["User experience retention"].dropna()) - set(
+        raw[list(RETENTION.values())].stack())
+    assert only_ux == {"3 months"}
+    assert not only_ux & offered
+
+    # and still filters the radar
+    mask = app.radar_mask(app.domain_data(None), None, "all", "3 months",
+                          "all", "all")
+    assert mask.sum() == (raw["User experience retention"] == "3 months").sum()
@@ -0,0 +1,44 @@
+import json
+
+from figureCache import FigureCache
+
+
+def _figure(n):
+    return {"data": [{"type": "sunburst", "ids": list(range(n))}],
+            "layout": {}}
+
+
+def _size(figure):
+    return len(json.dumps(figure, separators=(",", ":")))
+
+
+def test_memory_tier_is_bounded_by_bytes():
+    figure = _figure(1000)
+    cache = FigureCache(max_bytes=int(_size(figure) * 2.5))
+    for key in "abc":
+        cache.set(key, figure)
+    assert cache.get("a") is None
+    assert cache.get("c") == figure
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] <= stats["max_bytes"]
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_disabled_cache_keeps_nothing():
+    cache = FigureCache(max_bytes=0)
+    figure = _figure(10)
+    assert cache.set("a", figure) is figure
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_directory_tier_is_shared_and_bounded(tmp_path):
+    figure = _figure(1000)
+    writer = FigureCache(max_bytes=0, directory=str(tmp_path),
+                         max_dir_bytes=int(_size(figure) * 2.5))
+    for key in "abc":
+        writer.set(key, figure)
+    reader = FigureCache(max_bytes=0, directory=str(tmp_path))
+    assert reader.get("c") == figure
+    assert len(list(tmp_path.glob("*.json"))) == 2
@@ -0,0 +1,133 @@
+import os
+
+import openpyxl
+import pandas as pd
+import pytest
+from openpyxl.styles import PatternFill
+
+from pdAutoRead import cache_path, pdAutoRead
+
+COLUMNS = ["level 1", "level 2", "Audit", "Audit retention", "notes"]
+
+
+def _rows(n):
+    return [
+        ["Top {}".format(i % 3), "Entity {:03d}".format(i),
+         "y" if i % 2 else None, "{} years".format(i % 7 + 1),
+         "note {}".format(i)]
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    # 50 rows, a blank row among them, which read_excel keeps, and styled
+    # blank rows after them, which it drops
+    path = str(tmp_path / "radar.xlsx")
+    book = openpyxl.Workbook()
+    sheet = book.active
+    sheet.append(COLUMNS)
+    rows = _rows(50)
+    for row in rows[:20]:
+        sheet.append(row)
+    sheet.append([None] * len(COLUMNS))
+    for row in rows[20:]:
+        sheet.append(row)
+    fill = PatternFill("solid", fgColor="FFFF00")
+    for row in range(sheet.max_row + 1, sheet.max_row + 19):
+        for col in range(1, len(COLUMNS) + 1):
+            sheet.cell(row=row, column=col).fill = fill
+    book.save(path)
+    return path
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = str(tmp_path / "radar.csv")
+    pd.DataFrame(_rows(50), columns=COLUMNS).to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize("chunksize", [1, 7, 50, 1000])
+def test_chunked_xlsx_matches_read_excel(workbook, chunksize):
+    usecols = ["level 1", "level 2", "Audit", "Audit retention"]
+    dtype = {"Audit": "category", "Audit retention": "category"}
+    whole = pd.read_excel(workbook, usecols=usecols, dtype=dtype)
+    chunked = pdAutoRead(workbook, usecols=usecols, dtype=dtype,
+                         chunksize=chunksize)
+    assert len(chunked) == 51
+    # empty text cells are None in the chunks, NaN from read_excel
+    text = {"level 1": "", "level 2": ""}
+    pd.testing.assert_frame_equal(chunked.fillna(text), whole.fillna(text),
+                                  check_categorical=False)
+
+
+@pytest.mark.parametrize("chunksize", [1, 7, 1000])
+def test_chunked_csv_matches_read_csv(csv_file, chunksize):
+    usecols = ["level 1", "Audit retention"]
+    whole = pd.read_csv(csv_file, usecols=usecols)
+    chunked = pdAutoRead(csv_file, usecols=usecols, chunksize=chunksize)
+    pd.testing.assert_frame_equal(chunked, whole)
+
+
+def test_chunks_are_validated(csv_file):
+    seen = []
+
+    def validate(chunk):
+        seen.append(len(chunk))
+        if chunk["level 2"].eq("Entity 030").any():
+            raise ValueError("bad row")
+
+    with pytest.raises(ValueError):
+        pdAutoRead(csv_file, chunksize=10, validate=validate)
+    assert seen == [10, 10, 10, 10]
+
+
+def _not_parsed(*args, **kwargs):
+    raise AssertionError("parsed again")
+
+
+def test_cache_is_reused_while_the_file_is_unchanged(csv_file, monkeypatch):
+    first = pdAutoRead(csv_file, cache=True)
+    assert os.path.exists(cache_path(csv_file))
+    monkeypatch.setattr(pd, "read_csv", _not_parsed)
+    pd.testing.assert_frame_equal(pdAutoRead(csv_file, cache=True), first)
+
+    # a touched file with the same content keeps its snapshot
+    stat = os.stat(csv_file)
+    os.utime(csv_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    pd.testing.assert_frame_equal(pdAutoRead(csv_file, cache=True), first)
+
+
+def test_cache_follows_a_changed_file(csv_file):
+    assert len(pdAutoRead(csv_file, cache=True)) == 50
+    pd.DataFrame(_rows(60), columns=COLUMNS).to_csv(csv_file, index=False)
+    assert len(pdAutoRead(csv_file, cache=True)) == 60
+
+
+def test_cache_is_kept_per_read_options(csv_file):
+    projected = pdAutoRead(csv_file, cache=True, usecols=["level 1"])
+    whole = pdAutoRead(csv_file, cache=True)
+    assert list(projected.columns) == ["level 1"]
+    assert list(whole.columns) == COLUMNS
+    assert cache_path(csv_file) != cache_path(
+        csv_file, {"usecols": ["level 1"], "dtype": {}})
+
+    # each read gets its own snapshot back
+    assert list(pdAutoRead(
+        csv_file, cache=True, usecols=["level 1"]).columns) == ["level 1"]
+    assert list(pdAutoRead(csv_file, cache=True).columns) == COLUMNS
+
+
+def test_cache_reparses_a_file_changed_while_read(csv_file, monkeypatch):
+    read_csv = pd.read_csv
+
+    def read_then_change(*args, **kwargs):
+        df = read_csv(*args, **kwargs)
+        pd.DataFrame(_rows(60), columns=COLUMNS).to_csv(csv_file, index=False)
+        return df
+
+    monkeypatch.setattr(pd, "read_csv", read_then_change)
+    assert len(pdAutoRead(csv_file, cache=True)) == 50
+    monkeypatch.setattr(pd, "read_csv", read_csv)
+    assert len(pdAutoRead(csv_file, cache=True)) == 60
@@ -0,0 +1,88 @@
+import json
+import os
+
+import plotly.io as pio
+import pytest
+
+import prerenderRadar
+from prerenderRadar import PrerenderedFigures, combinations, prerender
+
+
+def _render(app, *args):
+    pop_data_radar = getattr(
+        app.pop_data_radar, "__wrapped__", app.pop_data_radar)
+    figure, _ = pop_data_radar(*args)
+    return json.loads(pio.to_json(figure, validate=False))
+
+
+@pytest.fixture(scope="module")
+def prerendered(load_radar_app, tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp("prerendered"))
+    live = load_radar_app()
+    app = load_radar_app(RADAR_PRERENDER_DIR=directory)
+    # the pool's workers are forked from this process, and find the app
+    # already imported
+    prerenderRadar._app = app
+    cwd = os.getcwd()
+    try:
+        counts = prerender(directory, workers=2)
+    finally:
+        prerenderRadar._app = None
+        os.chdir(cwd)
+    return app, directory, counts, live
+
+
+def test_manifest_maps_every_view_to_a_figure(prerendered):
+    app, directory, counts, live = prerendered
+    radar = app.domain_data(None)
+    views = list(combinations(app, app.selected_domain))
+    assert counts["views"] == len(views)
+    assert counts["versions"] == 1
+
+    with open(os.path.join(directory, radar["version"] + ".json")) as rf:
+        manifest = json.load(rf)
+    assert manifest["progressive_levels"] == 0
+    figures = manifest["figures"]
+    assert sorted(set(figures.values())) == sorted(
+        os.listdir(os.path.join(directory, "figures")))
+    assert len(set(figures.values())) == counts["figures"]
+
+    for purpose, retention, technology, storage_type, cut in views[::7]:
+        key = app.radar_cache_key(
+            radar, None, "Default", cut, None,
+            purpose, retention, technology, storage_type)
+        assert key in figures
+        with open(os.path.join(directory, "figures", figures[key])) as rf:
+            assert json.load(rf) == _render(
+                live, None, "Default", purpose, retention, technology,
+                storage_type, 8)
+
+
+def test_app_serves_the_prerendered_figure(prerendered):
+    # the app looked for the manifest before it was written, drawing its
+    # first radar
+    app, directory, _, _ = prerendered
+    radar = app.domain_data(None)
+    args = ("Default", "Audit", "all", "all", "all")
+    key = app.radar_cache_key(radar, None, args[0], 8, None, *args[1:])
+    name = app.prerendered.manifest(radar["version"])[key]
+
+    # marked, so the figure served is seen to be the file's
+    path = os.path.join(directory, "figures", name)
+    with open(path) as rf:
+        figure = json.load(rf)
+    figure["layout"]["meta"] = "prerendered"
+    with open(path, "w") as wf:
+        json.dump(figure, wf)
+    assert _render(app, None, *args, 8)["layout"]["meta"] == "prerendered"
+    # views with a search are rendered
+    entity = radar["df"]["level 1"].iloc[0]
+    assert "meta" not in _render(app, entity, *args, 8)["layout"]
+
+
+def test_other_progressive_levels_are_not_served(prerendered):
+    app, directory, _, _ = prerendered
+    version = app.domain_data(None)["version"]
+    assert PrerenderedFigures(directory).manifest(version)
+    assert PrerenderedFigures(directory, 2).manifest(version) == {}
+    assert PrerenderedFigures(directory).manifest("other") == {}
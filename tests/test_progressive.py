@@ -0,0 +1,134 @@
+import pytest
+
+INPUTS = ["search-picker", "colour-picker", "purpose-picker",
+          "retention-picker", "storage-technology-picker",
+          "storage-type-filter", "num-levels", "domain-picker",
+          "radar-expanded"]
+DEFAULTS = {"colour-picker": "Default", "purpose-picker": "all",
+            "retention-picker": "all", "storage-technology-picker": "all",
+            "storage-type-filter": "all", "num-levels": 5}
+TOP_LEVELS = 2
+
+
+@pytest.fixture(scope="module")
+def app(load_radar_app):
+    return load_radar_app(RADAR_PROGRESSIVE_LEVELS=str(TOP_LEVELS))
+
+
+def _post(app, body):
+    response = app.server.test_client().post(
+        "/_dash-update-component", json=body)
+    assert response.status_code in (200, 204)
+    return response.get_json() if response.status_code == 200 else None
+
+
+def _render(app, expanded=None, **values):
+    # the radar, as dash-renderer asks for it
+    values = dict(DEFAULTS, **values, **{"radar-expanded": expanded})
+    result = _post(app, {
+        "output": "..data-radar.figure...radar-drawn.data..",
+        "outputs": [{"id": "data-radar", "property": "figure"},
+                    {"id": "radar-drawn", "property": "data"}],
+        "inputs": [
+            {"id": name,
+             "property": "data" if name == "radar-expanded" else "value",
+             "value": values.get(name)}
+            for name in INPUTS],
+        "state": [{"id": "radar-drawn", "property": "data", "value": None}],
+        "changedPropIds": ["radar-expanded.data"],
+    })
+    return set(result["response"]["data-radar"]["figure"]["data"][0]["ids"])
+
+
+def _click(app, node_id, expanded, trigger="data-radar.clickData"):
+    # a click on the radar, answered with the node to expand
+    result = _post(app, {
+        "output": "radar-expanded.data",
+        "outputs": {"id": "radar-expanded", "property": "data"},
+        "inputs": [
+            {"id": "data-radar", "property": "clickData",
+             "value": {"points": [{"id": node_id}]}},
+            {"id": "domain-picker", "property": "value", "value": None}],
+        "state": [
+            {"id": "radar-expanded", "property": "data", "value": expanded},
+            {"id": "num-levels", "property": "value",
+             "value": DEFAULTS["num-levels"]}],
+        "changedPropIds": [trigger],
+    })
+    if result is None:
+        return "no update"
+    return result["response"]["radar-expanded"]["data"]
+
+
+def _drawn(tree, expanded=None, num_levels=DEFAULTS["num-levels"]):
+    # the nodes with rows that progressive mode draws, from their parents
+    ids = list(tree["ids"])
+    parents = list(tree["parents"])
+    depths = list(tree["depths"])
+
+    def line(node):
+        while node >= 0:
+            yield node
+            node = parents[node]
+
+    path = set() if expanded is None else set(line(ids.index(expanded)))
+    drawn = set()
+    for node, node_id in enumerate(ids):
+        if depths[node] >= num_levels or not tree["leaf_counts"][node]:
+            continue
+        if depths[node] < TOP_LEVELS or node in path or (
+                expanded is not None and ids.index(expanded) in line(node)):
+            drawn.add(node_id)
+    return drawn
+
+
+@pytest.fixture(scope="module")
+def tree(app):
+    return app.domain_data(None)["tree"]
+
+
+def _children(tree, node_id):
+    node = list(tree["ids"]).index(node_id)
+    return [tree["ids"][child] for child in range(len(tree["ids"]))
+            if tree["parents"][child] == node and tree["leaf_counts"][child]]
+
+
+def test_first_render_draws_the_top_rings_only(app, tree):
+    drawn = _render(app)
+    assert drawn == _drawn(tree)
+    assert max(tree["depths"][list(tree["ids"]).index(node_id)]
+               for node_id in drawn) == TOP_LEVELS - 1
+
+
+def test_click_draws_the_branch_of_the_node(app, tree):
+    top = _children(tree, tree["ids"][0])[1]
+    expanded = _click(app, top, None)
+    assert expanded == top
+    drawn = _render(app, expanded)
+    assert drawn == _drawn(tree, top)
+    assert drawn > _render(app)
+
+    # and a click further down that branch, its own branch
+    below = _children(tree, top)[0]
+    assert _click(app, below, top) == below
+    assert _render(app, below) == _drawn(tree, below)
+
+
+def test_click_on_the_centre_goes_back_up(app, tree):
+    top = _children(tree, tree["ids"][0])[0]
+    below = _children(tree, top)[0]
+    assert _click(app, below, below) == top
+    # a level below the root goes back to the first render
+    assert _click(app, top, top) is None
+    assert _click(app, tree["ids"][0], top) is None
+
+
+def test_no_branch_below_the_focus_depth_or_a_leaf(app, tree):
+    node = list(tree["depths"]).index(DEFAULTS["num-levels"] - 1)
+    assert _click(app, tree["ids"][node], None) == "no update"
+    assert _click(app, "Concepts/nowhere", None) == "no update"
+
+
+def test_another_domain_starts_from_the_top(app, tree):
+    top = _children(tree, tree["ids"][0])[0]
+    assert _click(app, top, top, "domain-picker.value") is None
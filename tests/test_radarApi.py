@@ -0,0 +1,135 @@
+import json
+import os
+import re
+
+import pandas as pd
+import pytest
+
+ENTITIES = "/api/v1/entities"
+SUBTREE = "/api/v1/subtree"
+
+
+@pytest.fixture(scope="module")
+def app(load_radar_app):
+    return load_radar_app(RADAR_API="1")
+
+
+def _get(app, url, **kwargs):
+    return app.server.test_client().get(url, **kwargs)
+
+
+def _pages(app, url, query):
+    # every page of a query, following the next cursors
+    pages = [_get(app, url, query_string=query)]
+    while pages[-1].get_json()["next"] is not None:
+        pages.append(_get(app, url, query_string=dict(
+            query, cursor=pages[-1].get_json()["next"])))
+    return pages
+
+
+@pytest.mark.parametrize("url,name", [(ENTITIES, "entities"),
+                                      (SUBTREE, "nodes")])
+@pytest.mark.parametrize("query", [{}, {"purpose": "Audit"}])
+def test_pages_add_up_to_the_whole_answer(app, url, name, query):
+    whole = _get(app, url, query_string=dict(query, limit=10000)).get_json()
+    assert whole["next"] is None
+
+    pages = _pages(app, url, dict(query, limit=37))
+    assert len(pages) > 2
+    for page, following in zip(pages, pages[1:]):
+        # the Link header points at the same next page as the body
+        link = re.fullmatch(r'<(.+)>; rel="next"', page.headers["Link"])
+        assert _get(app, link.group(1)).get_json() == following.get_json()
+        assert len(page.get_json()[name]) == 37
+    assert "Link" not in pages[-1].headers
+    assert [record for page in pages
+            for record in page.get_json()[name]] == whole[name]
+
+
+def test_entities_of_a_node(app):
+    nodes = _get(app, SUBTREE, query_string={"limit": 10000}).get_json()
+    node = next(record for record in nodes["nodes"] if record["depth"] == 2)
+    entities = _get(app, ENTITIES, query_string={
+        "node": node["id"], "limit": 10000}).get_json()["entities"]
+    assert len(entities) == node["entities"]
+    assert all(record["id"].startswith(node["id"]) for record in entities)
+
+
+def test_unchanged_answer_is_a_304(app):
+    first = _get(app, ENTITIES, query_string={"purpose": "Audit"})
+    etag = first.headers["ETag"]
+    # weak, as gzip rewrites the body
+    assert etag.startswith('W/"')
+
+    again = _get(app, ENTITIES, query_string={"purpose": "Audit"},
+                 headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert again.get_data() == b""
+
+    # the strong form of the tag matches too
+    strong = _get(app, ENTITIES, query_string={"purpose": "Audit"},
+                  headers={"If-None-Match": etag[2:]})
+    assert strong.status_code == 304
+
+    other = _get(app, ENTITIES, query_string={"purpose": "Identity"},
+                 headers={"If-None-Match": etag})
+    assert other.status_code == 200
+    assert other.headers["ETag"] != etag
+
+
+def test_gzipped_answer_has_the_same_etag(app):
+    plain = _get(app, ENTITIES)
+    gzipped = _get(app, ENTITIES, headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.headers["ETag"] == plain.headers["ETag"]
+
+
+@pytest.mark.parametrize("query,status", [
+    ({"cursor": "zzz"}, 400),
+    ({"limit": "ten"}, 400),
+    ({"limit": "0"}, 400),
+    ({"domain": "Nope"}, 404),
+    ({"node": "Concepts/Nope"}, 404),
+])
+def test_bad_requests(app, query, status):
+    response = _get(app, ENTITIES, query_string=query)
+    assert response.status_code == status
+    assert response.get_json()["error"]
+
+
+@pytest.mark.parametrize("url,name", [(ENTITIES, "entities"),
+                                      (SUBTREE, "nodes")])
+def test_ndjson_streams_the_same_records(app, url, name):
+    query = {"purpose": "Audit", "limit": 1200}
+    whole = _get(app, url, query_string=query).get_json()
+    by_format = _get(app, url, query_string=dict(query, format="ndjson"))
+    by_accept = _get(app, url, query_string=query,
+                     headers={"Accept": "application/x-ndjson"})
+    for response in [by_format, by_accept]:
+        assert response.mimetype == "application/x-ndjson"
+        assert response.is_streamed
+        lines = response.get_data(as_text=True).splitlines()
+        assert [json.loads(line) for line in lines] == whole[name]
+
+
+def test_cursor_is_stale_after_a_reload(load_radar_app, monkeypatch):
+    app = load_radar_app(RADAR_API="1")
+    first = _get(app, ENTITIES, query_string={"limit": 10})
+    cursor = first.get_json()["next"]
+
+    # a new version of the data, picked up by the watcher, which runs in
+    # the app's folder
+    data = os.path.dirname(app.radar_data_config_path)
+    monkeypatch.chdir(os.path.dirname(data))
+    path = os.path.join(data, "radar_data_cdm.csv")
+    df = pd.read_csv(path)
+    df.iloc[:-1].to_csv(path, index=False)
+    assert app.radar_domains.check() == ["Concepts"]
+
+    stale = _get(app, ENTITIES, query_string={"limit": 10, "cursor": cursor})
+    assert stale.status_code == 409
+    assert stale.get_json()["error"]
+    restarted = _get(app, ENTITIES, query_string={"limit": 10})
+    assert restarted.get_json()["version"] != first.get_json()["version"]
+    assert restarted.headers["ETag"] != first.headers["ETag"]
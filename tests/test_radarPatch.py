@@ -0,0 +1,98 @@
+import copy
+import itertools
+
+import pytest
+
+INPUTS = ["search-picker", "colour-picker", "purpose-picker",
+          "retention-picker", "storage-technology-picker",
+          "storage-type-filter", "num-levels", "domain-picker",
+          "radar-expanded"]
+DEFAULTS = {"colour-picker": "Default", "purpose-picker": "all",
+            "retention-picker": "all", "storage-technology-picker": "all",
+            "storage-type-filter": "all", "num-levels": 4}
+
+
+@pytest.fixture(scope="module", params=["figure", "slim"])
+def app(request, load_radar_app):
+    if request.param == "slim":
+        return load_radar_app(RADAR_SLIM_FIGURES="1")
+    return load_radar_app()
+
+
+def _update(app, values, changed, drawn):
+    # one pop_data_radar request, as dash-renderer sends it
+    output = (("radar-figure-slim", "data") if app.slim_figures
+              else ("data-radar", "figure"))
+    values = dict(DEFAULTS, **values)
+    response = app.server.test_client().post(
+        "/_dash-update-component",
+        json={
+            "output": "..{}.{}...radar-drawn.data..".format(*output),
+            "outputs": [{"id": output[0], "property": output[1]},
+                        {"id": "radar-drawn", "property": "data"}],
+            "inputs": [
+                {"id": name,
+                 "property": "data" if name == "radar-expanded" else "value",
+                 "value": values.get(name)}
+                for name in INPUTS],
+            "state": [{"id": "radar-drawn", "property": "data",
+                       "value": drawn}],
+            "changedPropIds": [name + ".value" for name in changed],
+        },
+    )
+    assert response.status_code == 200
+    result = response.get_json()["response"]
+    return result[output[0]][output[1]], result.get("radar-drawn", {})
+
+
+def _patched(figure, patch):
+    figure = copy.deepcopy(figure)
+    for operation in patch["operations"]:
+        assert operation["operation"] == "Assign"
+        *path, last = operation["location"]
+        target = figure
+        for key in path:
+            target = target[key]
+        target[last] = operation["params"]["value"]
+    return figure
+
+
+def _filters(app):
+    df = app.domain_data(None)["df"]
+    return [{}, {"purpose-picker": "Audit"},
+            {"storage-type-filter": "ephemeral"},
+            {"search-picker": df["level 1"].iloc[0]}]
+
+
+def test_focus_patches_the_radar_drawn_for_its_inputs(app):
+    for filters, focus in itertools.product(_filters(app), [2, 5, 8]):
+        figure, drawn = _update(app, filters, ["purpose-picker"], None)
+        patch, patch_drawn = _update(
+            app, dict(filters, **{"num-levels": focus}), ["num-levels"],
+            drawn["data"])
+        expected, _ = _update(
+            app, dict(filters, **{"num-levels": focus}), ["num-levels"], None)
+
+        assert "__dash_patch_update" in patch
+        assert patch_drawn == {}
+        assert _patched(figure, patch) == expected
+
+
+def test_stale_radar_is_drawn_again(app):
+    # a Focus move after a filter change whose render the browser dropped
+    old, new = _filters(app)[:2]
+    _, drawn = _update(app, old, ["purpose-picker"], None)
+    expected, expected_drawn = _update(app, new, ["purpose-picker"], None)
+    for key in [drawn["data"], "stale", None]:
+        figure, figure_drawn = _update(app, new, ["num-levels"], key)
+        assert figure == expected
+        assert figure_drawn == expected_drawn
+
+
+def test_filter_change_is_never_a_patch(app):
+    _, drawn = _update(app, {}, ["purpose-picker"], None)
+    figure, figure_drawn = _update(
+        app, {"purpose-picker": "Audit", "num-levels": 2},
+        ["purpose-picker", "num-levels"], drawn["data"])
+    assert "__dash_patch_update" not in figure
+    assert figure_drawn["data"] != drawn["data"]
@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+
+import pytest
+
+from radarReloader import SnapshotLRU, SnapshotReloader
+
+
+def _write(path, text):
+    # a new size, so the change shows in the file signature whatever the
+    # resolution of the filesystem's mtimes
+    with open(path, "w") as wf:
+        wf.write(text)
+
+
+@pytest.fixture
+def reloader(tmp_path):
+    path = str(tmp_path / "radar.csv")
+    _write(path, "1")
+
+    def load():
+        with open(path) as rf:
+            text = rf.read()
+        # a half-written file
+        if not text.isdigit():
+            raise ValueError(text)
+        return {"sources": [path], "version": text,
+                "values": list(range(int(text)))}
+
+    return path, SnapshotReloader(load, interval=0)
+
+
+def test_unchanged_files_keep_the_snapshot(reloader):
+    _, reloader = reloader
+    snapshot = reloader.current
+    assert not reloader.check()
+    assert reloader.current is snapshot
+    assert reloader.reloads == 0
+
+
+def test_file_change_swaps_in_a_new_snapshot(reloader):
+    path, reloader = reloader
+    _write(path, "22")
+    assert reloader.check()
+    assert reloader.current["version"] == "22"
+    assert reloader.current["values"] == list(range(22))
+    assert reloader.reloads == 1
+
+
+def test_broken_file_keeps_the_old_snapshot(reloader):
+    path, reloader = reloader
+    snapshot = reloader.current
+    _write(path, "2,")
+    assert not reloader.check()
+    assert reloader.current is snapshot
+    # a broken file is loaded once, not on every check
+    assert not reloader.check()
+
+    # until it is written again
+    _write(path, "333")
+    assert reloader.check()
+    assert reloader.current["version"] == "333"
+
+
+def test_missing_file_keeps_the_old_snapshot(reloader):
+    path, reloader = reloader
+    snapshot = reloader.current
+    os.remove(path)
+    assert not reloader.check()
+    assert reloader.current is snapshot
+
+
+def test_in_flight_caller_keeps_its_snapshot(reloader):
+    path, reloader = reloader
+    # a callback takes the snapshot once, then the data changes under it
+    taken = reloader.current
+    _write(path, "22")
+    assert reloader.check()
+
+    assert taken["version"] == "1"
+    assert taken["values"] == [0]
+    assert reloader.current["version"] == "22"
+    with pytest.raises(TypeError):
+        taken["version"] = "22"
+
+
+@pytest.fixture
+def domains(tmp_path):
+    # a file per domain, holding the bytes its snapshot counts
+    paths = {}
+    for domain, size in [("a", 40), ("b", 30), ("c", 50), ("d", 10)]:
+        paths[domain] = str(tmp_path / domain)
+        _write(paths[domain], str(size))
+    loaded = []
+
+    def load(domain):
+        loaded.append(domain)
+        with open(paths[domain]) as rf:
+            text = rf.read()
+        if not text.isdigit():
+            raise ValueError(text)
+        return {"sources": [paths[domain]], "bytes": int(text)}
+
+    return paths, loaded, load
+
+
+def test_least_recently_used_domains_are_evicted_past_max_bytes(domains):
+    _, loaded, load = domains
+    lru = SnapshotLRU(load, max_bytes=100, interval=0)
+    lru.get("a")
+    lru.get("b")
+    lru.get("a")
+    assert lru.keys() == ["b", "a"]
+
+    # 120 bytes, over by b, the least recently used
+    lru.get("c")
+    assert lru.keys() == ["a", "c"]
+    assert lru.evictions == 1
+    lru.get("d")
+    assert lru.keys() == ["a", "c", "d"]
+
+    # an evicted domain is loaded again, pushing out a
+    lru.get("b")
+    assert lru.keys() == ["c", "d", "b"]
+    assert lru.evictions == 2
+    assert loaded == ["a", "b", "c", "d", "b"]
+
+
+def test_domain_over_max_bytes_alone_is_kept(domains):
+    _, _, load = domains
+    lru = SnapshotLRU(load, max_bytes=20, interval=0)
+    lru.get("a")
+    assert lru.keys() == ["a"]
+    lru.get("d")
+    assert lru.keys() == ["d"]
+
+
+def test_reload_swaps_the_domain_snapshot(domains):
+    paths, _, load = domains
+    lru = SnapshotLRU(load, max_bytes=100, interval=0)
+    before = lru.get("a")
+    _write(paths["a"], "45")
+    assert lru.check() == ["a"]
+    assert lru.get("a")["bytes"] == 45
+    assert before["bytes"] == 40
+
+
+def test_failed_first_load_is_tried_again(domains):
+    paths, loaded, load = domains
+    lru = SnapshotLRU(load, interval=0)
+    _write(paths["a"], "4,")
+    with pytest.raises(ValueError):
+        lru.get("a")
+    assert lru.keys() == []
+    # nothing is left behind for the domain
+    assert lru._loading == {}
+
+    _write(paths["a"], "40")
+    assert lru.get("a")["bytes"] == 40
+    assert loaded == ["a", "a"]
+
+
+def test_concurrent_first_requests_load_once(domains):
+    _, loaded, load = domains
+
+    def slow_load(domain):
+        time.sleep(0.05)
+        return load(domain)
+
+    lru = SnapshotLRU(slow_load, interval=0)
+    snapshots = []
+    threads = [threading.Thread(target=lambda: snapshots.append(lru.get("a")))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loaded == ["a"]
+    assert all(snapshot is snapshots[0] for snapshot in snapshots)
@@ -0,0 +1,146 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pdAutoRead import pdAutoRead
+from radarRules import compile_rules, derive_columns
+from radarSchema import RadarSchema
+from synthRadar import PURPOSES, STORAGE_PURPOSES, synthetic_radar
+
+RULES = """column,value,source,match,pattern
+Storage Type,Ephemeral,storage technology,contains,AWS Lambda
+Storage Type,Persisted,,default,
+Retention Band,Short,retention,regex,^(30|90) days$
+Retention Band,Audited,Audit retention,equals,2 years
+Retention Band,Long,retention,contains,year
+"""
+
+
+@pytest.fixture(scope="module")
+def radar():
+    df = synthetic_radar(rows=400, fan_out=3)
+    levels = ["domain"] + [col for col in df.columns if "level" in col]
+    schema = RadarSchema(levels, {
+        purpose: (purpose, purpose + " retention",
+                  purpose + " Storage Technology"
+                  if purpose in STORAGE_PURPOSES else None)
+        for purpose in PURPOSES
+    }, [])
+    return df, schema
+
+
+def _read_rules(tmp_path, text):
+    path = os.path.join(str(tmp_path), "radar_data_rules.csv")
+    with open(path, "w") as wf:
+        wf.write(text)
+    return pdAutoRead(path)
+
+
+def _row_by_row(df, rules, values):
+    # each row tested against each rule in turn, the first match wins
+    tests = {
+        "contains": lambda value, pattern: pattern in value,
+        "equals": lambda value, pattern: value == pattern,
+        "regex": lambda value, pattern: re.search(pattern, value) is not None,
+    }
+    codes = []
+    for _, row in df.iterrows():
+        code = -1
+        for value, sources, match, pattern in rules:
+            if not sources or any(
+                    tests[match](str(row[col]), pattern)
+                    for col in sources if pd.notna(row[col])):
+                code = values.index(value)
+                break
+        codes.append(code)
+    return np.array(codes)
+
+
+def test_rules_compile_to_their_source_columns(radar, tmp_path):
+    df, schema = radar
+    compiled = compile_rules(_read_rules(tmp_path, RULES), schema, df.columns)
+    assert compiled == {
+        "Storage Type": [
+            ("Ephemeral", schema.storage_columns, "contains", "AWS Lambda"),
+            ("Persisted", [], "default", ""),
+        ],
+        "Retention Band": [
+            ("Short", schema.retention_columns, "regex", "^(30|90) days$"),
+            ("Audited", ["Audit retention"], "equals", "2 years"),
+            ("Long", schema.retention_columns, "contains", "year"),
+        ],
+    }
+
+
+def test_derived_codes_match_the_rules_row_by_row(radar, tmp_path):
+    df, schema = radar
+    compiled = compile_rules(_read_rules(tmp_path, RULES), schema, df.columns)
+    derived = derive_columns(df, compiled)
+    for name, rules in compiled.items():
+        values = list(dict.fromkeys(value for value, _, _, _ in rules))
+        assert derived[name]["values"] == values
+        np.testing.assert_array_equal(
+            derived[name]["codes"], _row_by_row(df, rules, values))
+        # and each source column on its own
+        for col, col_codes in derived[name]["columns"].items():
+            only = [(value, [col] if sources else [], match, pattern)
+                    for value, sources, match, pattern in rules
+                    if not sources or col in sources]
+            np.testing.assert_array_equal(
+                col_codes, _row_by_row(df, only, values))
+
+    # rows no rule matches are left empty
+    assert (derived["Retention Band"]["codes"] == -1).any()
+    assert (derived["Storage Type"]["codes"] >= 0).all()
+
+
+@pytest.mark.parametrize("rule,error", [
+    ("Storage Type,Cold,storage technology,startswith,S3",
+     "line 3 for Storage Type has unknown match 'startswith'"),
+    ("Storage Type,Cold,Backup Technology,contains,S3",
+     "line 3 for Storage Type has unknown source 'Backup Technology'"),
+    ("Storage Type,Cold,storage technology,regex,S3(",
+     "line 3 for Storage Type has an invalid pattern 'S3('"),
+])
+def test_malformed_rule_names_its_line(radar, tmp_path, rule, error):
+    df, schema = radar
+    lines = RULES.splitlines()
+    rules = _read_rules(tmp_path, "\n".join(lines[:2] + [rule] + lines[2:]))
+    with pytest.raises(ValueError, match=re.escape(error)):
+        compile_rules(rules, schema, df.columns)
+
+
+@pytest.fixture(scope="module")
+def app(load_radar_app):
+    app = load_radar_app()
+    raw = pd.read_csv(os.path.join(
+        os.path.dirname(app.radar_data_config_path), "radar_data_cdm.csv"))
+    return app, raw
+
+
+def test_compacted_data_derives_the_same_codes(app):
+    app, raw = app
+    radar = app.domain_data(None)
+    compiled = compile_rules(
+        pdAutoRead(app.radar_rules_path), app.radar_schema, raw.columns)
+    for name, derived in derive_columns(raw, compiled).items():
+        np.testing.assert_array_equal(
+            radar["derived"][name]["codes"], derived["codes"])
+
+
+@pytest.mark.parametrize("storage_type", ["ephemeral", "Persisted", "cold"])
+def test_storage_type_filter_matches_the_baseline(app, storage_type):
+    # the app's rows, compacted and through the filter index, against the
+    # Storage Type column the app used to add to the raw data
+    app, raw = app
+    column = [col for col in raw.columns if "Storage Technology" in col][0]
+    expected = raw[column].apply(
+        lambda x: "Ephemeral" if "AWS Lambda" in str(x) else "Persisted")
+
+    mask = app.radar_mask(
+        app.domain_data(None), None, "all", "all", "all", storage_type)
+    np.testing.assert_array_equal(
+        mask, (expected.str.lower() == storage_type.lower()).to_numpy())
@@ -0,0 +1,113 @@
+import json
+
+import numpy as np
+import plotly.express as px
+import plotly.io as pio
+import pytest
+
+from radarSchema import RadarSchema
+from radarTree import MIXED, build_radar_tree, sunburst_figure
+from synthRadar import PURPOSES, STORAGE_PURPOSES, synthetic_radar
+
+COLOURS = ["#1d70b8", "#00703c", "#d4351c"]
+# every retention period synthRadar writes, shortest first
+RETENTION = ["30 days", "90 days", "6 months", "1 year", "2 years",
+             "6 years", "7 years", "Indefinitely"]
+
+
+@pytest.fixture(scope="module")
+def radar():
+    df = synthetic_radar(rows=400, fan_out=3)
+    df.insert(0, "domain", "Concepts")
+    levels = ["domain"] + [col for col in df.columns if "level" in col]
+    custom = [col for col in df.columns
+              if col.endswith("retention") or col.endswith("Technology")]
+    return df, levels, custom, build_radar_tree(df, levels, custom)
+
+
+def _as_json(figure):
+    return json.loads(pio.to_json(figure, validate=False))
+
+
+@pytest.mark.parametrize("num_levels", [2, 5, 8])
+@pytest.mark.parametrize("rows", ["all", "purpose", "retention"])
+def test_sunburst_matches_px_sunburst(radar, num_levels, rows):
+    df, levels, custom, tree = radar
+    mask = {
+        "all": np.ones(len(df), dtype=bool),
+        "purpose": df["Audit"].eq("y").to_numpy(),
+        "retention": df["Identity retention"].eq("1 year").to_numpy(),
+    }[rows]
+    expected = px.sunburst(
+        df[mask].fillna({col: "N/A" for col in custom}),
+        path=levels[:num_levels],
+        color_discrete_sequence=COLOURS,
+        custom_data=custom,
+    )
+    expected = _as_json(expected)
+    # the app replaces px's hover template with its own, see style_radar
+    del expected["data"][0]["hovertemplate"]
+
+    figure = _as_json(sunburst_figure(tree, mask, num_levels, COLOURS))
+    assert figure == expected
+
+
+@pytest.fixture(scope="module")
+def rolled_up():
+    df = synthetic_radar(rows=400, fan_out=3, retention_values=8)
+    df.insert(0, "domain", "Concepts")
+    levels = ["domain"] + [col for col in df.columns if "level" in col]
+    schema = RadarSchema(levels, {
+        purpose: (purpose, purpose + " retention",
+                  purpose + " Storage Technology"
+                  if purpose in STORAGE_PURPOSES else None)
+        for purpose in PURPOSES
+    }, [])
+    # flags are booleans once loaded, see compact_frame
+    for flag in schema.flags.values():
+        df[flag] = df[flag].eq("y")
+    custom = schema.retention_columns + schema.storage_columns
+    return df, schema, custom, build_radar_tree(df, levels, custom, schema)
+
+
+def _brute_force(df, schema, custom):
+    # the count, hover values and rollups of every node, by grouping the
+    # rows on each path prefix
+    nodes = {}
+    for depth in range(1, len(schema.levels) + 1):
+        path = schema.levels[:depth]
+        for key, rows in df[df[path[-1]].notna()].groupby(path):
+            hover = [
+                rows[col].iloc[0] if rows[col].nunique(dropna=False) == 1
+                else MIXED
+                for col in custom]
+            hover = ["N/A" if value is None else value for value in hover]
+            purposes = [purpose for purpose in schema.purposes
+                        if rows[schema.flags[purpose]].any()]
+            retention = set(
+                rows[schema.retention_columns].stack().dropna())
+            storage = set(rows[schema.storage_columns].stack().dropna())
+            nodes["/".join(key)] = (len(rows), hover + [
+                ", ".join(purposes) or "N/A",
+                max(retention, key=RETENTION.index) if retention else "N/A",
+                ", ".join(sorted(storage)) or "N/A",
+            ])
+    return nodes
+
+
+@pytest.mark.parametrize("rows", ["all", "purpose", "sample"])
+def test_rollups_match_brute_force(rolled_up, rows):
+    df, schema, custom, tree = rolled_up
+    mask = {
+        "all": np.ones(len(df), dtype=bool),
+        "purpose": df["Audit"].to_numpy(),
+        "sample": np.random.default_rng(0).random(len(df)) < 0.2,
+    }[rows]
+    trace = sunburst_figure(
+        tree, mask, len(schema.levels), COLOURS)["data"][0]
+    drawn = {
+        node: (int(count), list(customdata))
+        for node, count, customdata
+        in zip(trace["ids"], trace["values"], trace["customdata"])
+    }
+    assert drawn == _brute_force(df[mask], schema, custom)
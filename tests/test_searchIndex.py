@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+from searchIndex import build_search_index, search
+from synthRadar import synthetic_radar
+
+EVERYTHING = 10**6
+
+
+@pytest.fixture(scope="module")
+def entities():
+    df = synthetic_radar(rows=400, fan_out=3)
+    columns = [col for col in df.columns if "level" in col]
+    return df, columns, build_search_index(df, columns)
+
+
+def _scan(df, columns, query):
+    # the search picker before the index: every distinct level value
+    # containing the query, case-insensitively
+    values = pd.concat([df[col] for col in columns]).dropna().unique()
+    return {value for value in values if query.lower() in str(value).lower()}
+
+
+@pytest.mark.parametrize("query", [
+    "e", "1", ".", " ", "En", "y 0", "ENTITY 00001", "eNtItY", "Level 3",
+    "group 2.0.1", "p 1.2", "0000", "nope", "zz", "x", "Entity 0000000"])
+def test_recall_matches_a_substring_scan(entities, query):
+    df, columns, index = entities
+    found = search(index, query, limit=EVERYTHING)
+    assert len(found) == len(set(found))
+    assert set(found) == _scan(df, columns, query)
+
+
+def test_empty_query_offers_the_first_values(entities):
+    df, columns, index = entities
+    assert len(search(index, "")) == 50
+    assert set(search(index, "", limit=EVERYTHING)) == _scan(df, columns, "")
+
+
+def test_matches_are_capped(entities):
+    _, _, index = entities
+    found = search(index, "e")
+    assert len(found) == 50
+    assert found == search(index, "e", limit=EVERYTHING)[:50]
+    assert search(index, "e", limit=7) == found[:7]
+
+
+def test_best_matches_come_first():
+    df = pd.DataFrame({
+        "level 1": ["Payments", "Card payment", "Repayment plan", "Prepay"],
+        "level 2": ["Payment", "pay", None, "Payment"],
+    })
+    index = build_search_index(df, ["level 1", "level 2"])
+    # exact, starts with, a word starts with, then contains, each shortest
+    # first
+    assert search(index, "PAY") == [
+        "pay", "Payment", "Payments", "Card payment", "Prepay",
+        "Repayment plan"]
+    assert search(index, "pay", limit=3) == ["pay", "Payment", "Payments"]
+    assert search(index, "ment p") == ["Repayment plan"]
+    assert search(index, "payroll") == []
@@ -0,0 +1,141 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import plotly
+import pytest
+
+from sharedSnapshot import MIN_SHARED_BYTES, SharedSnapshots
+
+ROWS = 2000
+
+
+def _snapshot():
+    rng = np.random.default_rng(0)
+    return {
+        "sources": ["radar.csv"],
+        "df": pd.DataFrame({
+            "level 1": pd.Categorical(rng.choice(["a", "b", "c"], ROWS)),
+            "Audit": rng.random(ROWS) < 0.5,
+            "count": rng.integers(0, 100, ROWS),
+            "name": ["Entity {}".format(i) for i in range(ROWS)],
+        }),
+        "tree": {
+            "parents": np.arange(ROWS, dtype=np.int32) - 1,
+            "row_node": np.asfortranarray(
+                rng.integers(-1, ROWS, (7, ROWS), dtype=np.int32)),
+            "small": np.arange(4),
+            "ids": np.array(["node {}".format(i) for i in range(ROWS)],
+                            dtype=object),
+        },
+    }
+
+
+def _arrays(value, path=()):
+    # every array in value, by where it sits
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _arrays(item, path + (key,))
+    elif isinstance(value, pd.DataFrame):
+        for col in value.columns:
+            yield from _arrays(value[col].array, path + (col,))
+    elif isinstance(value, pd.Categorical):
+        yield path, value.codes
+    elif isinstance(value, np.ndarray):
+        yield path, value
+    elif hasattr(value, "to_numpy"):
+        yield path, value.to_numpy()
+
+
+def _assert_shared(original, attached):
+    arrays = dict(_arrays(attached))
+    for path, array in _arrays(original):
+        assert arrays[path].dtype == array.dtype
+        assert np.array_equal(arrays[path], array), path
+        if array.dtype != object and array.nbytes >= MIN_SHARED_BYTES:
+            # a view of the mapped file, not a copy
+            assert not arrays[path].flags.writeable, path
+
+
+def test_published_snapshot_attaches_as_read_only_arrays(tmp_path):
+    shared = SharedSnapshots(str(tmp_path / "shared"), layout=[1])
+    snapshot = _snapshot()
+    attached = shared.publish("Concepts", ["v1"], snapshot)
+    _assert_shared(snapshot, attached)
+    pd.testing.assert_frame_equal(attached["df"], snapshot["df"])
+    assert attached["tree"]["row_node"].flags.f_contiguous
+
+    # as another worker sees it
+    other = SharedSnapshots(str(tmp_path / "shared"), layout=[1])
+    _assert_shared(snapshot, other.attach("Concepts", ["v1"]))
+    assert other.attach("Concepts", ["v2"]) is None
+    other = SharedSnapshots(str(tmp_path / "shared"), layout=[2])
+    assert other.attach("Concepts", ["v1"]) is None
+
+
+def test_directory_is_private(tmp_path):
+    shared = SharedSnapshots(str(tmp_path / "shared"))
+    assert os.stat(shared.directory).st_mode & 0o777 == 0o700
+    shared.publish("Concepts", ["v1"], _snapshot())
+    path = shared.path("Concepts", ["v1"])
+    assert os.stat(path).st_mode & 0o077 == 0
+
+
+def test_writable_by_others_is_never_attached(tmp_path):
+    shared = SharedSnapshots(str(tmp_path / "shared"))
+    shared.publish("Concepts", ["v1"], _snapshot())
+    path = shared.path("Concepts", ["v1"])
+
+    os.chmod(path, 0o622)
+    assert shared.attach("Concepts", ["v1"]) is None
+    os.chmod(path, 0o600)
+    assert shared.attach("Concepts", ["v1"]) is not None
+
+    os.chmod(shared.directory, 0o777)
+    assert shared.attach("Concepts", ["v1"]) is None
+    # nor is anything published there
+    snapshot = _snapshot()
+    assert shared.publish("Concepts", ["v2"], snapshot) is snapshot
+    assert not os.path.exists(shared.path("Concepts", ["v2"]))
+
+
+@pytest.mark.skipif(not hasattr(os, "geteuid") or os.geteuid() != 0,
+                    reason="needs to hand the directory to another user")
+def test_owned_by_another_user_is_never_attached(tmp_path):
+    shared = SharedSnapshots(str(tmp_path / "shared"))
+    shared.publish("Concepts", ["v1"], _snapshot())
+    path = shared.path("Concepts", ["v1"])
+    os.chown(path, 1, 1)
+    assert shared.attach("Concepts", ["v1"]) is None
+
+
+@pytest.fixture(scope="module")
+def apps(load_radar_app, tmp_path_factory):
+    own = load_radar_app()
+    shared = load_radar_app(
+        RADAR_SHARED_DIR=str(tmp_path_factory.mktemp("shm") / "radar"))
+    return own, shared
+
+
+def _figure(app, *args):
+    # the callback itself, as benchRadar calls it
+    pop_data_radar = getattr(
+        app.pop_data_radar, "__wrapped__", app.pop_data_radar)
+    figure, _ = pop_data_radar(*args)
+    return json.dumps(figure, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def test_attached_domain_draws_the_same_radar(apps):
+    own, shared = apps
+    radar = own.domain_data(None)
+    attached = shared.domain_data(None)
+    assert os.listdir(shared.shared_dir)
+    _assert_shared(dict(radar), dict(attached))
+    pd.testing.assert_frame_equal(attached["df"], radar["df"])
+
+    entity = radar["df"]["level 1"].iloc[0]
+    for args in [("", "Default", "all", "all", "all", "all", 8),
+                 (entity, "Default", "Audit", "all", "all", "all", 4),
+                 ("", "Default", "all", "all", "AWS Lambda", "ephemeral", 8)]:
+        assert _figure(shared, *args) == _figure(own, *args)